@@ -4,73 +4,220 @@ API endpoints для игры
 from fastapi import APIRouter, HTTPException, Request
 import logging
 import os
-from app.game.logic import TicTacToe
-from app.game.ai import AIPlayer
+from typing import List, Optional
+from app.game.bitboard import BitboardTicTacToe
+from app.game.ai import DEFAULT_DIFFICULTY, DIFFICULTY_LEVELS
+from app.game.modes import DEFAULT_MODE, GAME_MODES, create_game
 from app.game.promocode import generate_promocode
 from app.telegram.notifier import notify_telegram
-from app.models.schemas import MoveRequest, GameResponse, LinkRequest, LinkResponse
-from app.storage.redis_client import get_storage
+from app.models.schemas import StartGameRequest, MoveRequest, GameResponse, LinkRequest, LinkResponse
+from app.storage import sqlite_store
+from app.storage.game_store import STORAGE_BACKEND, GameStore
+from app.storage.redis_client import RedisStorage, get_storage
+from app.storage.sharded_redis import ShardedRedisStorage
+from app.storage.game_cache import GameCache
+from app.storage.memory_store import MemoryStorage
+from app.storage.move_script import (
+    MOVE_AI_TURN, MOVE_APPLIED, MOVE_BAD_CELL, MOVE_FINISHED, MOVE_NOT_YOUR_TURN, MOVE_OCCUPIED,
+)
+from app.storage.unit_of_work import GameUnitOfWork
 from app.core.limiter import limiter
+from app.core.metrics import STORAGE_WRITES
+from app.core.single_flight import KeyedLocks, SingleFlight
+from app.core.ai_executor import compute_ai_move
+from app.core.pondering import cancel_pondering, start_pondering
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# Fallback хранилища в памяти
-active_games_fallback = {}
-active_tokens_fallback = {} # Для токенов привязки Telegram
+# Хранилище в памяти: основное при STORAGE_BACKEND=memory, иначе fallback
+memory_storage = MemoryStorage()
 
-# Флаг использования Redis
-USE_REDIS = os.getenv("USE_REDIS", "true").lower() == "true"
+# Основное хранилище - Redis (app.storage.game_store)
+USE_REDIS = STORAGE_BACKEND == "redis"
+# Ход игрока проверяется и применяется Lua-скриптом в Redis (app.storage.move_script)
+ATOMIC_MOVES = os.getenv("ATOMIC_MOVES", "false").lower() == "true"
 
-async def _save_game(game: TicTacToe) -> bool:
-    """Сохранить игру в хранилище"""
-    if USE_REDIS:
+async def _redis_storage() -> Optional[RedisStorage]:
+    """Хранилище Redis, если оно включено и circuit breaker не разомкнут
+
+    Пока Redis недоступен, запросы сразу идут в fallback, не дожидаясь
+    таймаутов подключения.
+    """
+    if not USE_REDIS:
+        return None
+    try:
+        storage = await get_storage()
+    except Exception as e:
+        logger.warning(f"Redis недоступен, используем fallback: {e}")
+        return None
+    return storage if storage.available else None
+
+async def _primary_storage() -> Optional[GameStore]:
+    """Основное хранилище (STORAGE_BACKEND); None - только память воркера"""
+    if STORAGE_BACKEND == "sqlite":
+        return await sqlite_store.get_storage()
+    return await _redis_storage()
+
+async def _write_games(games: List[BitboardTicTacToe]):
+    """Записать игры в хранилище (одной записью)"""
+    storage = await _primary_storage()
+    if storage is not None:
         try:
-            storage = await get_storage()
-            result = await storage.save_game(game)
-            if result:
-                return True
+            if isinstance(storage, ShardedRedisStorage):
+                # Узлы пишутся независимо: в fallback только игры отказавших узлов
+                results = await storage.save_games_each(games)
             else:
-                # Если сохранение не удалось, используем fallback
-                logger.warning("Сохранение в Redis вернуло False, используем fallback")
-                active_games_fallback[game.game_id] = game
-                return True
+                results = [await storage.save_games(games)] * len(games)
+            failed = [game for game, saved in zip(games, results) if not saved]
+            if len(failed) < len(games):
+                STORAGE_WRITES.labels(backend=STORAGE_BACKEND).inc()
+            if not failed:
+                return
+            # Если сохранение не удалось, используем fallback
+            logger.warning(f"Сохранение в {STORAGE_BACKEND} вернуло False "
+                           f"для {len(failed)} из {len(games)} игр, используем fallback")
+            games = failed
         except Exception as e:
-            logger.warning(f"Не удалось сохранить в Redis, используем fallback: {e}")
-            # Fallback на память
-            active_games_fallback[game.game_id] = game
-            return True
-    else:
-        active_games_fallback[game.game_id] = game
-        return True
+            logger.warning(f"Не удалось сохранить в {STORAGE_BACKEND}, используем fallback: {e}")
+    # Fallback на память
+    await memory_storage.save_games(games)
+    STORAGE_WRITES.labels(backend="memory").inc()
+
+# Кеш партий воркера перед хранилищем (app.storage.game_cache)
+game_cache = GameCache(_write_games)
+# Одновременные загрузки одной партии - один запрос к хранилищу
+game_loads = SingleFlight("game_load")
+# Ходы в одну партию внутри воркера выполняются по очереди
+game_locks = KeyedLocks()
+
+async def _save_games(games: List[BitboardTicTacToe]):
+    """Сохранить игры: сразу в хранилище или, в режиме write-behind, только в кеш"""
+    if game_cache.write_behind:
+        game_cache.put(games, dirty=True)
+        return
+    await _write_games(games)
+    game_cache.put(games)
+
+async def _save_game(game: BitboardTicTacToe):
+    """Сохранить игру в хранилище"""
+    await _save_games([game])
+
+async def _get_game(game_id: str, shared: bool = True) -> BitboardTicTacToe:
+    """Получить игру из хранилища
+
+    shared - загрузку можно разделить с одновременными запросами (опрос
+    статуса). Ход под блокировкой партии загружает ее сам: общая загрузка
+    могла начаться до сохранения предыдущего хода и вернуть партию без него.
+    """
+    game = game_cache.get(game_id)
+    if game is not None:
+        return game
+    if not shared:
+        return await _load_game(game_id)
+    game = await game_loads.do(game_id, lambda: _load_game(game_id))
+    # Загруженную партию могли получить несколько запросов - каждому своя копия
+    return game.copy() if game is not None else None
 
-async def _get_game(game_id: str) -> TicTacToe:
-    """Получить игру из хранилища"""
-    if USE_REDIS:
+async def _load_game(game_id: str) -> BitboardTicTacToe:
+    """Загрузить игру из хранилища в кеш"""
+    loaded_at = game_cache.stamp()
+    game = None
+    storage = await _primary_storage()
+    if storage is not None:
         try:
-            storage = await get_storage()
             game = await storage.get_game(game_id)
-            if game:
-                return game
         except Exception as e:
-            logger.warning(f"Не удалось получить из Redis, пробуем fallback: {e}")
-    
-    # Fallback на память
-    if game_id in active_games_fallback:
-        return active_games_fallback[game_id]
+            logger.warning(f"Не удалось получить из {STORAGE_BACKEND}, пробуем fallback: {e}")
     
+    if game is None:
+        # Fallback на память
+        game = await memory_storage.get_game(game_id)
+    if game is not None:
+        # Пока шла загрузка, ход мог записать в кеш более новую партию
+        game_cache.put([game], loaded_at=loaded_at)
+    return game
+
+def _coordinates_error(game: BitboardTicTacToe) -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail=f"Неверные координаты. Допустимые значения: строка 0-{game.rows - 1}, столбец 0-{game.cols - 1}"
+    )
+
+async def _apply_move_atomic(game_id: str, row: int, col: int) -> Optional[BitboardTicTacToe]:
+    """Ход игрока одним атомарным скриптом в Redis
+
+    Возвращает партию после хода; None - скрипт неприменим (партии нет в
+    Redis, старый формат записи, Redis недоступен), ход делается как обычно.
+    """
+    storage = await _redis_storage()
+    if storage is None:
+        return None
+    for attempt in range(2):
+        try:
+            result, game = await storage.apply_move(game_id, row, col)
+        except Exception as e:
+            logger.warning(f"Атомарный ход в Redis не удался, используем обычный путь: {e}")
+            return None
+        if result != MOVE_AI_TURN or attempt:
+            break
+        await _finish_ai_turn(game)
+    if result == MOVE_APPLIED:
+        game_cache.put([game])
+        return game
+    if result == MOVE_BAD_CELL:
+        raise _coordinates_error(game)
+    if result == MOVE_FINISHED:
+        raise HTTPException(status_code=400, detail="Игра уже завершена")
+    if result == MOVE_OCCUPIED:
+        raise HTTPException(status_code=400, detail="Клетка уже занята")
+    if result in (MOVE_NOT_YOUR_TURN, MOVE_AI_TURN):
+        raise HTTPException(status_code=409, detail="Дождитесь хода компьютера")
     return None
 
+async def _finish_ai_turn(game: BitboardTicTacToe):
+    """Досчитать ответ AI, который не сохранил упавший или прерванный запрос"""
+    logger.warning("Ход AI не был сохранен, считаем его заново", extra={"game_id": game.game_id})
+    uow = GameUnitOfWork(_save_games)
+    ai_move = await compute_ai_move(game)
+    if ai_move:
+        game.make_move(ai_move[0], ai_move[1], 'O')
+        if game.check_winner() == 'O' or game.is_draw():
+            game.status = 'finished'
+    game.current_player = 'X'
+    uow.add(game)
+    await uow.commit()
+
+def _return_turn_to_player(game: BitboardTicTacToe, uow: GameUnitOfWork):
+    """После атомарного хода в записи "ход AI": возвращаем ход игроку"""
+    if game.current_player != 'X':
+        game.current_player = 'X'
+        uow.add(game)
+
 @router.post("/game/start", response_model=GameResponse)
 @limiter.limit("20/minute")
-async def start_game(request: Request):
+async def start_game(request: Request, start_request: Optional[StartGameRequest] = None):
     """Начать новую игру"""
+    mode = start_request.mode if start_request else DEFAULT_MODE
+    difficulty = start_request.difficulty if start_request else DEFAULT_DIFFICULTY
+    if mode not in GAME_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Неизвестный режим игры. Доступные режимы: {', '.join(GAME_MODES)}"
+        )
+    if difficulty not in DIFFICULTY_LEVELS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Неизвестный уровень сложности. Доступные уровни: {', '.join(DIFFICULTY_LEVELS)}"
+        )
+    
     try:
-        game = TicTacToe()
+        game = create_game(mode)
+        game.difficulty = difficulty
         await _save_game(game)
         logger.info(
             f"Новая игра создана: {game.game_id}",
-            extra={"game_id": game.game_id}
+            extra={"game_id": game.game_id, "mode": mode, "difficulty": difficulty}
         )
         
         return GameResponse(
@@ -89,6 +236,14 @@ async def start_game(request: Request):
 @limiter.limit("60/minute")
 async def make_move(request: Request, move_request: MoveRequest):
     """Ход игрока"""
+    # Повторный или параллельный ход в ту же партию ждет завершения текущего
+    async with game_locks.hold(move_request.game_id):
+        return await _make_move(move_request)
+
+async def _make_move(move_request: MoveRequest):
+    # Все изменения партии за запрос пишутся в хранилище одним сбросом
+    uow = GameUnitOfWork(_save_games)
+    applied = False  # Ход игрока сделан: при ошибке его нужно сохранить
     try:
         # Валидация входных данных
         if not move_request.game_id:
@@ -97,25 +252,35 @@ async def make_move(request: Request, move_request: MoveRequest):
         if move_request.row is None or move_request.col is None:
             raise HTTPException(status_code=400, detail="row и col обязательны")
         
-        if move_request.row < 0 or move_request.row >= 5 or move_request.col < 0 or move_request.col >= 5:
-            raise HTTPException(status_code=400, detail="Неверные координаты. Допустимые значения: 0-4")
+        game = None
+        # В режиме write-behind запись в Redis может отставать от кеша
+        if USE_REDIS and ATOMIC_MOVES and not game_cache.write_behind:
+            game = await _apply_move_atomic(move_request.game_id, move_request.row, move_request.col)
+            applied = game is not None
         
-        game = await _get_game(move_request.game_id)
         if game is None:
-            raise HTTPException(status_code=404, detail="Игра не найдена")
-        
-        # Проверка статуса игры
-        if game.status != 'playing':
-            raise HTTPException(status_code=400, detail="Игра уже завершена")
-        
-        # Ход игрока (X)
-        result = game.make_move(move_request.row, move_request.col, 'X')
-        
-        if not result['success']:
-            raise HTTPException(status_code=400, detail=result['message'])
+            game = await _get_game(move_request.game_id, shared=False)
+            if game is None:
+                raise HTTPException(status_code=404, detail="Игра не найдена")
+            
+            if not (0 <= move_request.row < game.rows and 0 <= move_request.col < game.cols):
+                raise _coordinates_error(game)
+            
+            # Проверка статуса игры
+            if game.status != 'playing':
+                raise HTTPException(status_code=400, detail="Игра уже завершена")
+            
+            # Ход игрока (X)
+            result = game.make_move(move_request.row, move_request.col, 'X')
+            
+            if not result['success']:
+                raise HTTPException(status_code=400, detail=result['message'])
+            
+            uow.add(game)
+            applied = True
         
-        # Сохраняем изменения
-        await _save_game(game)
+        # Ход сделан: фоновый расчет ответов больше не нужен, готовые берем из кеша
+        cancel_pondering(game.game_id)
         
         logger.info(
             f"Ход игрока",
@@ -129,6 +294,9 @@ async def make_move(request: Request, move_request: MoveRequest):
         raise
     except Exception as e:
         logger.error(f"Ошибка при обработке хода: {e}", exc_info=True)
+        if applied:
+            _return_turn_to_player(game, uow)
+            await uow.commit()  # Ход игрока уже сделан, не теряем его
         raise HTTPException(
             status_code=500,
             detail="Не удалось обработать ход. Попробуйте позже."
@@ -140,7 +308,7 @@ async def make_move(request: Request, move_request: MoveRequest):
         if winner == 'X':  # Игрок выиграл
             game.status = 'finished'
             promocode = generate_promocode()
-            await _save_game(game)  # Сохраняем финальное состояние
+            await uow.commit()  # Финальное состояние сохраняем до уведомления
             
             # Отправка уведомления в Telegram при победе
             print(f"[Routes] Victory! Chat ID in request: {move_request.chat_id}")
@@ -170,7 +338,7 @@ async def make_move(request: Request, move_request: MoveRequest):
     
         if game.is_draw():
             game.status = 'finished'
-            await _save_game(game)  # Сохраняем финальное состояние
+            await uow.commit()  # Финальное состояние сохраняем до уведомления
             
             # Отправка уведомления в Telegram при ничьей
             if move_request.chat_id:
@@ -193,12 +361,13 @@ async def make_move(request: Request, move_request: MoveRequest):
         
         # Ход AI (O)
         try:
-            ai = AIPlayer()
-            ai_move = ai.get_best_move(game)
+            # Ход считается в пуле, event loop в это время обслуживает другие запросы
+            ai_move = await compute_ai_move(game)
             if ai_move:
                 # AI делает ход как 'O'
                 game.make_move(ai_move[0], ai_move[1], 'O')
-                await _save_game(game)  # Сохраняем состояние после хода AI
+                game.current_player = 'X'
+                uow.add(game)
                 
                 logger.info(
                     f"Ход AI",
@@ -213,7 +382,7 @@ async def make_move(request: Request, move_request: MoveRequest):
                 winner = game.check_winner()
                 if winner == 'O':  # AI выиграл
                     game.status = 'finished'
-                    await _save_game(game)  # Сохраняем финальное состояние
+                    await uow.commit()  # Финальное состояние сохраняем до уведомления
                     
                     # Отправка уведомления в Telegram при проигрыше
                     print(f"[Routes] AI Victory! Chat ID in request: {move_request.chat_id}")
@@ -238,7 +407,7 @@ async def make_move(request: Request, move_request: MoveRequest):
                 
                 if game.is_draw():
                     game.status = 'finished'
-                    await _save_game(game)  # Сохраняем финальное состояние
+                    await uow.commit()  # Финальное состояние сохраняем до уведомления
                     
                     print(f"[Routes] Draw! Chat ID in request: {move_request.chat_id}")
                     if move_request.chat_id:
@@ -263,7 +432,10 @@ async def make_move(request: Request, move_request: MoveRequest):
             logger.error(f"Ошибка при ходе AI: {e}", exc_info=True)
             # Продолжаем игру, даже если AI не смог сделать ход
         
-        await _save_game(game)  # Сохраняем текущее состояние
+        _return_turn_to_player(game, uow)
+        await uow.commit()  # Сохраняем текущее состояние
+        # Пока игрок думает, считаем ответы на его возможные ходы
+        start_pondering(game)
         
         return GameResponse(
             game_id=game.game_id,
@@ -274,6 +446,8 @@ async def make_move(request: Request, move_request: MoveRequest):
         raise
     except Exception as e:
         logger.error(f"Неожиданная ошибка при обработке хода: {e}", exc_info=True)
+        _return_turn_to_player(game, uow)
+        await uow.commit()  # Ход игрока уже сделан, не теряем его
         raise HTTPException(
             status_code=500,
             detail="Не удалось обработать ход. Попробуйте позже."
@@ -313,17 +487,17 @@ async def get_game_status(request: Request, game_id: str):
 async def link_telegram(request: LinkRequest):
     """Привязать Telegram chat_id к временному токену"""
     try:
-        if USE_REDIS:
+        storage = await _primary_storage()
+        if storage is not None:
             try:
-                storage = await get_storage()
-                await storage.save_link_token(request.token, request.chat_id)
-                logger.info(f"Telegram привязан (Redis): {request.token} -> {request.chat_id}")
-                return {"status": "ok"}
+                if await storage.save_link_token(request.token, request.chat_id):
+                    logger.info(f"Telegram привязан ({STORAGE_BACKEND}): {request.token} -> {request.chat_id}")
+                    return {"status": "ok"}
             except Exception as e:
-                logger.warning(f"Ошибка Redis при привязке, используем fallback: {e}")
+                logger.warning(f"Ошибка {STORAGE_BACKEND} при привязке, используем fallback: {e}")
         
-        # Fallback или если Redis отключен
-        active_tokens_fallback[request.token] = request.chat_id
+        # Fallback или если основное хранилище - память
+        await memory_storage.save_link_token(request.token, request.chat_id)
         logger.info(f"Telegram привязан (Fallback): {request.token} -> {request.chat_id}")
         return {"status": "ok"}
     except Exception as e:
@@ -334,18 +508,18 @@ async def link_telegram(request: LinkRequest):
 async def check_link(token: str):
     """Проверить, привязан ли Telegram к токену"""
     try:
-        if USE_REDIS:
+        storage = await _primary_storage()
+        if storage is not None:
             try:
-                storage = await get_storage()
                 chat_id = await storage.get_chat_id_by_token(token)
                 if chat_id:
                     return LinkResponse(chat_id=chat_id, linked=True)
             except Exception as e:
-                logger.warning(f"Ошибка Redis при проверке, пробуем fallback: {e}")
+                logger.warning(f"Ошибка {STORAGE_BACKEND} при проверке, пробуем fallback: {e}")
         
         # Проверка в fallback
-        if token in active_tokens_fallback:
-            chat_id = active_tokens_fallback[token]
+        chat_id = await memory_storage.get_chat_id_by_token(token)
+        if chat_id:
             return LinkResponse(chat_id=chat_id, linked=True)
             
         return LinkResponse(linked=False)
@@ -0,0 +1,223 @@
+"""
+Выполнение ходов AI вне event loop
+
+Поиск уровня hard может занимать десятки миллисекунд, поэтому в async
+обработчике его нельзя вызывать напрямую: на это время встанут все
+запросы воркера, включая /health и /metrics. Ход считается в пуле
+процессов (или потоков для дешевых уровней) через run_in_executor,
+а в пул передается только компактное состояние поля.
+
+Уровни с деревом поиска между ходами (MCTS) считаются в "липком" пуле:
+партия всегда попадает в один и тот же процесс, где лежит ее дерево.
+Его процессы берутся из того же бюджета AI_POOL_SIZE: на воркер uvicorn
+приходится AI_POOL_SIZE процессов AI (но не меньше одного на пул).
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+import zlib
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, List, NamedTuple, Optional, Tuple
+from app.game.ai import AIPlayer
+from app.game.bitboard import BitboardTicTacToe, BoardState
+from app.game.opening_book import get_opening_book
+from app.game.tablebase import get_tablebase
+from app.storage.ai_cache import get_ai_cache
+from app.storage.ponder_cache import get_ponder_cache
+from app.core.metrics import (
+    AI_MOVE_SECONDS, AI_SEARCH_DEPTH, AI_SEARCH_NODES,
+    AI_POOL_SIZE, AI_POOL_IN_FLIGHT, AI_POOL_WAIT_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Режим выполнения: inline (в event loop), thread или process
+AI_EXECUTOR = os.getenv("AI_EXECUTOR", "process").lower()
+AI_POOL_WORKERS = int(os.getenv("AI_POOL_SIZE", os.cpu_count() or 1))
+# Уровни, которые дешевле посчитать в потоке, чем гонять в другой процесс.
+# Только эвристика: unbeatable без таблицы для режима (five, gomoku) уходит
+# в поиск negamax, который в потоке держал бы GIL и event loop
+AI_THREAD_LEVELS = {
+    level.strip() for level in os.getenv("AI_THREAD_LEVELS", "normal").split(",") if level.strip()
+}
+# Уровни, которым нужен один и тот же процесс на всю партию
+AI_STICKY_LEVELS = {
+    level.strip() for level in os.getenv("AI_STICKY_LEVELS", "expert").split(",") if level.strip()
+}
+# Сколько процессов из AI_POOL_SIZE отдать липкому пулу (по умолчанию четверть)
+AI_STICKY_POOL_SIZE = os.getenv("AI_STICKY_POOL_SIZE")
+
+
+class AIMoveResult(NamedTuple):
+    """Ход AI и статистика его вычисления"""
+    move: Optional[Tuple[int, int]]
+    depth: Optional[int]  # None, если поиск не использовался
+    nodes: Optional[int]
+    started_at: float  # time.time() начала вычисления (для времени ожидания в очереди)
+    compute_seconds: float
+
+
+def compute_move(state: BoardState, difficulty: str, game_id: Optional[str] = None) -> AIMoveResult:
+    """Посчитать ход по компактному состоянию (выполняется в пуле)"""
+    started_at = time.time()
+    started = time.perf_counter()
+    game = BitboardTicTacToe.from_state(state)
+    if game_id is not None:
+        game.game_id = game_id  # По нему MCTS находит дерево партии
+    ai = AIPlayer(difficulty)
+    move = ai.get_best_move(game)
+    depth = ai.last_search.depth if ai.last_search else None
+    nodes = ai.last_search.nodes if ai.last_search else None
+    return AIMoveResult(move, depth, nodes, started_at, time.perf_counter() - started)
+
+
+def init_worker():
+    """Отобразить в память книгу дебютов и таблицу идеальной игры"""
+    get_opening_book()
+    get_tablebase()
+
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_thread_pool: Optional[ThreadPoolExecutor] = None
+_sticky_pools: List[ProcessPoolExecutor] = []
+# Ходы игроков, которые сейчас считаются в пулах: фоновые задачи их пропускают
+_foreground_moves = 0
+_foreground_idle: Optional[asyncio.Event] = None
+
+
+def _new_process_pool(workers: int) -> ProcessPoolExecutor:
+    # spawn: не копируем в воркеры состояние event loop и открытые сокеты
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+    )
+
+
+def _pool_budget() -> Tuple[int, int]:
+    """Число процессов основного и липкого пулов в пределах AI_POOL_WORKERS"""
+    if not AI_STICKY_LEVELS:
+        return AI_POOL_WORKERS, 0
+    sticky = int(AI_STICKY_POOL_SIZE) if AI_STICKY_POOL_SIZE else AI_POOL_WORKERS // 4
+    sticky = min(max(1, sticky), max(1, AI_POOL_WORKERS - 1))
+    return max(1, AI_POOL_WORKERS - sticky), sticky
+
+
+def _get_executor(difficulty: str, game_id: str) -> Tuple[str, Optional[Executor]]:
+    """Пул для уровня сложности и его имя для метрик (None - считать прямо в event loop)"""
+    global _process_pool, _thread_pool
+    if AI_EXECUTOR == "inline":
+        return "inline", None
+    if AI_EXECUTOR == "thread" or difficulty in AI_THREAD_LEVELS:
+        if _thread_pool is None:
+            _thread_pool = ThreadPoolExecutor(max_workers=AI_POOL_WORKERS, thread_name_prefix="ai")
+            AI_POOL_SIZE.labels(pool="thread").set(AI_POOL_WORKERS)
+        return "thread", _thread_pool
+    if difficulty in AI_STICKY_LEVELS:
+        if not _sticky_pools:
+            _sticky_pools.extend(_new_process_pool(1) for _ in range(_pool_budget()[1]))
+            AI_POOL_SIZE.labels(pool="sticky").set(len(_sticky_pools))
+            logger.info(f"Запущен липкий пул процессов AI: {len(_sticky_pools)}")
+        return "sticky", _sticky_pools[zlib.crc32(game_id.encode()) % len(_sticky_pools)]
+    if _process_pool is None:
+        workers = _pool_budget()[0]
+        _process_pool = _new_process_pool(workers)
+        AI_POOL_SIZE.labels(pool="process").set(workers)
+        logger.info(f"Запущен пул процессов AI: {workers}")
+    return "process", _process_pool
+
+
+def _abandoned(callback: Callable[[AIMoveResult], None], future: Future):
+    if not future.cancelled() and future.exception() is None:
+        callback(future.result())
+
+
+async def run_compute_move(state: BoardState, difficulty: str, game_id: str,
+                           on_abandoned: Optional[Callable[[AIMoveResult], None]] = None) -> AIMoveResult:
+    """Посчитать ход в пуле для уровня сложности (без кешей и метрик хода)
+
+    Отмена ожидания не останавливает уже начатое вычисление: пул его
+    досчитает, и результат уйдет в on_abandoned (из потока пула).
+    """
+    pool, executor = _get_executor(difficulty, game_id)
+    if executor is None:
+        return compute_move(state, difficulty, game_id)
+
+    submitted_at = time.time()
+    in_flight = AI_POOL_IN_FLIGHT.labels(pool=pool)
+    in_flight.inc()
+    try:
+        future = executor.submit(compute_move, state, difficulty, game_id)
+    except Exception:
+        in_flight.dec()
+        raise
+    # Задача занимает пул, пока не досчитана, даже если ее уже не ждут
+    future.add_done_callback(lambda done: in_flight.dec())
+    try:
+        result = await asyncio.wrap_future(future)
+    except asyncio.CancelledError:
+        if on_abandoned is not None:
+            future.add_done_callback(partial(_abandoned, on_abandoned))
+        raise
+    AI_POOL_WAIT_SECONDS.observe(max(0.0, result.started_at - submitted_at))
+    return result
+
+
+async def wait_foreground_idle():
+    """Дождаться, пока в пулах не останется ходов игроков (для фоновых задач)"""
+    while _foreground_moves:
+        await _foreground_idle.wait()
+
+
+async def compute_ai_move(game: BitboardTicTacToe) -> Optional[Tuple[int, int]]:
+    """Получить ход AI, не блокируя event loop"""
+    # Ответ мог быть посчитан заранее, пока игрок думал
+    pondered = get_ponder_cache().take(game)
+    if pondered is not None and pondered in game.get_empty_cells():
+        return pondered
+
+    cache = get_ai_cache()
+    cached = await cache.get(game)
+    if cached is not None and cached in game.get_empty_cells():
+        return cached
+
+    global _foreground_moves, _foreground_idle
+    difficulty = game.difficulty
+    if not _foreground_moves:
+        _foreground_idle = asyncio.Event()
+    _foreground_moves += 1
+    try:
+        result = await run_compute_move(game.to_state(), difficulty, game.game_id)
+    finally:
+        _foreground_moves -= 1
+        if not _foreground_moves:
+            _foreground_idle.set()
+
+    AI_MOVE_SECONDS.labels(difficulty).observe(result.compute_seconds)
+    if result.depth is not None:
+        AI_SEARCH_DEPTH.labels(difficulty).observe(result.depth)
+        AI_SEARCH_NODES.labels(difficulty).observe(result.nodes)
+    if result.move is not None:
+        await cache.put(game, result.move)
+    return result.move
+
+
+def shutdown_ai_executor():
+    """Остановить пулы (при завершении приложения)"""
+    global _process_pool, _thread_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+        AI_POOL_SIZE.labels(pool="process").set(0)
+    if _thread_pool is not None:
+        _thread_pool.shutdown(wait=False, cancel_futures=True)
+        _thread_pool = None
+        AI_POOL_SIZE.labels(pool="thread").set(0)
+    if _sticky_pools:
+        for pool in _sticky_pools:
+            pool.shutdown(wait=False, cancel_futures=True)
+        _sticky_pools.clear()
+        AI_POOL_SIZE.labels(pool="sticky").set(0)
@@ -0,0 +1,67 @@
+"""
+Circuit breaker для внешних зависимостей (Redis)
+
+Пока зависимость отвечает, breaker закрыт (closed) и считает ошибки
+подряд. После failure_threshold ошибок он размыкается (open): запросы
+сразу идут в fallback, не дожидаясь таймаутов. Владелец breaker'а в это
+время проверяет зависимость в фоне и при успехе переводит его в
+half-open: запросы снова пропускаются, первый успешный замыкает breaker,
+первая ошибка снова размыкает. Если фоновой проверки нет, half-open
+наступает сам через reset_timeout.
+"""
+import logging
+import time
+from app.core.metrics import CIRCUIT_STATE, CIRCUIT_TRANSITIONS
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATES = (CLOSED, HALF_OPEN, OPEN)  # Значение метрики - индекс состояния
+
+
+class CircuitBreaker:
+    """Состояние зависимости: пропускать ли к ней запросы"""
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0  # Ошибки подряд
+        self.opened_at = 0.0
+        self.state = CLOSED
+        CIRCUIT_STATE.labels(dependency=name).set(STATES.index(CLOSED))
+
+    def _set_state(self, state: str):
+        if state == self.state:
+            return
+        logger.warning(f"Circuit breaker {self.name}: {self.state} -> {state}")
+        self.state = state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+        CIRCUIT_STATE.labels(dependency=self.name).set(STATES.index(state))
+        CIRCUIT_TRANSITIONS.labels(dependency=self.name, state=state).inc()
+
+    def allow_request(self) -> bool:
+        """Можно ли обращаться к зависимости"""
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._set_state(HALF_OPEN)
+        return self.state != OPEN
+
+    def record_success(self):
+        self.failures = 0
+        self._set_state(CLOSED)
+
+    def record_failure(self) -> bool:
+        """Учесть ошибку; True - breaker только что разомкнулся"""
+        self.failures += 1
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+            self._set_state(OPEN)
+            return True
+        return False
+
+    def half_open(self):
+        """Фоновая проверка прошла: пропустить пробные запросы"""
+        if self.state == OPEN:
+            self._set_state(HALF_OPEN)
@@ -0,0 +1,174 @@
+"""
+Prometheus метрики приложения
+
+HTTP-метрики собирает Instrumentator в main.py, здесь - доменные.
+"""
+from prometheus_client import Counter, Gauge, Histogram
+
+AI_MOVE_SECONDS = Histogram(
+    "ai_move_seconds",
+    "Время вычисления хода AI",
+    ["difficulty"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.015, 0.02, 0.05, 0.1, 0.25, 1.0),
+)
+
+AI_SEARCH_DEPTH = Histogram(
+    "ai_search_depth",
+    "Глубина, полностью просчитанная поиском AI",
+    ["difficulty"],
+    buckets=(0, 1, 2, 3, 4, 5, 6, 7, 8, 10, 12),
+)
+
+AI_SEARCH_NODES = Histogram(
+    "ai_search_nodes",
+    "Число позиций, просмотренных поиском AI за ход",
+    ["difficulty"],
+    buckets=(10, 100, 500, 1000, 2500, 5000, 10000, 25000, 50000),
+)
+
+AI_POOL_SIZE = Gauge(
+    "ai_pool_size",
+    "Число воркеров в пуле вычисления ходов AI (process, thread, sticky)",
+    ["pool"],
+)
+
+AI_POOL_IN_FLIGHT = Gauge(
+    "ai_pool_in_flight_tasks",
+    "Задачи AI в пуле: ждущие в очереди и выполняющиеся",
+    ["pool"],
+)
+
+AI_POOL_WAIT_SECONDS = Histogram(
+    "ai_pool_wait_seconds",
+    "Время ожидания задачи AI в очереди пула до начала вычисления",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+
+AI_CACHE_REQUESTS = Counter(
+    "ai_cache_requests_total",
+    "Обращения к кешу ходов AI по уровням кеша",
+    ["tier", "result"],
+)
+
+AI_PONDER_LOOKUPS = Counter(
+    "ai_ponder_lookups_total",
+    "Поиск хода AI среди заранее посчитанных ответов (pondering)",
+    ["result"],
+)
+
+AI_PONDER_CPU_SECONDS = Counter(
+    "ai_ponder_cpu_seconds_total",
+    "Время вычисления ответов pondering: использованных и выброшенных",
+    ["outcome"],
+)
+
+AI_PONDER_TASKS = Gauge(
+    "ai_ponder_tasks",
+    "Фоновые задачи pondering воркера (ожидающие и выполняющиеся)",
+)
+
+STORAGE_WRITES = Counter(
+    "storage_writes_total",
+    "Записи партий в хранилище (один сброс единицы работы - одна запись)",
+    ["backend"],
+)
+
+REDIS_POOL_MAX_CONNECTIONS = Gauge(
+    "redis_pool_max_connections",
+    "Размер пула соединений с Redis",
+    ["node"],
+)
+
+REDIS_POOL_IN_USE = Gauge(
+    "redis_pool_in_use_connections",
+    "Соединения с Redis, занятые командами",
+    ["node"],
+)
+
+REDIS_POOL_WAIT_SECONDS = Histogram(
+    "redis_pool_wait_seconds",
+    "Время получения соединения из пула Redis (ожидание и подключение)",
+    ["node"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 2.0),
+)
+
+REDIS_GAME_WRITES = Counter(
+    "redis_game_writes_total",
+    "Записи партий в Redis: full - вся запись (SETEX), delta - только изменения (BITFIELD в Lua-скрипте)",
+    ["kind"],
+)
+
+CIRCUIT_STATE = Gauge(
+    "circuit_breaker_state",
+    "Состояние circuit breaker: 0 - closed, 1 - half_open, 2 - open",
+    ["dependency"],
+)
+
+CIRCUIT_TRANSITIONS = Counter(
+    "circuit_breaker_transitions_total",
+    "Переходы circuit breaker по новому состоянию",
+    ["dependency", "state"],
+)
+
+MEMORY_STORE_ENTRIES = Gauge(
+    "memory_store_entries",
+    "Записи в хранилище в памяти воркера",
+    ["store"],
+)
+
+MEMORY_STORE_BYTES = Gauge(
+    "memory_store_bytes",
+    "Примерный объем хранилища в памяти воркера",
+    ["store"],
+)
+
+MEMORY_STORE_EVICTIONS = Counter(
+    "memory_store_evictions_total",
+    "Записи, вытесненные из хранилища в памяти: истекшие и сверх лимитов",
+    ["store", "reason"],
+)
+
+GAME_CACHE_REQUESTS = Counter(
+    "game_cache_requests_total",
+    "Чтения партий через кеш воркера",
+    ["result"],
+)
+
+GAME_CACHE_ENTRIES = Gauge(
+    "game_cache_entries",
+    "Партии в кеше воркера",
+)
+
+GAME_CACHE_DIRTY = Gauge(
+    "game_cache_dirty_entries",
+    "Партии в кеше воркера, еще не записанные в хранилище (write-behind)",
+)
+
+GAME_CACHE_FLUSH_SECONDS = Histogram(
+    "game_cache_flush_seconds",
+    "Время записи накопленных партий из кеша в хранилище",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+
+SINGLE_FLIGHT_DEDUPLICATED = Counter(
+    "single_flight_deduplicated_total",
+    "Вызовы, дождавшиеся уже идущего вызова с тем же ключом (например, загрузки партии)",
+    ["name"],
+)
+
+GAME_LOCK_CONTENDED = Counter(
+    "game_lock_contended_total",
+    "Запросы хода, ждавшие завершения другого запроса к той же партии",
+)
+
+SQLITE_COMMIT_WRITES = Histogram(
+    "sqlite_commit_writes",
+    "Записей в одной транзакции SQLite (пачка одновременных сохранений)",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+
+SQLITE_COMMIT_SECONDS = Histogram(
+    "sqlite_commit_seconds",
+    "Время коммита пачки записей в SQLite",
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5),
+)
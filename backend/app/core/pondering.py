@@ -0,0 +1,125 @@
+"""
+Pondering: ответы AI, посчитанные во время раздумий игрока
+
+После хода AI партия простаивает, пока игрок думает. Если pondering
+включен, в фоне считается ответ AI на каждый возможный ход игрока (на
+больших полях - на ближайшие к камням клетки) и складывается в
+короткоживущий кеш (app.storage.ponder_cache). Когда ход игрока
+приходит, фоновая задача партии отменяется, а ответ берется из кеша.
+
+Pondering не должен отнимать пул у настоящих ходов: фоновых вычислений
+в воркере не больше половины пула, и новое не отправляется, пока в пуле
+считается ход игрока. Отмена задачи не останавливает вычисление, уже
+отправленное в пул: его время тоже учитывается как потраченное зря.
+"""
+import asyncio
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+from app.game.bitboard import BitboardTicTacToe, BoardState, bit_indexes
+from app.game.evaluation import ThreatEvaluator, O_SIDE
+from app.game.search import get_cell_weights, get_neighbor_masks
+from app.core.ai_executor import AI_POOL_WORKERS, AIMoveResult, run_compute_move, wait_foreground_idle
+from app.storage.ponder_cache import PonderedReply, get_ponder_cache
+from app.core.metrics import AI_PONDER_TASKS, AI_PONDER_CPU_SECONDS
+
+logger = logging.getLogger(__name__)
+
+AI_PONDER = os.getenv("AI_PONDER", "false").lower() == "true"
+# Только уровни без состояния между ходами: дерево MCTS (expert) должно
+# идти за реальными ходами партии, а не за предполагаемыми
+AI_PONDER_LEVELS = {
+    level.strip() for level in os.getenv("AI_PONDER_LEVELS", "hard").split(",") if level.strip()
+}
+# Не больше половины пула: ход игрока всегда найдет свободный процесс
+AI_PONDER_CONCURRENCY = int(os.getenv("AI_PONDER_CONCURRENCY", max(1, AI_POOL_WORKERS // 2)))
+# Сколько ходов игрока просчитывать на партию (на 5x5 это все ходы)
+AI_PONDER_MAX_REPLIES = int(os.getenv("AI_PONDER_MAX_REPLIES", 24))
+
+_tasks: Dict[str, asyncio.Task] = {}
+_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(AI_PONDER_CONCURRENCY)
+    return _semaphore
+
+
+def candidate_moves(game: BitboardTicTacToe, limit: int = AI_PONDER_MAX_REPLIES) -> List[Tuple[int, int]]:
+    """Вероятные ходы игрока: сначала блоки угроз AI, затем по весу клетки"""
+    geometry = game.geometry
+    occupied = game.x_bits | game.o_bits
+    free = ~occupied & geometry.full_mask
+    if occupied and bin(free).count('1') > limit:
+        # На больших полях игрок почти всегда ходит рядом с камнями
+        near = 0
+        neighbors = get_neighbor_masks(geometry)
+        for index in bit_indexes(occupied):
+            near |= neighbors[index]
+        free &= near
+    blocks = ThreatEvaluator.from_game(game).winning_cells(O_SIDE)
+    weights = get_cell_weights(geometry)
+    moves = sorted(bit_indexes(free), key=lambda index: (not blocks >> index & 1, -weights[index]))
+    return [divmod(index, game.cols) for index in moves[:limit]]
+
+
+def _wasted(result: AIMoveResult):
+    """Ответ досчитан после отмены задачи: в кеш он уже не попадет"""
+    AI_PONDER_CPU_SECONDS.labels("wasted").inc(result.compute_seconds)
+
+
+async def _ponder(game_id: str, state: BoardState, difficulty: str):
+    """Посчитать ответы AI на вероятные ходы игрока"""
+    cache = get_ponder_cache()
+    game = BitboardTicTacToe.from_state(state)
+    for row, col in candidate_moves(game):
+        child = BitboardTicTacToe.from_state(state)
+        child.make_move(row, col, 'X')
+        if child.check_winner() or child.is_draw():
+            continue  # После такого хода AI ходить не будет
+        async with _get_semaphore():
+            await wait_foreground_idle()
+            result = await run_compute_move(child.to_state(), difficulty, game_id, on_abandoned=_wasted)
+        if result.move is None:
+            continue
+        reply = PonderedReply(result.move, result.compute_seconds)
+        if not cache.put(game_id, (child.x_bits, child.o_bits), reply):
+            return  # Ответы партии уже выброшены (истекли или вытеснены)
+
+
+def _forget(game_id: str, task: asyncio.Task):
+    if _tasks.get(game_id) is task:
+        del _tasks[game_id]
+        AI_PONDER_TASKS.set(len(_tasks))
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Ошибка pondering для игры {game_id}: {task.exception()}")
+
+
+def start_pondering(game: BitboardTicTacToe):
+    """Запустить фоновый расчет ответов после хода AI (если включен)"""
+    if not AI_PONDER or game.difficulty not in AI_PONDER_LEVELS or game.status != 'playing':
+        return
+    cancel_pondering(game.game_id)
+    get_ponder_cache().start(game.game_id)
+    task = asyncio.create_task(_ponder(game.game_id, game.to_state(), game.difficulty))
+    _tasks[game.game_id] = task
+    task.add_done_callback(lambda done: _forget(game.game_id, done))
+    AI_PONDER_TASKS.set(len(_tasks))
+
+
+def cancel_pondering(game_id: str):
+    """Остановить фоновый расчет партии: ход игрока уже пришел"""
+    task = _tasks.pop(game_id, None)
+    if task is not None:
+        task.cancel()
+        AI_PONDER_TASKS.set(len(_tasks))
+
+
+def shutdown_pondering():
+    """Отменить все фоновые расчеты (при завершении приложения)"""
+    for task in _tasks.values():
+        task.cancel()
+    _tasks.clear()
+    AI_PONDER_TASKS.set(0)
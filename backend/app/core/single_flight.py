@@ -0,0 +1,65 @@
+"""
+Склейка одновременных загрузок и блокировки по ключу
+
+SingleFlight: одновременные вызовы с одним ключом (опрос статуса и
+повтор хода одной партии) ждут один общий вызов и получают его результат
+вместо того, чтобы каждый раз ходить в Redis. KeyedLocks: asyncio.Lock на
+партию, чтобы изменения одной партии в воркере шли по очереди.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, Tuple, TypeVar
+from app.core.metrics import GAME_LOCK_CONTENDED, SINGLE_FLIGHT_DEDUPLICATED
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Один вызов на ключ среди одновременных"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        """Результат func(); если вызов с этим ключом уже идет - ждать его"""
+        task = self._calls.get(key)
+        if task is not None:
+            SINGLE_FLIGHT_DEDUPLICATED.labels(name=self.name).inc()
+        else:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        # Отмена одного ожидающего не отменяет общий вызов для остальных
+        return await asyncio.shield(task)
+
+
+class KeyedLocks:
+    """asyncio.Lock на ключ; блокировки без владельца и ожидающих удаляются"""
+
+    def __init__(self):
+        self._locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    @asynccontextmanager
+    async def hold(self, key: str):
+        lock, users = self._locks.get(key, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        elif lock.locked():
+            GAME_LOCK_CONTENDED.inc()
+        self._locks[key] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._locks[key]
+            if users == 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, users - 1)
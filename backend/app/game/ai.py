@@ -1,19 +1,105 @@
 """
 AI противника для игры "Крестики-нолики"
 """
+import os
 from app.game.logic import TicTacToe
-from typing import Optional, Tuple
+from app.game.bitboard import BitboardTicTacToe
+from app.game.search import NegamaxSearch, SearchResult, WIN_SCORE
+from app.game.evaluation import ThreatEvaluator
+from app.game.mcts import MonteCarloSearch, get_tree
+from app.game.opening_book import get_opening_book
+from app.game.tablebase import LOSS, WIN, get_tablebase
+from typing import Optional, Tuple, Union
+
+Game = Union[TicTacToe, BitboardTicTacToe]
+
+# Уровни сложности: normal - эвристика в один ход, hard - поиск negamax,
+# expert - MCTS с деревом, которое переживает ходы партии, unbeatable -
+# идеальная игра по таблице (вне таблицы - как hard)
+DIFFICULTY_LEVELS = ("normal", "hard", "expert", "unbeatable")
+DEFAULT_DIFFICULTY = "normal"
+
+# Ограничения поиска для уровня hard: глубина растет итеративно, пока
+# не кончится бюджет времени на ход или жесткий лимит узлов
+AI_SEARCH_DEPTH = int(os.getenv("AI_SEARCH_DEPTH", 8))
+AI_NODE_BUDGET = int(os.getenv("AI_NODE_BUDGET", 50000))
+AI_MOVE_BUDGET_MS = float(os.getenv("AI_MOVE_BUDGET_MS", 15))
 
 class AIPlayer:
     """AI игрок с умным алгоритмом"""
     
-    def __init__(self):
+    def __init__(self, difficulty: str = DEFAULT_DIFFICULTY):
+        if difficulty not in DIFFICULTY_LEVELS:
+            raise ValueError(f"Неизвестный уровень сложности: {difficulty}")
         self.symbol = 'O'  # AI всегда играет O
+        self.difficulty = difficulty
+        self.last_search: Optional[SearchResult] = None  # Статистика последнего поиска
+    
+    def get_best_move(self, game: Game) -> Optional[Tuple[int, int]]:
+        """Получить лучший ход для AI"""
+        if self.difficulty == "hard":
+            return self._search_move(game)
+        if self.difficulty == "expert":
+            return self._mcts_move(game)
+        if self.difficulty == "unbeatable":
+            return self._tablebase_move(game)
+        return self._heuristic_move(game)
+    
+    @staticmethod
+    def _as_bitboard(game: Game) -> BitboardTicTacToe:
+        """Поиск работает на битовых масках: классическую игру переводим"""
+        if isinstance(game, BitboardTicTacToe):
+            return game
+        bitboard = BitboardTicTacToe(game.rows, game.cols, game.win_length)
+        bitboard.board = game.board
+        bitboard.game_id = game.game_id
+        return bitboard
+    
+    def _search_move(self, game: Game) -> Optional[Tuple[int, int]]:
+        """Ход по результату поиска negamax"""
+        game = self._as_bitboard(game)
+        # Сначала книга дебютов: в начале партии ход - это поиск по таблице
+        book = get_opening_book()
+        if book is not None:
+            move = book.lookup(game)
+            if move is not None:
+                self.last_search = SearchResult(move, 0, 0, 0)  # Глубина 0 - ход из книги
+                return move
+        search = NegamaxSearch(AI_SEARCH_DEPTH, AI_NODE_BUDGET, AI_MOVE_BUDGET_MS)
+        self.last_search = search.search(game, self.symbol)
+        return self.last_search.move
     
-    def get_best_move(self, game: TicTacToe) -> Optional[Tuple[int, int]]:
-        """Получить лучший ход для AI (для поля 5x5)"""
-        size = game.BOARD_SIZE
-        center = size // 2
+    def _tablebase_move(self, game: Game) -> Optional[Tuple[int, int]]:
+        """Ход из таблицы идеальной игры"""
+        game = self._as_bitboard(game)
+        tablebase = get_tablebase()
+        entry = tablebase.lookup(game) if tablebase is not None and self.symbol == 'O' else None
+        if entry is None:
+            return self._search_move(game)
+        score = 0
+        if entry.result == WIN:
+            score = WIN_SCORE - entry.distance
+        elif entry.result == LOSS:
+            score = -WIN_SCORE + entry.distance
+        self.last_search = SearchResult(entry.move, score, 0, 0)
+        return entry.move
+    
+    def _mcts_move(self, game: Game) -> Optional[Tuple[int, int]]:
+        """Ход по MCTS; дерево партии сохраняется до следующего хода"""
+        game = self._as_bitboard(game)
+        tree = get_tree(game, self.symbol)
+        self.last_search = MonteCarloSearch().search(tree)
+        move = self.last_search.move
+        if move is not None:
+            tree.play(move[0] * game.cols + move[1])
+        return move
+    
+    def _heuristic_move(self, game: Game) -> Optional[Tuple[int, int]]:
+        """Эвристика в один ход"""
+        rows, cols = game.rows, game.cols
+        center = (rows // 2, cols // 2)
+        empty = game.get_empty_cells()
+        threats = ThreatEvaluator.from_game(game)
         
         # Стратегия:
         # 1. Попытаться выиграть
@@ -23,53 +109,44 @@ class AIPlayer:
         # 5. Любая доступная клетка
         
         # 1. Попытка выиграть
-        move = self._try_win(game)
+        move = self._try_win(threats)
         if move:
             return move
         
         # 2. Блокировка игрока
-        move = self._block_player(game)
+        move = self._block_player(threats)
         if move:
             return move
         
         # 3. Занять центр
-        if game.board[center][center] == '':
-            return (center, center)
+        if center in empty:
+            return center
         
         # 4. Занять углы
-        corners = [(0, 0), (0, size-1), (size-1, 0), (size-1, size-1)]
+        corners = [(0, 0), (0, cols-1), (rows-1, 0), (rows-1, cols-1)]
         for corner in corners:
-            if game.board[corner[0]][corner[1]] == '':
+            if corner in empty:
                 return corner
         
         # 5. Любая доступная клетка
-        empty = game.get_empty_cells()
         if empty:
             return empty[0]
         
         return None
     
-    def _try_win(self, game: TicTacToe) -> Optional[Tuple[int, int]]:
+    def _try_win(self, threats: ThreatEvaluator) -> Optional[Tuple[int, int]]:
         """Попытаться выиграть"""
-        return self._find_winning_move(game, self.symbol)
+        return self._find_winning_move(threats, self.symbol)
     
-    def _block_player(self, game: TicTacToe) -> Optional[Tuple[int, int]]:
+    def _block_player(self, threats: ThreatEvaluator) -> Optional[Tuple[int, int]]:
         """Блокировать победу игрока"""
-        return self._find_winning_move(game, 'X')
+        opponent = 'X' if self.symbol == 'O' else 'O'
+        return self._find_winning_move(threats, opponent)
     
-    def _find_winning_move(self, game: TicTacToe, symbol: str) -> Optional[Tuple[int, int]]:
-        """Найти ход, который приведет к победе (для поля 5x5)"""
-        size = game.BOARD_SIZE
-        for i in range(size):
-            for j in range(size):
-                if game.board[i][j] == '':
-                    # Пробуем сделать ход
-                    game.board[i][j] = symbol
-                    winner = game.check_winner()
-                    game.board[i][j] = ''  # Откатываем
-                    
-                    if winner == symbol:
-                        return (i, j)
-        
-        return None
+    def _find_winning_move(self, threats: ThreatEvaluator, symbol: str) -> Optional[Tuple[int, int]]:
+        """Найти ход, который приведет к победе (первый по порядку клеток)"""
+        cells = threats.winning_cells(0 if symbol == 'X' else 1)
+        if not cells:
+            return None
+        return divmod((cells & -cells).bit_length() - 1, threats.geometry.cols)
 
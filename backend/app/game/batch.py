@@ -0,0 +1,190 @@
+"""
+Пакетный симулятор партий на NumPy
+
+Тысячи полей хранятся одним массивом (партия x клетка), победа
+проверяется векторно по таблице линий, а стратегии AI выбирают ход
+сразу для всех партий. Используется офлайн: для настройки эвристик и
+оценки нагрузки. В API не импортируется.
+
+Запуск из каталога backend (NumPy ставится отдельно:
+pip install -r requirements-tools.txt):
+    python -m app.game.batch --games 100000 --x random --o random,heuristic
+"""
+import argparse
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+import numpy as np
+from app.game.ai import AIPlayer
+from app.game.bitboard import BitboardTicTacToe, BoardState, get_geometry
+from app.game.modes import DEFAULT_MODE, GAME_MODES
+
+EMPTY, X, O = 0, 1, -1
+
+
+def line_indexes(rows: int, cols: int, win_length: int) -> np.ndarray:
+    """Таблица линий: массив (число линий, win_length) с индексами клеток"""
+    lines = []
+    for mask in get_geometry(rows, cols, win_length).win_masks:
+        lines.append([index for index in range(rows * cols) if mask >> index & 1])
+    return np.array(lines, dtype=np.intp)
+
+
+class BatchGames:
+    """Пакет партий на одном поле"""
+
+    def __init__(self, count: int, rows: int = 5, cols: int = 5, win_length: int = 3):
+        self.rows = rows
+        self.cols = cols
+        self.win_length = win_length
+        self.lines = line_indexes(rows, cols, win_length)
+        self.cells = np.zeros((count, rows * cols), dtype=np.int8)
+        self.winner = np.zeros(count, dtype=np.int8)  # X, O или EMPTY
+        self.done = np.zeros(count, dtype=bool)
+
+    def apply(self, moves: np.ndarray, player: int):
+        """Сделать ходы player во всех незавершенных партиях"""
+        active = np.flatnonzero(~self.done)
+        self.cells[active, moves[active]] = player
+        self._update()
+
+    def _update(self):
+        """Векторная проверка победы и ничьей по суммам линий"""
+        sums = self.cells[:, self.lines].sum(axis=2, dtype=np.int16)
+        x_won = (sums == self.win_length).any(axis=1)
+        o_won = (sums == -self.win_length).any(axis=1)
+        full = (self.cells != EMPTY).all(axis=1)
+        fresh = ~self.done
+        self.winner[fresh & x_won] = X
+        self.winner[fresh & o_won] = O
+        self.done |= x_won | o_won | full
+
+    def to_state(self, index: int) -> BoardState:
+        """Компактное состояние одной партии (для скалярного движка)"""
+        x_bits = sum(1 << int(cell) for cell in np.flatnonzero(self.cells[index] == X))
+        o_bits = sum(1 << int(cell) for cell in np.flatnonzero(self.cells[index] == O))
+        return (self.rows, self.cols, self.win_length, x_bits, o_bits)
+
+    def winning_cells(self, player: int) -> np.ndarray:
+        """Маска (партия x клетка) ходов, сразу завершающих линию player"""
+        values = self.cells[:, self.lines]
+        own = (values == player).sum(axis=2)
+        empty = values == EMPTY
+        threats = (own == self.win_length - 1) & (empty.sum(axis=2) == 1)
+        # Единственная пустая клетка каждой линии-угрозы
+        positions = empty.argmax(axis=2)
+        cells = self.lines[np.arange(len(self.lines)), positions]
+        result = np.zeros(self.cells.shape, dtype=bool)
+        games, lines = np.nonzero(threats)
+        result[games, cells[games, lines]] = True
+        return result
+
+
+Policy = Callable[[BatchGames, int, np.random.Generator], np.ndarray]
+
+
+def random_policy(batch: BatchGames, player: int, rng: np.random.Generator) -> np.ndarray:
+    """Случайная пустая клетка"""
+    scores = rng.random(batch.cells.shape)
+    scores[batch.cells != EMPTY] = -1.0
+    return scores.argmax(axis=1)
+
+
+def heuristic_policy(batch: BatchGames, player: int, rng: np.random.Generator) -> np.ndarray:
+    """Векторная версия AIPlayer уровня normal
+
+    Приоритеты те же: выигрыш, блок, центр, углы, первая пустая клетка.
+    """
+    count, cells = batch.cells.shape
+    rows, cols = batch.rows, batch.cols
+    # Внутри уровня приоритета раньше идет клетка с меньшим индексом
+    order = np.arange(cells, 0, -1, dtype=np.int64)
+    scores = np.tile(order, (count, 1))
+
+    tier = cells + 1  # Разница между уровнями больше любого порядка внутри уровня
+    corners = [0, cols - 1, (rows - 1) * cols, rows * cols - 1]
+    for rank, corner in enumerate(corners):
+        scores[:, corner] = 1 * tier + (len(corners) - rank)
+    scores[:, (rows // 2) * cols + cols // 2] = 2 * tier
+    scores = np.where(batch.winning_cells(-player), 3 * tier + order, scores)
+    scores = np.where(batch.winning_cells(player), 4 * tier + order, scores)
+
+    scores[batch.cells != EMPTY] = -1
+    return scores.argmax(axis=1)
+
+
+def search_policy(batch: BatchGames, player: int, rng: np.random.Generator) -> np.ndarray:
+    """AIPlayer уровня hard по одной партии (не векторная, для сравнения)"""
+    ai = AIPlayer("hard")
+    ai.symbol = 'X' if player == X else 'O'
+    moves = np.zeros(len(batch.cells), dtype=np.intp)
+    for index in np.flatnonzero(~batch.done):
+        game = BitboardTicTacToe.from_state(batch.to_state(index))
+        move = ai.get_best_move(game)
+        moves[index] = move[0] * batch.cols + move[1]
+    return moves
+
+
+POLICIES: Dict[str, Policy] = {
+    "random": random_policy,
+    "heuristic": heuristic_policy,
+    "hard": search_policy,
+}
+
+
+class BatchStats(NamedTuple):
+    """Итоги пакета партий"""
+    games: int
+    x_wins: int
+    o_wins: int
+    draws: int
+    seconds: float
+
+    @property
+    def games_per_second(self) -> float:
+        return self.games / self.seconds if self.seconds else float("inf")
+
+
+def play_batch(count: int, x_policy: Policy, o_policy: Policy, rows: int = 5, cols: int = 5,
+               win_length: int = 3, seed: Optional[int] = None) -> BatchStats:
+    """Сыграть count партий x_policy (X, ходит первым) против o_policy (O)"""
+    rng = np.random.default_rng(seed)
+    started = time.perf_counter()
+    batch = BatchGames(count, rows, cols, win_length)
+    player, policy = X, x_policy
+    while not batch.done.all():
+        batch.apply(policy(batch, player, rng), player)
+        player, policy = (O, o_policy) if player == X else (X, x_policy)
+    elapsed = time.perf_counter() - started
+    return BatchStats(
+        games=count,
+        x_wins=int((batch.winner == X).sum()),
+        o_wins=int((batch.winner == O).sum()),
+        draws=int((batch.winner == EMPTY).sum()),
+        seconds=elapsed,
+    )
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Пакетная симуляция партий AI")
+    parser.add_argument("--games", type=int, default=100000, help="число партий на стратегию")
+    parser.add_argument("--mode", default=DEFAULT_MODE, choices=sorted(GAME_MODES))
+    parser.add_argument("--x", default="random", choices=sorted(POLICIES), help="стратегия X")
+    parser.add_argument("--o", default="random,heuristic",
+                        help=f"стратегии O через запятую: {', '.join(sorted(POLICIES))}")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    mode = GAME_MODES[args.mode]
+    print(f"Режим {mode.name}: {mode.rows}x{mode.cols}, {mode.win_length} в ряд; X = {args.x}")
+    print(f"{'O':<12}{'X побед':>10}{'O побед':>10}{'ничьих':>10}{'партий/с':>14}")
+    for name in [item.strip() for item in args.o.split(",") if item.strip()]:
+        if name not in POLICIES:
+            parser.error(f"неизвестная стратегия: {name}")
+        stats = play_batch(args.games, POLICIES[args.x], POLICIES[name],
+                           mode.rows, mode.cols, mode.win_length, args.seed)
+        print(f"{name:<12}{stats.x_wins / stats.games:>10.1%}{stats.o_wins / stats.games:>10.1%}"
+              f"{stats.draws / stats.games:>10.1%}{stats.games_per_second:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
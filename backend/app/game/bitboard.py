@@ -0,0 +1,272 @@
+"""
+Битборд-движок игры "Крестики-нолики"
+
+Камни каждого игрока хранятся в одном целом числе: бит row * cols + col
+выставлен, если клетка занята. Победа проверяется по заранее
+посчитанной таблице масок всех линий "K в ряд". Таблицы строятся один
+раз на каждую конфигурацию (rows, cols, win_length) и кешируются.
+"""
+import uuid
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Tuple
+
+# Компактное состояние позиции: (rows, cols, win_length, x_bits, o_bits)
+BoardState = Tuple[int, int, int, int, int]
+
+
+class BoardGeometry(NamedTuple):
+    """Кешируемая геометрия поля"""
+    rows: int
+    cols: int
+    win_length: int
+    win_masks: Tuple[int, ...]  # Маски всех выигрышных линий
+    cell_masks: Tuple[Tuple[int, ...], ...]  # Маски линий через каждую клетку
+    full_mask: int  # Все клетки поля
+
+
+def build_win_masks(rows: int, cols: int, win_length: int) -> Tuple[int, ...]:
+    """Построить маски всех выигрышных линий для поля rows x cols"""
+    masks = []
+    # Направления: строка, столбец, главная и побочная диагонали
+    for d_row, d_col in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        for row in range(rows):
+            for col in range(cols):
+                end_row = row + d_row * (win_length - 1)
+                end_col = col + d_col * (win_length - 1)
+                if not (0 <= end_row < rows and 0 <= end_col < cols):
+                    continue
+                mask = 0
+                for i in range(win_length):
+                    mask |= 1 << ((row + d_row * i) * cols + col + d_col * i)
+                masks.append(mask)
+    return tuple(masks)
+
+
+def build_cell_masks(cells: int, masks: Tuple[int, ...]) -> Tuple[Tuple[int, ...], ...]:
+    """Для каждого бита собрать маски линий, в которые он входит"""
+    cell_masks = [[] for _ in range(cells)]
+    for mask in masks:
+        bits = mask
+        while bits:
+            low = bits & -bits
+            cell_masks[low.bit_length() - 1].append(mask)
+            bits ^= low
+    return tuple(tuple(item) for item in cell_masks)
+
+
+def bit_indexes(mask: int) -> List[int]:
+    """Индексы выставленных битов, от младших к старшим"""
+    indexes = []
+    while mask:
+        low = mask & -mask
+        indexes.append(low.bit_length() - 1)
+        mask ^= low
+    return indexes
+
+
+@lru_cache(maxsize=None)
+def get_geometry(rows: int, cols: int, win_length: int) -> BoardGeometry:
+    """Получить (и закешировать) геометрию поля"""
+    if rows < 1 or cols < 1 or win_length < 1:
+        raise ValueError("Размеры поля и длина линии должны быть положительными")
+    if win_length > max(rows, cols):
+        raise ValueError("Длина линии больше размера поля")
+    masks = build_win_masks(rows, cols, win_length)
+    return BoardGeometry(
+        rows=rows,
+        cols=cols,
+        win_length=win_length,
+        win_masks=masks,
+        cell_masks=build_cell_masks(rows * cols, masks),
+        full_mask=(1 << (rows * cols)) - 1,
+    )
+
+
+class ReadOnlyList(list):
+    """Список только для чтения (поле партии)
+
+    Поле строится из битбордов при каждом обращении, поэтому запись в
+    клетку на месте молча потерялась бы; вместо этого она бросает TypeError.
+    Копия и pickle дают обычный список.
+    """
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Поле партии только для чтения: ход делается через make_move")
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+
+class BitboardTicTacToe:
+    """Игра на битовых масках с тем же API, что и TicTacToe
+
+    Как и в TicTacToe, победитель и число пустых клеток обновляются
+    в make_move только по линиям через поставленный камень.
+    """
+
+    BOARD_SIZE = 5  # Размер поля по умолчанию 5x5
+    WIN_LENGTH = 3  # Для победы по умолчанию нужно 3 в ряд
+
+    def __init__(self, rows: int = BOARD_SIZE, cols: int = BOARD_SIZE,
+                 win_length: int = WIN_LENGTH, game_id: Optional[str] = None):
+        self.geometry = get_geometry(rows, cols, win_length)
+        self.rows = rows
+        self.cols = cols
+        self.win_length = win_length
+        self.x_bits = 0  # Камни X
+        self.o_bits = 0  # Камни O
+        self._winner = None
+        self._empty_count = rows * cols
+        self.current_player = 'X'  # Игрок всегда X
+        self.game_id = game_id or str(uuid.uuid4())
+        self.status = 'playing'
+        self.difficulty = 'normal'  # Уровень сложности AI
+
+    @property
+    def board(self) -> List[List[str]]:
+        """Поле в виде списка строк (для API и хранилища), только для чтения
+
+        Поле меняется через make_move или присваиванием board целиком.
+        """
+        board = []
+        for row in range(self.rows):
+            cells = []
+            for col in range(self.cols):
+                bit = 1 << (row * self.cols + col)
+                if self.x_bits & bit:
+                    cells.append('X')
+                elif self.o_bits & bit:
+                    cells.append('O')
+                else:
+                    cells.append('')
+            board.append(ReadOnlyList(cells))
+        return ReadOnlyList(board)
+
+    @board.setter
+    def board(self, board: List[List[str]]):
+        self.x_bits = 0
+        self.o_bits = 0
+        for row in range(self.rows):
+            for col in range(self.cols):
+                cell = board[row][col]
+                if cell == 'X':
+                    self.x_bits |= 1 << (row * self.cols + col)
+                elif cell == 'O':
+                    self.o_bits |= 1 << (row * self.cols + col)
+        self._recompute()
+
+    def _recompute(self):
+        """Полный пересчет победителя и счетчика (только при замене поля целиком)"""
+        if self._has_line(self.x_bits):
+            self._winner = 'X'
+        elif self._has_line(self.o_bits):
+            self._winner = 'O'
+        else:
+            self._winner = None
+        self._empty_count = self.rows * self.cols - bin(self.x_bits | self.o_bits).count('1')
+
+    def to_state(self) -> BoardState:
+        """Компактное состояние поля (для передачи в другой процесс)"""
+        return (self.rows, self.cols, self.win_length, self.x_bits, self.o_bits)
+
+    @classmethod
+    def from_state(cls, state: BoardState) -> 'BitboardTicTacToe':
+        """Восстановить поле из компактного состояния"""
+        rows, cols, win_length, x_bits, o_bits = state
+        game = cls(rows, cols, win_length)
+        game.x_bits = x_bits
+        game.o_bits = o_bits
+        game._recompute()
+        return game
+
+    @classmethod
+    def restore(cls, state: BoardState, winner: Optional[str], game_id: str) -> 'BitboardTicTacToe':
+        """Восстановить сохраненную партию с уже известным победителем (без пересчета линий)"""
+        rows, cols, win_length, x_bits, o_bits = state
+        game = cls(rows, cols, win_length, game_id)
+        game.x_bits = x_bits
+        game.o_bits = o_bits
+        game._winner = winner
+        game._empty_count = rows * cols - bin(x_bits | o_bits).count('1')
+        return game
+
+    def copy(self) -> 'BitboardTicTacToe':
+        """Независимая копия партии с тем же id"""
+        game = self.restore(self.to_state(), self._winner, self.game_id)
+        game.status = self.status
+        game.current_player = self.current_player
+        game.difficulty = self.difficulty
+        return game
+
+    def _bit(self, row: int, col: int) -> int:
+        return 1 << (row * self.cols + col)
+
+    def _has_line(self, bits: int) -> bool:
+        for mask in self.geometry.win_masks:
+            if bits & mask == mask:
+                return True
+        return False
+
+    def _completes_line(self, bits: int, row: int, col: int) -> bool:
+        """Проверить только линии через (row, col)"""
+        for mask in self.geometry.cell_masks[row * self.cols + col]:
+            if bits & mask == mask:
+                return True
+        return False
+
+    def make_move(self, row: int, col: int, symbol: str = None) -> dict:
+        """Сделать ход"""
+        # Проверка валидности хода
+        if row < 0 or row >= self.rows or col < 0 or col >= self.cols:
+            return {'success': False, 'message': 'Неверные координаты'}
+
+        bit = self._bit(row, col)
+        if (self.x_bits | self.o_bits) & bit:
+            return {'success': False, 'message': 'Клетка уже занята'}
+
+        if self.status != 'playing':
+            return {'success': False, 'message': 'Игра уже завершена'}
+
+        # Используем переданный символ или текущего игрока
+        move_symbol = symbol if symbol else self.current_player
+
+        # Делаем ход
+        if move_symbol == 'X':
+            self.x_bits |= bit
+            bits = self.x_bits
+        else:
+            self.o_bits |= bit
+            bits = self.o_bits
+        self._empty_count -= 1
+        if self._winner is None and self._completes_line(bits, row, col):
+            self._winner = move_symbol
+
+        return {'success': True, 'message': 'Ход выполнен'}
+
+    def check_winner(self) -> Optional[str]:
+        """Проверка победителя (значение поддерживается в make_move)"""
+        return self._winner
+
+    def is_draw(self) -> bool:
+        """Проверка ничьей"""
+        return self._winner is None and self._empty_count == 0
+
+    def get_empty_cells(self) -> list:
+        """Получить список пустых клеток"""
+        cols = self.cols
+        free = ~(self.x_bits | self.o_bits) & self.geometry.full_mask
+        empty = []
+        while free:
+            low = free & -free
+            index = low.bit_length() - 1
+            empty.append((index // cols, index % cols))
+            free ^= low
+        return empty
+
+    def wins_with(self, row: int, col: int, symbol: str) -> bool:
+        """Проверить, даст ли ход symbol в (row, col) победу"""
+        bits = (self.x_bits if symbol == 'X' else self.o_bits) | self._bit(row, col)
+        return self._completes_line(bits, row, col)
@@ -0,0 +1,181 @@
+"""
+Оценка позиции по линиям
+
+Для каждой геометрии поля один раз строится индекс "клетка -> линии
+через нее". Оценщик хранит число камней каждой стороны в каждой линии
+и при добавлении или снятии камня пересчитывает только линии через эту
+клетку. Из этих счетчиков без пересканирования поля получаются:
+
+    - оценка позиции (открытые двойки, тройки и т.д. с весами);
+    - клетки немедленного выигрыша (линия, где не хватает одного камня);
+    - двойные угрозы (две и больше клеток выигрыша сразу);
+    - вилки (ход, который создает сразу две угрозы).
+"""
+from functools import lru_cache
+from typing import List, NamedTuple, Set, Tuple
+from app.game.bitboard import BoardGeometry
+
+X_SIDE, O_SIDE = 0, 1
+
+# Бонус стороне, которая ходит и может выиграть следующим ходом
+THREAT_TO_MOVE = 50_000
+# Штраф, если у соперника две угрозы, а своей нет
+DOUBLE_THREAT = 20_000
+# Бонус за каждую клетку-вилку ходящей стороны
+FORK_BONUS = 500
+
+
+class LineTables(NamedTuple):
+    """Индекс линий для геометрии поля"""
+    masks: Tuple[int, ...]  # Маска каждой линии
+    cell_lines: Tuple[Tuple[int, ...], ...]  # Номера линий через каждую клетку
+    values: Tuple[Tuple[int, ...], ...]  # values[x][o] - вклад линии в оценку за X
+
+
+@lru_cache(maxsize=None)
+def get_line_tables(geometry: BoardGeometry) -> LineTables:
+    """Получить (и закешировать) индекс линий"""
+    masks = geometry.win_masks
+    cell_lines = [[] for _ in range(geometry.rows * geometry.cols)]
+    for line, mask in enumerate(masks):
+        for index in range(geometry.rows * geometry.cols):
+            if mask >> index & 1:
+                cell_lines[index].append(line)
+
+    k = geometry.win_length
+    values = []
+    for x in range(k + 1):
+        row = []
+        for o in range(k + 1):
+            if x and not o:
+                row.append(4 ** x)
+            elif o and not x:
+                row.append(-4 ** o)
+            else:
+                row.append(0)  # Пустая или перекрытая обоими линия ничего не дает
+        values.append(tuple(row))
+
+    return LineTables(masks, tuple(tuple(lines) for lines in cell_lines), tuple(values))
+
+
+class ThreatEvaluator:
+    """Инкрементальная оценка позиции по линиям"""
+
+    def __init__(self, geometry: BoardGeometry):
+        self.geometry = geometry
+        self.tables = get_line_tables(geometry)
+        self.win_length = geometry.win_length
+        lines = len(self.tables.masks)
+        self.counts: List[List[int]] = [[0] * lines, [0] * lines]
+        # Открытые линии (без камней соперника) с k-1 и k-2 камнями стороны
+        self.threats: List[Set[int]] = [set(), set()]
+        self.developing: List[Set[int]] = [set(), set()]
+        self.score = 0  # Оценка с точки зрения X
+        self.occupied = 0
+
+    @classmethod
+    def from_bits(cls, geometry: BoardGeometry, x_bits: int, o_bits: int) -> 'ThreatEvaluator':
+        """Построить оценщик для позиции"""
+        evaluator = cls(geometry)
+        for side, bits in ((X_SIDE, x_bits), (O_SIDE, o_bits)):
+            while bits:
+                low = bits & -bits
+                evaluator.add(low.bit_length() - 1, side)
+                bits ^= low
+        return evaluator
+
+    @classmethod
+    def from_game(cls, game) -> 'ThreatEvaluator':
+        """Построить оценщик для игры (битбордовой или классической)"""
+        if hasattr(game, 'x_bits'):
+            return cls.from_bits(game.geometry, game.x_bits, game.o_bits)
+        from app.game.bitboard import get_geometry
+        x_bits = o_bits = 0
+        for row, cells in enumerate(game.board):
+            for col, cell in enumerate(cells):
+                if cell == 'X':
+                    x_bits |= 1 << (row * game.cols + col)
+                elif cell == 'O':
+                    o_bits |= 1 << (row * game.cols + col)
+        return cls.from_bits(get_geometry(game.rows, game.cols, game.win_length), x_bits, o_bits)
+
+    def _track(self, line: int, side: int, own: int, opp: int):
+        """Обновить множества угроз линии для стороны side"""
+        k = self.win_length
+        threats, developing = self.threats[side], self.developing[side]
+        if opp == 0 and own == k - 1:
+            threats.add(line)
+        else:
+            threats.discard(line)
+        if opp == 0 and own == k - 2 and own > 0:
+            developing.add(line)
+        else:
+            developing.discard(line)
+
+    def add(self, index: int, side: int) -> bool:
+        """Поставить камень; True, если он завершил линию"""
+        own_counts, opp_counts = self.counts[side], self.counts[1 - side]
+        values = self.tables.values
+        completed = False
+        for line in self.tables.cell_lines[index]:
+            own, opp = own_counts[line], opp_counts[line]
+            x, o = (own, opp) if side == X_SIDE else (opp, own)
+            before = values[x][o]
+            own += 1
+            own_counts[line] = own
+            x, o = (own, opp) if side == X_SIDE else (opp, own)
+            self.score += values[x][o] - before
+            if own == self.win_length:
+                completed = True
+            self._track(line, side, own, opp)
+            self._track(line, 1 - side, opp, own)
+        self.occupied |= 1 << index
+        return completed
+
+    def remove(self, index: int, side: int):
+        """Снять камень (обратная операция к add)"""
+        own_counts, opp_counts = self.counts[side], self.counts[1 - side]
+        values = self.tables.values
+        for line in self.tables.cell_lines[index]:
+            own, opp = own_counts[line], opp_counts[line]
+            x, o = (own, opp) if side == X_SIDE else (opp, own)
+            before = values[x][o]
+            own -= 1
+            own_counts[line] = own
+            x, o = (own, opp) if side == X_SIDE else (opp, own)
+            self.score += values[x][o] - before
+            self._track(line, side, own, opp)
+            self._track(line, 1 - side, opp, own)
+        self.occupied &= ~(1 << index)
+
+    def winning_cells(self, side: int) -> int:
+        """Маска клеток, ход в которые сразу дает победу стороне side"""
+        masks, free = self.tables.masks, ~self.occupied
+        cells = 0
+        for line in self.threats[side]:
+            cells |= masks[line] & free
+        return cells
+
+    def fork_cells(self, side: int) -> int:
+        """Маска клеток, ход в которые создает сразу две угрозы"""
+        masks, free = self.tables.masks, ~self.occupied & self.geometry.full_mask
+        seen = forks = 0
+        for line in self.developing[side]:
+            cells = masks[line] & free
+            forks |= seen & cells
+            seen |= cells
+        return forks
+
+    def evaluate(self, side: int) -> int:
+        """Оценка для стороны side, которая сейчас ходит"""
+        score = self.score if side == X_SIDE else -self.score
+        if self.threats[side]:
+            return score + THREAT_TO_MOVE
+        opponent_threats = self.winning_cells(1 - side)
+        if opponent_threats & (opponent_threats - 1):
+            return score - DOUBLE_THREAT
+        forks = self.fork_cells(side)
+        while forks:
+            forks &= forks - 1
+            score += FORK_BONUS
+        return score
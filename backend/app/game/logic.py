@@ -2,13 +2,39 @@
 Логика игры "Крестики-нолики"
 """
 import uuid
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
+from app.game.bitboard import ReadOnlyList
+
+Cell = Tuple[int, int]
+
+def build_cell_lines(size: int, win_length: int) -> Dict[Cell, List[Tuple[Cell, ...]]]:
+    """Для каждой клетки построить список выигрышных линий, проходящих через нее"""
+    cell_lines = {(row, col): [] for row in range(size) for col in range(size)}
+    for d_row, d_col in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        for row in range(size):
+            for col in range(size):
+                end_row = row + d_row * (win_length - 1)
+                end_col = col + d_col * (win_length - 1)
+                if not (0 <= end_row < size and 0 <= end_col < size):
+                    continue
+                line = tuple((row + d_row * i, col + d_col * i) for i in range(win_length))
+                for cell in line:
+                    cell_lines[cell].append(line)
+    return cell_lines
 
 class TicTacToe:
-    """Класс для управления игрой"""
+    """Класс для управления игрой
+    
+    Победитель и число пустых клеток обновляются в make_move по линиям
+    через последний ход. Поле меняется через make_move или присваиванием
+    board целиком; board отдает его только для чтения.
+    """
     
     BOARD_SIZE = 5  # Размер поля 5x5
     WIN_LENGTH = 3  # Для победы нужно 3 в ряд
+    rows = cols = BOARD_SIZE
+    win_length = WIN_LENGTH
+    CELL_LINES = build_cell_lines(BOARD_SIZE, WIN_LENGTH)
     
     def __init__(self):
         self.board = [['' for _ in range(self.BOARD_SIZE)] for _ in range(self.BOARD_SIZE)]
@@ -16,13 +42,35 @@ class TicTacToe:
         self.game_id = str(uuid.uuid4())
         self.status = 'playing'
     
+    @property
+    def board(self) -> List[List[str]]:
+        """Поле только для чтения: запись в клетку на месте бросает TypeError"""
+        return ReadOnlyList(ReadOnlyList(row) for row in self._board)
+    
+    @board.setter
+    def board(self, board: List[List[str]]):
+        # Своя копия: изменения списка вызывающим не расходятся с кешем
+        self._board = [list(row) for row in board]
+        board = self._board
+        # Полный пересчет только при замене поля целиком
+        self._winner = self._scan_winner()
+        self._empty_count = sum(1 for row in board for cell in row if cell == '')
+    
+    def _completes_line(self, row: int, col: int, symbol: str) -> bool:
+        """Проверить линии через (row, col) так, будто там стоит symbol"""
+        board = self._board
+        for line in self.CELL_LINES[(row, col)]:
+            if all(board[r][c] == symbol or (r, c) == (row, col) for r, c in line):
+                return True
+        return False
+    
     def make_move(self, row: int, col: int, symbol: str = None) -> dict:
         """Сделать ход"""
         # Проверка валидности хода
         if row < 0 or row >= self.BOARD_SIZE or col < 0 or col >= self.BOARD_SIZE:
             return {'success': False, 'message': 'Неверные координаты'}
         
-        if self.board[row][col] != '':
+        if self._board[row][col] != '':
             return {'success': False, 'message': 'Клетка уже занята'}
         
         if self.status != 'playing':
@@ -32,64 +80,65 @@ class TicTacToe:
         move_symbol = symbol if symbol else self.current_player
         
         # Делаем ход
-        self.board[row][col] = move_symbol
+        self._board[row][col] = move_symbol
+        self._empty_count -= 1
+        if self._winner is None and self._completes_line(row, col, move_symbol):
+            self._winner = move_symbol
         
         return {'success': True, 'message': 'Ход выполнен'}
     
     def check_winner(self) -> Optional[str]:
-        """Проверка победителя (3 в ряд для поля 5x5)"""
+        """Проверка победителя (значение поддерживается в make_move)"""
+        return self._winner
+    
+    def _scan_winner(self) -> Optional[str]:
+        """Полная проверка поля на победителя (3 в ряд для поля 5x5)"""
         size = self.BOARD_SIZE
         win_length = self.WIN_LENGTH
         
         # Проверка строк
         for row in range(size):
             for col in range(size - win_length + 1):
-                if self.board[row][col] != '':
-                    if all(self.board[row][col + i] == self.board[row][col] for i in range(win_length)):
-                        return self.board[row][col]
+                if self._board[row][col] != '':
+                    if all(self._board[row][col + i] == self._board[row][col] for i in range(win_length)):
+                        return self._board[row][col]
         
         # Проверка столбцов
         for col in range(size):
             for row in range(size - win_length + 1):
-                if self.board[row][col] != '':
-                    if all(self.board[row + i][col] == self.board[row][col] for i in range(win_length)):
-                        return self.board[row][col]
+                if self._board[row][col] != '':
+                    if all(self._board[row + i][col] == self._board[row][col] for i in range(win_length)):
+                        return self._board[row][col]
         
         # Проверка главной диагонали (слева направо)
         for row in range(size - win_length + 1):
             for col in range(size - win_length + 1):
-                if self.board[row][col] != '':
-                    if all(self.board[row + i][col + i] == self.board[row][col] for i in range(win_length)):
-                        return self.board[row][col]
+                if self._board[row][col] != '':
+                    if all(self._board[row + i][col + i] == self._board[row][col] for i in range(win_length)):
+                        return self._board[row][col]
         
         # Проверка побочной диагонали (справа налево)
         for row in range(size - win_length + 1):
             for col in range(win_length - 1, size):
-                if self.board[row][col] != '':
-                    if all(self.board[row + i][col - i] == self.board[row][col] for i in range(win_length)):
-                        return self.board[row][col]
+                if self._board[row][col] != '':
+                    if all(self._board[row + i][col - i] == self._board[row][col] for i in range(win_length)):
+                        return self._board[row][col]
         
         return None
     
     def is_draw(self) -> bool:
         """Проверка ничьей"""
-        if self.check_winner():
-            return False
-        
-        # Проверяем, есть ли свободные клетки
-        for row in self.board:
-            for cell in row:
-                if cell == '':
-                    return False
-        
-        return True
+        return self._winner is None and self._empty_count == 0
     
     def get_empty_cells(self) -> list:
         """Получить список пустых клеток"""
         empty = []
         for i in range(self.BOARD_SIZE):
             for j in range(self.BOARD_SIZE):
-                if self.board[i][j] == '':
+                if self._board[i][j] == '':
                     empty.append((i, j))
         return empty
-
+    
+    def wins_with(self, row: int, col: int, symbol: str) -> bool:
+        """Проверить, даст ли ход symbol в (row, col) победу"""
+        return self._completes_line(row, col, symbol)
@@ -0,0 +1,280 @@
+"""
+AI на поиске Монте-Карло по дереву (MCTS)
+
+Для больших полей альфа-бета не успевает заглянуть достаточно глубоко,
+поэтому для уровня expert используется MCTS: дерево растет в сторону
+перспективных ходов (UCT), а позиции оцениваются быстрыми партиями до
+конца (rollout) на битовых масках с ThreatEvaluator.
+
+Дерево партии хранится в воркере между запросами /api/game/move: после
+хода AI корень переносится в выбранный ход, а после ответа игрока - в
+его ход, так что накопленная статистика не теряется. Сила игры задается
+бюджетом партий на ход (MCTS_PLAYOUTS), а не фиксированным алгоритмом.
+"""
+import math
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+from app.game.bitboard import BitboardTicTacToe, BoardGeometry, bit_indexes
+from app.game.evaluation import ThreatEvaluator, X_SIDE
+from app.game.search import SearchResult, get_neighbor_masks
+
+# Бюджет партий на ход и ограничение по времени (что наступит раньше)
+MCTS_PLAYOUTS = int(os.getenv("MCTS_PLAYOUTS", 3000))
+MCTS_BUDGET_MS = float(os.getenv("MCTS_BUDGET_MS", 100))
+# Стратегия быстрых партий: random или heuristic (выигрыш/блок, иначе случайно)
+MCTS_ROLLOUT = os.getenv("MCTS_ROLLOUT", "heuristic")
+# Длина быстрой партии в полуходах; дальше исход оценивается по линиям
+MCTS_ROLLOUT_DEPTH = int(os.getenv("MCTS_ROLLOUT_DEPTH", 40))
+# Сколько деревьев партий держит воркер и сколько узлов в одном дереве
+MCTS_TREE_GAMES = int(os.getenv("MCTS_TREE_GAMES", 256))
+MCTS_MAX_NODES = int(os.getenv("MCTS_MAX_NODES", 200_000))
+
+EXPLORATION = 1.4
+# Масштаб оценки по линиям при обрыве быстрой партии
+ROLLOUT_SCORE_SCALE = 64.0
+
+
+class Node:
+    """Узел дерева: позиция после хода move"""
+    __slots__ = ("move", "parent", "children", "untried", "visits", "reward", "terminal")
+
+    def __init__(self, move: Optional[int], parent: Optional['Node'], untried: List[int]):
+        self.move = move
+        self.parent = parent
+        self.children: List[Node] = []
+        self.untried = untried  # Еще не раскрытые ходы
+        self.visits = 0
+        self.reward = 0.0  # Сумма результатов для стороны, сделавшей move
+        self.terminal: Optional[float] = None  # Результат для X, если партия окончена
+
+    def select_child(self, exploration: float) -> 'Node':
+        """Потомок с максимальной оценкой UCT"""
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda child: child.reward / child.visits
+                   + exploration * math.sqrt(log_visits / child.visits))
+
+    def best_child(self) -> Optional['Node']:
+        """Самый посещаемый потомок (итоговый ход)"""
+        return max(self.children, key=lambda child: child.visits, default=None)
+
+
+class MCTSTree:
+    """Дерево поиска одной партии"""
+
+    def __init__(self, geometry: BoardGeometry, x_bits: int, o_bits: int, side: int):
+        self.geometry = geometry
+        self.x_bits = x_bits
+        self.o_bits = o_bits
+        self.side = side  # Кто ходит в корне
+        self.root: Optional[Node] = None  # Создается при первом поиске
+        self.size = 0
+
+    def advance(self, x_bits: int, o_bits: int) -> bool:
+        """Перенести корень в позицию, полученную из текущей несколькими ходами
+
+        Возвращает False, если позиция недостижима из корня или ходов
+        нет в дереве - тогда дерево нужно строить заново.
+        """
+        if x_bits & self.x_bits != self.x_bits or o_bits & self.o_bits != self.o_bits:
+            return False
+        node, side = self.root, self.side
+        added = [x_bits ^ self.x_bits, o_bits ^ self.o_bits]
+        while added[0] | added[1]:
+            bit = added[side]
+            if node is None or not bit or bit & (bit - 1):
+                return False  # Ходы не чередуются или ветки нет в дереве
+            move = bit.bit_length() - 1
+            node = next((child for child in node.children if child.move == move), None)
+            added[side] = 0
+            side = 1 - side
+        if node is not None and node is not self.root:
+            node.parent = None  # Отпускаем остальную часть дерева
+            self.size = count_nodes(node)
+        self.root, self.x_bits, self.o_bits, self.side = node, x_bits, o_bits, side
+        return True
+
+    def play(self, move: int):
+        """Сделать ход за сторону, которая ходит в корне"""
+        bit = 1 << move
+        if self.side == X_SIDE:
+            self.advance(self.x_bits | bit, self.o_bits)
+        else:
+            self.advance(self.x_bits, self.o_bits | bit)
+
+
+def count_nodes(node: Node) -> int:
+    """Число узлов поддерева"""
+    count, stack = 0, [node]
+    while stack:
+        current = stack.pop()
+        count += 1
+        stack.extend(current.children)
+    return count
+
+
+class MonteCarloSearch:
+    """MCTS с UCT и быстрыми партиями на ThreatEvaluator"""
+
+    def __init__(self, playouts: int = MCTS_PLAYOUTS, time_budget_ms: Optional[float] = MCTS_BUDGET_MS,
+                 rollout: str = MCTS_ROLLOUT, rollout_depth: int = MCTS_ROLLOUT_DEPTH,
+                 max_nodes: int = MCTS_MAX_NODES, seed: Optional[int] = None):
+        if rollout not in ("random", "heuristic"):
+            raise ValueError(f"Неизвестная стратегия быстрых партий: {rollout}")
+        self.playouts = playouts
+        self.time_budget_ms = time_budget_ms
+        self.heuristic = rollout == "heuristic"
+        self.rollout_depth = rollout_depth
+        self.max_nodes = max_nodes
+        self.rng = random.Random(seed)
+
+    def search(self, tree: MCTSTree) -> SearchResult:
+        """Провести партии из корня дерева и выбрать ход"""
+        geometry = tree.geometry
+        self.geometry = geometry
+        self.neighbors = get_neighbor_masks(geometry)
+        self.threats = ThreatEvaluator.from_bits(geometry, tree.x_bits, tree.o_bits)
+        if tree.root is None:
+            tree.root = Node(None, None, self._candidate_moves(tree.side))
+            tree.size = 1
+        root = tree.root
+
+        deadline = None
+        if self.time_budget_ms is not None:
+            deadline = time.perf_counter() + self.time_budget_ms / 1000
+        playouts = max_depth = 0
+        while playouts < self.playouts and (root.untried or root.children):
+            if len(root.children) == 1 and not root.untried:
+                break  # Единственный ход (выигрыш или вынужденный блок)
+            max_depth = max(max_depth, self._playout(tree))
+            playouts += 1
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+
+        best = root.best_child()
+        if best is None:
+            return SearchResult(None, 0, 0, playouts)
+        score = round(1000 * best.reward / best.visits) if best.visits else 0
+        return SearchResult(divmod(best.move, geometry.cols), score, max_depth, playouts)
+
+    def _playout(self, tree: MCTSTree) -> int:
+        """Одна итерация: выбор, раскрытие, быстрая партия, обратный проход"""
+        threats = self.threats
+        node, side = tree.root, tree.side
+        path = [node]
+        # Выбор: спускаемся по полностью раскрытым узлам
+        while not node.untried and node.children:
+            node = node.select_child(EXPLORATION)
+            threats.add(node.move, side)
+            side = 1 - side
+            path.append(node)
+
+        # Раскрытие одного нового хода
+        if node.untried and node.terminal is None and tree.size < self.max_nodes:
+            move = node.untried.pop()
+            child = Node(move, node, [])
+            if threats.add(move, side):
+                child.terminal = 1.0 if side == X_SIDE else 0.0
+            elif threats.occupied == self.geometry.full_mask:
+                child.terminal = 0.5
+            else:
+                child.untried = self._candidate_moves(1 - side)
+            side = 1 - side
+            node.children.append(child)
+            tree.size += 1
+            node = child
+            path.append(node)
+
+        result = node.terminal if node.terminal is not None else self._rollout(side)
+
+        # Откат ходов пути и обратный проход результата
+        mover = tree.side
+        for visited in path[1:]:
+            visited.visits += 1
+            visited.reward += result if mover == X_SIDE else 1.0 - result
+            mover = 1 - mover
+        path[0].visits += 1
+        side = tree.side
+        for visited in path[1:]:
+            threats.remove(visited.move, side)
+            side = 1 - side
+        return len(path) - 1
+
+    def _candidate_moves(self, side: int) -> List[int]:
+        """Ходы узла в случайном порядке; выигрыш и блок отсекают остальные"""
+        threats = self.threats
+        wins = threats.winning_cells(side)
+        if wins:
+            return [(wins & -wins).bit_length() - 1]
+        blocks = threats.winning_cells(1 - side)
+        if blocks:
+            return bit_indexes(blocks)
+        occupied = threats.occupied
+        candidates = ~occupied & self.geometry.full_mask
+        if occupied and self.geometry.rows * self.geometry.cols > 25:
+            # На больших полях раскрываем только клетки рядом с камнями
+            near = 0
+            for index in bit_indexes(occupied):
+                near |= self.neighbors[index]
+            candidates &= near
+        moves = bit_indexes(candidates)
+        self.rng.shuffle(moves)
+        return moves
+
+    def _rollout(self, side: int) -> float:
+        """Быстрая партия из текущей позиции; результат для X от 0 до 1"""
+        threats = self.threats
+        full_mask = self.geometry.full_mask
+        moves = bit_indexes(~threats.occupied & full_mask)
+        self.rng.shuffle(moves)
+        played = []
+        result = None
+        position = 0
+        for _ in range(self.rollout_depth):
+            if threats.occupied == full_mask:
+                result = 0.5
+                break
+            index = None
+            if self.heuristic:
+                cells = threats.winning_cells(side) or threats.winning_cells(1 - side)
+                if cells:
+                    index = (cells & -cells).bit_length() - 1
+            if index is None:
+                while threats.occupied >> moves[position] & 1:
+                    position += 1
+                index = moves[position]
+            played.append((index, side))
+            if threats.add(index, side):
+                result = 1.0 if side == X_SIDE else 0.0
+                break
+            side = 1 - side
+
+        if result is None:
+            # Партия оборвана: оцениваем позицию по открытым линиям
+            result = 1.0 / (1.0 + math.exp(-threats.score / ROLLOUT_SCORE_SCALE))
+        for index, moved in reversed(played):
+            threats.remove(index, moved)
+        return result
+
+
+_trees: "OrderedDict[str, MCTSTree]" = OrderedDict()
+# При AI_EXECUTOR=thread деревья берут из нескольких потоков
+_trees_lock = threading.Lock()
+
+
+def get_tree(game: BitboardTicTacToe, symbol: str) -> MCTSTree:
+    """Дерево партии воркера, перенесенное в текущую позицию (или новое)"""
+    side = 0 if symbol == 'X' else 1
+    with _trees_lock:
+        tree = _trees.get(game.game_id)
+        if tree is None or tree.geometry is not game.geometry \
+                or not tree.advance(game.x_bits, game.o_bits) or tree.side != side:
+            tree = MCTSTree(game.geometry, game.x_bits, game.o_bits, side)
+        _trees[game.game_id] = tree
+        _trees.move_to_end(game.game_id)
+        while len(_trees) > MCTS_TREE_GAMES:
+            _trees.popitem(last=False)
+        return tree
@@ -0,0 +1,35 @@
+"""
+Режимы игры (размер поля и длина выигрышной линии)
+"""
+from typing import Dict, NamedTuple
+from app.game.bitboard import BitboardTicTacToe, get_geometry
+
+
+class GameMode(NamedTuple):
+    """Параметры режима игры"""
+    name: str
+    rows: int
+    cols: int
+    win_length: int
+
+
+GAME_MODES: Dict[str, GameMode] = {
+    "classic": GameMode("classic", 5, 5, 3),  # 5x5, 3 в ряд
+    "five": GameMode("five", 10, 10, 5),  # 10x10, 5 в ряд
+    "gomoku": GameMode("gomoku", 15, 15, 5),  # 15x15, гомоку
+}
+
+DEFAULT_MODE = "classic"
+
+# Таблицы линий строятся один раз при импорте, а не при создании игры
+for _mode in GAME_MODES.values():
+    get_geometry(_mode.rows, _mode.cols, _mode.win_length)
+
+
+def create_game(mode: str = DEFAULT_MODE) -> BitboardTicTacToe:
+    """Создать игру в указанном режиме"""
+    if mode not in GAME_MODES:
+        raise ValueError(f"Неизвестный режим игры: {mode}")
+    params = GAME_MODES[mode]
+    return BitboardTicTacToe(params.rows, params.cols, params.win_length)
+
@@ -0,0 +1,157 @@
+"""
+Книга дебютов AI
+
+Все партии начинаются с пустого поля, поэтому первые ответы AI можно
+посчитать заранее. Книга строится офлайн (scripts/build_opening_book.py)
+и хранится в бинарном файле:
+
+    заголовок: magic b"TTTB", версия, rows, cols, win_length, число записей
+    записи:    ключ канонической позиции (uint64) + индекс клетки хода (uint8),
+               отсортированы по ключу
+
+Файл отображается в память через mmap только для чтения, поэтому все
+воркеры uvicorn делят одни и те же физические страницы, а поиск хода -
+двоичный поиск по записям.
+"""
+import logging
+import mmap
+import os
+import struct
+from typing import Dict, Optional, Tuple
+from app.game.bitboard import BitboardTicTacToe
+from app.game.search import NegamaxSearch
+from app.game.symmetry import canonicalize, position_key, to_original
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"TTTB"
+VERSION = 1
+HEADER = struct.Struct("<4sBBBBI")
+RECORD = struct.Struct("<QB")
+
+DEFAULT_BOOK_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "data", "opening_book.bin"
+)
+
+
+class OpeningBook:
+    """Книга дебютов, отображенная в память"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.rows, self.cols, self.win_length, self.count = \
+            HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise ValueError(f"Неверный формат книги дебютов: {path}")
+        if HEADER.size + self.count * RECORD.size > len(self._mmap):
+            self._mmap.close()
+            raise ValueError(f"Книга дебютов обрезана: {path}")
+        self.cells = self.rows * self.cols
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _find(self, key: int) -> Optional[int]:
+        """Двоичный поиск записи по ключу"""
+        low, high = 0, self.count - 1
+        while low <= high:
+            middle = (low + high) // 2
+            record_key, move = RECORD.unpack_from(self._mmap, HEADER.size + middle * RECORD.size)
+            if record_key == key:
+                return move
+            if record_key < key:
+                low = middle + 1
+            else:
+                high = middle - 1
+        return None
+
+    def lookup(self, game: BitboardTicTacToe) -> Optional[Tuple[int, int]]:
+        """Ход из книги для текущей позиции (None, если позиции нет)"""
+        if (game.rows, game.cols, game.win_length) != (self.rows, self.cols, self.win_length):
+            return None
+        x_bits, o_bits, transform = canonicalize(game.x_bits, game.o_bits, self.rows, self.cols)
+        move = self._find(position_key(x_bits, o_bits, self.cells))
+        if move is None:
+            return None
+        return divmod(to_original(move, transform, self.rows, self.cols), self.cols)
+
+    def close(self):
+        self._mmap.close()
+
+
+def build_book(rows: int, cols: int, win_length: int, plies: int,
+               depth: int, node_budget: int) -> Dict[int, int]:
+    """Построить книгу ответов O для всех дебютов X длиной до plies полуходов
+
+    В книгу попадают позиции с ходом O, достижимые при любой игре X,
+    если O отвечает по книге. Позиции склеиваются по симметриям.
+    """
+    cells = rows * cols
+    if 2 * cells > 64:
+        raise ValueError("Книга дебютов поддерживает поля до 32 клеток")
+    book: Dict[int, int] = {}
+    # Канонические позиции с ходом X
+    frontier = {(0, 0)}
+    for _ in range(0, plies, 2):
+        replies = set()
+        for x_bits, o_bits in frontier:
+            game = BitboardTicTacToe.from_state((rows, cols, win_length, x_bits, o_bits))
+            for row, col in game.get_empty_cells():
+                bit = 1 << (row * cols + col)
+                child = BitboardTicTacToe.from_state((rows, cols, win_length, x_bits | bit, o_bits))
+                if child.check_winner() or child.is_draw():
+                    continue
+                cx, co, _ = canonicalize(child.x_bits, child.o_bits, rows, cols)
+                replies.add((cx, co))
+
+        frontier = set()
+        for x_bits, o_bits in replies:
+            key = position_key(x_bits, o_bits, cells)
+            if key in book:
+                continue
+            game = BitboardTicTacToe.from_state((rows, cols, win_length, x_bits, o_bits))
+            result = NegamaxSearch(depth, node_budget).search(game, 'O')
+            if result.move is None:
+                continue
+            index = result.move[0] * cols + result.move[1]
+            book[key] = index
+            game.make_move(result.move[0], result.move[1], 'O')
+            if game.check_winner() is None and not game.is_draw():
+                cx, co, _ = canonicalize(game.x_bits, game.o_bits, rows, cols)
+                frontier.add((cx, co))
+        logger.info(f"Книга дебютов: {len(book)} позиций")
+    return book
+
+
+def write_book(path: str, rows: int, cols: int, win_length: int, book: Dict[int, int]):
+    """Записать книгу в бинарный файл (атомарно, через временный файл)"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, rows, cols, win_length, len(book)))
+        for key in sorted(book):
+            f.write(RECORD.pack(key, book[key]))
+    os.replace(tmp_path, path)
+
+
+_book: Optional[OpeningBook] = None
+_book_loaded = False
+
+
+def get_opening_book() -> Optional[OpeningBook]:
+    """Книга дебютов воркера (None, если файла нет или он поврежден)"""
+    global _book, _book_loaded
+    if not _book_loaded:
+        _book_loaded = True
+        path = os.getenv("AI_OPENING_BOOK", DEFAULT_BOOK_PATH)
+        if os.path.exists(path):
+            try:
+                _book = OpeningBook(path)
+                logger.info(f"Книга дебютов загружена: {path} ({len(_book)} позиций)")
+            except (OSError, ValueError, struct.error) as e:
+                logger.warning(f"Не удалось загрузить книгу дебютов: {e}")
+        else:
+            logger.info(f"Книга дебютов не найдена: {path}")
+    return _book
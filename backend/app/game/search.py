@@ -0,0 +1,278 @@
+"""
+Поиск хода AI: negamax с альфа-бета отсечением
+
+Позиция хранится как пара битовых масок (камни ходящего и камни
+соперника) поверх кешированной геометрии поля из bitboard. Угрозы и
+оценка листьев берутся из ThreatEvaluator, который обновляется на
+каждом ходе и откате. Найденные оценки складываются в таблицу
+транспозиций с ключом Zobrist.
+Глубина наращивается итеративно, пока хватает бюджета узлов и времени.
+"""
+import random
+import time
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from app.game.bitboard import BitboardTicTacToe, BoardGeometry, bit_indexes
+from app.game.evaluation import ThreatEvaluator
+
+WIN_SCORE = 1_000_000  # Оценка победы (минус число полуходов до нее)
+INFINITY = WIN_SCORE + 1
+
+# Флаги записей в таблице транспозиций
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Максимум записей в таблице транспозиций одной геометрии
+TT_MAX_ENTRIES = 200_000
+
+
+class SearchResult(NamedTuple):
+    """Результат поиска"""
+    move: Optional[Tuple[int, int]]
+    score: int
+    depth: int  # Глубина, на которой получен ход
+    nodes: int  # Сколько позиций просмотрено
+
+
+class BudgetExceeded(Exception):
+    """Исчерпан бюджет узлов или времени поиска"""
+
+
+class Zobrist(NamedTuple):
+    """Случайные ключи для хеширования позиций"""
+    pieces: Tuple[Tuple[int, ...], Tuple[int, ...]]  # [сторона][клетка]
+    side: int  # Ключ очереди хода
+
+
+@lru_cache(maxsize=None)
+def get_zobrist(cells: int) -> Zobrist:
+    """Получить ключи Zobrist для поля из cells клеток"""
+    rng = random.Random(cells)  # Детерминированно: одинаково во всех воркерах
+    pieces = tuple(tuple(rng.getrandbits(64) for _ in range(cells)) for _ in range(2))
+    return Zobrist(pieces=pieces, side=rng.getrandbits(64))
+
+
+@lru_cache(maxsize=None)
+def get_cell_weights(geometry: BoardGeometry) -> Tuple[int, ...]:
+    """Статический вес клетки: число линий через нее"""
+    return tuple(len(masks) for masks in geometry.cell_masks)
+
+
+@lru_cache(maxsize=None)
+def get_neighbor_masks(geometry: BoardGeometry) -> Tuple[int, ...]:
+    """Для каждой клетки маска соседей на расстоянии до 2 клеток"""
+    rows, cols = geometry.rows, geometry.cols
+    masks = []
+    for index in range(rows * cols):
+        row, col = divmod(index, cols)
+        mask = 0
+        for r in range(max(0, row - 2), min(rows, row + 3)):
+            for c in range(max(0, col - 2), min(cols, col + 3)):
+                mask |= 1 << (r * cols + c)
+        masks.append(mask)
+    return tuple(masks)
+
+
+_tables: Dict[BoardGeometry, Dict[int, tuple]] = {}
+
+
+def get_transposition_table(geometry: BoardGeometry) -> Dict[int, tuple]:
+    """Таблица транспозиций воркера для данной геометрии"""
+    table = _tables.get(geometry)
+    if table is None or len(table) > TT_MAX_ENTRIES:
+        table = _tables[geometry] = {}
+    return table
+
+
+class NegamaxSearch:
+    """Negamax с альфа-бета отсечением, упорядочиванием ходов и таблицей транспозиций
+
+    search() углубляется итеративно с глубины 1 до max_depth и возвращает
+    ход последней полностью просчитанной глубины. Незавершенная итерация
+    отбрасывается, поэтому время хода ограничено бюджетом, а не сложностью
+    позиции.
+    """
+
+    def __init__(self, max_depth: int, node_budget: int, time_budget_ms: Optional[float] = None):
+        self.max_depth = max_depth
+        self.node_budget = node_budget
+        self.time_budget_ms = time_budget_ms
+        self.nodes = 0
+        self.deadline = None
+
+    def search(self, game: BitboardTicTacToe, symbol: str) -> SearchResult:
+        """Найти ход для symbol в текущей позиции игры"""
+        geometry = game.geometry
+        self.geometry = geometry
+        self.zobrist = get_zobrist(geometry.rows * geometry.cols)
+        self.weights = get_cell_weights(geometry)
+        self.neighbors = get_neighbor_masks(geometry)
+        self.table = get_transposition_table(geometry)
+        self.threats = ThreatEvaluator.from_bits(geometry, game.x_bits, game.o_bits)
+        self.nodes = 0
+        self.deadline = None
+        if self.time_budget_ms is not None:
+            self.deadline = time.perf_counter() + self.time_budget_ms / 1000
+
+        side = 0 if symbol == 'X' else 1
+        own, other = (game.x_bits, game.o_bits) if side == 0 else (game.o_bits, game.x_bits)
+        key = self._hash(own, other, side)
+
+        moves = self._order_moves(own, other, side, None)
+        if not moves:
+            return SearchResult(None, 0, 0, self.nodes)
+
+        best_move, best_score, completed_depth = moves[0], 0, 0
+        for depth in range(1, self.max_depth + 1):
+            move, score, completed = self._search_root(own, other, key, side, depth, moves)
+            if not completed:
+                if completed_depth == 0 and move is not None:
+                    # Даже первая глубина не успела: берем лучшее из просмотренного
+                    best_move, best_score = move, score
+                break
+            best_move, best_score, completed_depth = move, score, depth
+            # Лучший ход прошлой итерации смотрим первым
+            moves.remove(move)
+            moves.insert(0, move)
+            if abs(score) > WIN_SCORE - 1000:
+                break  # Исход форсирован, глубже смотреть незачем
+        return SearchResult(divmod(best_move, geometry.cols), best_score, completed_depth, self.nodes)
+
+    def _hash(self, own: int, other: int, side: int) -> int:
+        pieces = self.zobrist.pieces
+        key = self.zobrist.side if side else 0
+        for index in bit_indexes(own):
+            key ^= pieces[side][index]
+        for index in bit_indexes(other):
+            key ^= pieces[1 - side][index]
+        return key
+
+    def _search_root(self, own: int, other: int, key: int, side: int, depth: int,
+                     moves: List[int]) -> Tuple[Optional[int], int, bool]:
+        """Одна итерация на глубину depth: (ход, оценка, завершена ли)"""
+        best_move, best_score = None, -INFINITY
+        alpha = -INFINITY
+        try:
+            for index in moves:
+                score = self._child_score(own, other, key, side, index, depth, -INFINITY, -alpha, 0)
+                if score > best_score:
+                    best_move, best_score = index, score
+                    alpha = max(alpha, score)
+        except BudgetExceeded:
+            return best_move, best_score, False
+        return best_move, best_score, True
+
+    def _child_score(self, own: int, other: int, key: int, side: int, index: int,
+                     depth: int, alpha: int, beta: int, ply: int) -> int:
+        """Оценка хода index для ходящей стороны"""
+        threats = self.threats
+        if threats.add(index, side):
+            threats.remove(index, side)
+            return WIN_SCORE - ply - 1
+        child_key = key ^ self.zobrist.pieces[side][index] ^ self.zobrist.side
+        try:
+            return -self._negamax(other, own | (1 << index), child_key, 1 - side,
+                                  depth - 1, alpha, beta, ply + 1)
+        finally:
+            threats.remove(index, side)
+
+    def _negamax(self, own: int, other: int, key: int, side: int, depth: int,
+                 alpha: int, beta: int, ply: int) -> int:
+        self.nodes += 1
+        if self.nodes > self.node_budget:
+            raise BudgetExceeded()
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise BudgetExceeded()
+
+        occupied = own | other
+        if occupied == self.geometry.full_mask:
+            return 0  # Ничья
+
+        entry = self.table.get(key)
+        tt_move = None
+        if entry is not None:
+            entry_depth, entry_score, entry_flag, tt_move = entry
+            if entry_depth >= depth:
+                score = self._score_from_table(entry_score, ply)
+                if entry_flag == EXACT:
+                    return score
+                if entry_flag == LOWER:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score
+
+        if depth <= 0:
+            return self.threats.evaluate(side)
+
+        alpha_start = alpha
+        best_score, best_move = -INFINITY, None
+        for index in self._order_moves(own, other, side, tt_move):
+            score = self._child_score(own, other, key, side, index, depth, -beta, -alpha, ply)
+            if score > best_score:
+                best_score, best_move = score, index
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        if best_score <= alpha_start:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table[key] = (depth, self._score_to_table(best_score, ply), flag, best_move)
+        return best_score
+
+    def _order_moves(self, own: int, other: int, side: int, tt_move: Optional[int]) -> List[int]:
+        """Ходы в порядке: из таблицы, выигрыш, блок, вилки, остальные по весу клетки"""
+        geometry = self.geometry
+        threats = self.threats
+        occupied = own | other
+        free = ~occupied & geometry.full_mask
+
+        wins = threats.winning_cells(side)
+        if wins:
+            # Выигрыш сразу: остальные ходы смотреть незачем
+            return bit_indexes(wins)[:1]
+        blocks = threats.winning_cells(1 - side)
+        if blocks:
+            # Нужно закрыть угрозу; если угроз две, позиция все равно проиграна
+            return bit_indexes(blocks)
+
+        candidates = free
+        if occupied and geometry.rows * geometry.cols > 25:
+            # На больших полях смотрим только клетки рядом с камнями
+            near = 0
+            for index in bit_indexes(occupied):
+                near |= self.neighbors[index]
+            candidates &= near
+
+        # Сначала свои вилки, затем вилки соперника, дальше по весу клетки
+        weights = self.weights
+        own_forks = threats.fork_cells(side)
+        their_forks = threats.fork_cells(1 - side)
+        moves = sorted(bit_indexes(candidates), key=lambda index: (
+            -(own_forks >> index & 1), -(their_forks >> index & 1), -weights[index]))
+        if tt_move is not None and candidates >> tt_move & 1:
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
+        return moves
+
+    @staticmethod
+    def _score_to_table(score: int, ply: int) -> int:
+        """Оценки побед храним относительно узла, а не корня"""
+        if score > WIN_SCORE - 1000:
+            return score + ply
+        if score < -WIN_SCORE + 1000:
+            return score - ply
+        return score
+
+    @staticmethod
+    def _score_from_table(score: int, ply: int) -> int:
+        if score > WIN_SCORE - 1000:
+            return score - ply
+        if score < -WIN_SCORE + 1000:
+            return score + ply
+        return score
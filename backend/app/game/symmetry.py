@@ -0,0 +1,116 @@
+"""
+Симметрии поля для битбордов
+
+Позиции, которые переходят друг в друга поворотом или отражением,
+равноценны. Каноническая форма - вариант с минимальным ключом среди
+всех симметрий; по ней работают книга дебютов, кеш ходов и таблица
+эндшпиля.
+"""
+from functools import lru_cache
+from typing import NamedTuple, Tuple
+
+CHUNK_BITS = 8  # Преобразование битборда идет по таблицам для каждого байта
+
+
+class Symmetries(NamedTuple):
+    """Таблицы симметрий для поля rows x cols"""
+    rows: int
+    cols: int
+    perms: Tuple[Tuple[int, ...], ...]  # perms[t][index] - куда переходит клетка
+    inverse: Tuple[Tuple[int, ...], ...]  # Обратные перестановки
+    chunk_tables: Tuple[Tuple[Tuple[int, ...], ...], ...]  # [t][номер байта][значение байта]
+
+
+def _transforms(rows: int, cols: int):
+    """Преобразования координат, сохраняющие форму поля"""
+    last_row, last_col = rows - 1, cols - 1
+    transforms = [
+        lambda r, c: (r, c),  # Тождественное
+        lambda r, c: (r, last_col - c),  # Отражение по горизонтали
+        lambda r, c: (last_row - r, c),  # Отражение по вертикали
+        lambda r, c: (last_row - r, last_col - c),  # Поворот на 180
+    ]
+    if rows == cols:
+        transforms += [
+            lambda r, c: (c, last_row - r),  # Поворот на 90
+            lambda r, c: (last_col - c, r),  # Поворот на 270
+            lambda r, c: (c, r),  # Транспонирование
+            lambda r, c: (last_col - c, last_row - r),  # Отражение по побочной диагонали
+        ]
+    return transforms
+
+
+@lru_cache(maxsize=None)
+def get_symmetries(rows: int, cols: int) -> Symmetries:
+    """Получить (и закешировать) таблицы симметрий поля"""
+    cells = rows * cols
+    perms = []
+    for transform in _transforms(rows, cols):
+        perm = []
+        for index in range(cells):
+            row, col = transform(*divmod(index, cols))
+            perm.append(row * cols + col)
+        perms.append(tuple(perm))
+
+    inverse = []
+    for perm in perms:
+        inv = [0] * cells
+        for index, image in enumerate(perm):
+            inv[image] = index
+        inverse.append(tuple(inv))
+
+    chunk_tables = []
+    chunks = (cells + CHUNK_BITS - 1) // CHUNK_BITS
+    for perm in perms:
+        tables = []
+        for chunk in range(chunks):
+            table = []
+            for value in range(1 << CHUNK_BITS):
+                mapped = 0
+                for bit in range(CHUNK_BITS):
+                    index = chunk * CHUNK_BITS + bit
+                    if value >> bit & 1 and index < cells:
+                        mapped |= 1 << perm[index]
+                table.append(mapped)
+            tables.append(tuple(table))
+        chunk_tables.append(tuple(tables))
+
+    return Symmetries(rows, cols, tuple(perms), tuple(inverse), tuple(chunk_tables))
+
+
+def transform_bits(bits: int, tables: Tuple[Tuple[int, ...], ...]) -> int:
+    """Применить симметрию (таблицы chunk_tables[t]) к битборду"""
+    result = 0
+    for table in tables:
+        result |= table[bits & 0xFF]
+        bits >>= CHUNK_BITS
+    return result
+
+
+def canonicalize(x_bits: int, o_bits: int, rows: int, cols: int) -> Tuple[int, int, int]:
+    """Каноническая форма позиции: (x_bits, o_bits, номер симметрии)"""
+    symmetries = get_symmetries(rows, cols)
+    cells = rows * cols
+    best = None
+    for t, tables in enumerate(symmetries.chunk_tables):
+        x = transform_bits(x_bits, tables)
+        o = transform_bits(o_bits, tables)
+        key = x | (o << cells)
+        if best is None or key < best[0]:
+            best = (key, x, o, t)
+    return best[1], best[2], best[3]
+
+
+def position_key(x_bits: int, o_bits: int, cells: int) -> int:
+    """Целочисленный ключ позиции (в канонической форме - ключ класса симметрий)"""
+    return x_bits | (o_bits << cells)
+
+
+def to_original(index: int, transform: int, rows: int, cols: int) -> int:
+    """Перевести клетку из канонической ориентации в исходную"""
+    return get_symmetries(rows, cols).inverse[transform][index]
+
+
+def to_canonical(index: int, transform: int, rows: int, cols: int) -> int:
+    """Перевести клетку из исходной ориентации в каноническую"""
+    return get_symmetries(rows, cols).perms[transform][index]
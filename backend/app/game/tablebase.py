@@ -0,0 +1,257 @@
+"""
+Таблица идеальной игры (tablebase)
+
+Классическое поле 5x5 (три в ряд) решается целиком для всех позиций,
+которые AI может встретить: X ходит как угодно, O отвечает идеально.
+Для каждой позиции с ходом O (с точностью до симметрий) в таблице
+лежат лучший ход, исход при идеальной игре и число полуходов до него.
+Таблица строится офлайн (scripts/build_tablebase.py) и хранится в
+бинарном файле:
+
+    заголовок: magic b"TTTS", версия, rows, cols, win_length,
+               размер таблицы (степень двойки), число записей
+    слоты:     ключ канонической позиции (uint64, 0 - пустой слот),
+               индекс клетки хода, исход для O (-1, 0, 1),
+               число полуходов до исхода
+
+Слоты - хеш-таблица с открытой адресацией и линейным пробированием.
+Файл отображается в память только для чтения (как книга дебютов), так
+что ход уровня unbeatable - несколько чтений из mmap.
+"""
+import logging
+import mmap
+import os
+import struct
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from app.game.bitboard import BitboardTicTacToe
+from app.game.search import NegamaxSearch, WIN_SCORE
+from app.game.symmetry import canonicalize, position_key, to_original
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"TTTS"
+VERSION = 1
+HEADER = struct.Struct("<4sBBBBII")
+SLOT = struct.Struct("<QBbBx")
+MAX_LOAD = 0.75
+
+# Исход партии для O
+LOSS, DRAW, WIN = -1, 0, 1
+
+DEFAULT_TABLEBASE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "data", "tablebase.bin"
+)
+
+
+class TablebaseEntry(NamedTuple):
+    """Запись таблицы: лучший ход O, исход и число полуходов до него"""
+    move: Tuple[int, int]
+    result: int
+    distance: int
+
+
+def slot_index(key: int, capacity: int) -> int:
+    """Начальный слот ключа (перемешивание битов, как в splitmix64)"""
+    key = (key ^ (key >> 30)) * 0xBF58476D1CE4E5B9 & 0xFFFFFFFFFFFFFFFF
+    key = (key ^ (key >> 27)) * 0x94D049BB133111EB & 0xFFFFFFFFFFFFFFFF
+    return (key ^ (key >> 31)) & (capacity - 1)
+
+
+class Tablebase:
+    """Таблица идеальной игры, отображенная в память"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.rows, self.cols, self.win_length, self.capacity, self.count = \
+            HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION or self.capacity & (self.capacity - 1):
+            self._mmap.close()
+            raise ValueError(f"Неверный формат таблицы: {path}")
+        if HEADER.size + self.capacity * SLOT.size > len(self._mmap):
+            self._mmap.close()
+            raise ValueError(f"Таблица обрезана: {path}")
+        self.cells = self.rows * self.cols
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _probe(self, key: int) -> Optional[Tuple[int, int, int]]:
+        """(клетка хода, исход, расстояние) по ключу канонической позиции"""
+        mask = self.capacity - 1
+        slot = slot_index(key, self.capacity)
+        for _ in range(self.capacity):
+            slot_key, move, result, distance = SLOT.unpack_from(self._mmap, HEADER.size + slot * SLOT.size)
+            if slot_key == 0:
+                return None  # Пустой слот: ключа нет (пустое поле тоже не хранится)
+            if slot_key == key:
+                return move, result, distance
+            slot = (slot + 1) & mask
+        return None
+
+    def lookup(self, game: BitboardTicTacToe) -> Optional[TablebaseEntry]:
+        """Запись для позиции игры с ходом O (None, если позиции нет)"""
+        if (game.rows, game.cols, game.win_length) != (self.rows, self.cols, self.win_length):
+            return None
+        x_bits, o_bits, transform = canonicalize(game.x_bits, game.o_bits, self.rows, self.cols)
+        found = self._probe(position_key(x_bits, o_bits, self.cells))
+        if found is None:
+            return None
+        move, result, distance = found
+        return TablebaseEntry(divmod(to_original(move, transform, self.rows, self.cols), self.cols),
+                              result, distance)
+
+    def close(self):
+        self._mmap.close()
+
+
+def solve(game: BitboardTicTacToe) -> Tuple[int, int, int]:
+    """Точное решение позиции с ходом O: (клетка хода, исход, расстояние)"""
+    empty = len(game.get_empty_cells())
+    # Глубина до заполнения поля: последняя итерация просчитывает партии до конца
+    result = NegamaxSearch(empty, 1 << 62).search(game, 'O')
+    move = result.move[0] * game.cols + result.move[1]
+    if result.score > WIN_SCORE - 1000:
+        return move, WIN, WIN_SCORE - result.score
+    if result.score < -WIN_SCORE + 1000:
+        return move, LOSS, WIN_SCORE + result.score
+    return move, DRAW, empty
+
+
+def build_tablebase(rows: int, cols: int, win_length: int) -> Dict[int, Tuple[int, int, int]]:
+    """Решить все позиции с ходом O, достижимые при любой игре X
+
+    O отвечает ходом из таблицы, поэтому на этих позициях AI никогда
+    не выходит за ее пределы. Позиции склеиваются по симметриям.
+    """
+    cells = rows * cols
+    if 2 * cells > 64:
+        raise ValueError("Таблица поддерживает поля до 32 клеток")
+    table: Dict[int, Tuple[int, int, int]] = {}
+    frontier = {(0, 0)}  # Канонические позиции с ходом X
+    while frontier:
+        replies = set()
+        for x_bits, o_bits in frontier:
+            game = BitboardTicTacToe.from_state((rows, cols, win_length, x_bits, o_bits))
+            for row, col in game.get_empty_cells():
+                child = BitboardTicTacToe.from_state((rows, cols, win_length, x_bits, o_bits))
+                child.make_move(row, col, 'X')
+                if child.check_winner() or child.is_draw():
+                    continue
+                cx, co, _ = canonicalize(child.x_bits, child.o_bits, rows, cols)
+                replies.add((cx, co))
+
+        frontier = set()
+        for x_bits, o_bits in replies:
+            key = position_key(x_bits, o_bits, cells)
+            if key in table:
+                continue
+            game = BitboardTicTacToe.from_state((rows, cols, win_length, x_bits, o_bits))
+            table[key] = solve(game)
+            game.make_move(*divmod(table[key][0], cols), 'O')
+            if game.check_winner() is None and not game.is_draw():
+                cx, co, _ = canonicalize(game.x_bits, game.o_bits, rows, cols)
+                frontier.add((cx, co))
+        logger.info(f"Таблица: {len(table)} позиций")
+    return table
+
+
+def write_tablebase(path: str, rows: int, cols: int, win_length: int,
+                    table: Dict[int, Tuple[int, int, int]]):
+    """Записать таблицу в бинарный файл (атомарно, через временный файл)"""
+    capacity = 1
+    while capacity * MAX_LOAD < len(table) + 1:
+        capacity *= 2
+    slots: List[Optional[Tuple[int, int, int, int]]] = [None] * capacity
+    for key, (move, result, distance) in table.items():
+        slot = slot_index(key, capacity)
+        while slots[slot] is not None:
+            slot = (slot + 1) & (capacity - 1)
+        slots[slot] = (key, move, result, distance)
+
+    tmp_path = f"{path}.tmp"
+    empty = SLOT.pack(0, 0, 0, 0)
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, rows, cols, win_length, capacity, len(table)))
+        for record in slots:
+            f.write(SLOT.pack(*record) if record is not None else empty)
+    os.replace(tmp_path, path)
+
+
+def verify_tablebase(tablebase: Tablebase) -> int:
+    """Сыграть эвристикой за X из каждой позиции таблицы против таблицы за O
+
+    Возвращает число позиций, где O получил исход хуже записанного
+    или вышел за пределы таблицы.
+    """
+    from app.game.ai import AIPlayer  # ai импортирует этот модуль
+
+    heuristic = AIPlayer("normal")
+    heuristic.symbol = 'X'
+    failures = 0
+    for slot in range(tablebase.capacity):
+        key, _, expected, _ = SLOT.unpack_from(tablebase._mmap, HEADER.size + slot * SLOT.size)
+        if key == 0:
+            continue
+        cells = tablebase.cells
+        game = BitboardTicTacToe.from_state((tablebase.rows, tablebase.cols, tablebase.win_length,
+                                             key & ((1 << cells) - 1), key >> cells))
+        outcome = None
+        while outcome is None:
+            entry = tablebase.lookup(game)
+            if entry is None:
+                break
+            game.make_move(*entry.move, 'O')
+            if game.check_winner() or game.is_draw():
+                outcome = WIN if game.check_winner() == 'O' else DRAW
+                break
+            game.make_move(*heuristic.get_best_move(game), 'X')
+            if game.check_winner() or game.is_draw():
+                outcome = LOSS if game.check_winner() == 'X' else DRAW
+        if outcome is None or outcome < expected:
+            failures += 1
+    return failures
+
+
+def benchmark_lookups(tablebase: Tablebase, samples: int = 10000) -> Tuple[float, float]:
+    """Время поиска в таблице: (p50, p99) в микросекундах"""
+    games = []
+    for slot in range(tablebase.capacity):
+        key = SLOT.unpack_from(tablebase._mmap, HEADER.size + slot * SLOT.size)[0]
+        if key:
+            cells = tablebase.cells
+            games.append(BitboardTicTacToe.from_state((tablebase.rows, tablebase.cols, tablebase.win_length,
+                                                       key & ((1 << cells) - 1), key >> cells)))
+    timings = []
+    for index in range(min(samples, len(games) * 10)):
+        game = games[index % len(games)]
+        started = time.perf_counter()
+        tablebase.lookup(game)
+        timings.append((time.perf_counter() - started) * 1e6)
+    timings.sort()
+    if not timings:
+        return 0.0, 0.0
+    return timings[len(timings) // 2], timings[min(len(timings) - 1, len(timings) * 99 // 100)]
+
+
+_tablebase: Optional[Tablebase] = None
+_tablebase_loaded = False
+
+
+def get_tablebase() -> Optional[Tablebase]:
+    """Таблица идеальной игры воркера (None, если файла нет или он поврежден)"""
+    global _tablebase, _tablebase_loaded
+    if not _tablebase_loaded:
+        _tablebase_loaded = True
+        path = os.getenv("AI_TABLEBASE", DEFAULT_TABLEBASE_PATH)
+        if os.path.exists(path):
+            try:
+                _tablebase = Tablebase(path)
+                logger.info(f"Таблица идеальной игры загружена: {path} ({len(_tablebase)} позиций)")
+            except (OSError, ValueError, struct.error) as e:
+                logger.warning(f"Не удалось загрузить таблицу идеальной игры: {e}")
+        else:
+            logger.info(f"Таблица идеальной игры не найдена: {path}")
+    return _tablebase
@@ -0,0 +1,239 @@
+"""
+Турнир стратегий AI и замер скорости ходов
+
+Зарегистрированные стратегии играют круговой турнир: каждая пара -
+заданное число партий со сменой цвета, первые полуходы случайные (с
+фиксированным seed), чтобы детерминированные стратегии не повторяли
+одну и ту же партию. По итогам считается рейтинг Эло, а для каждой
+стратегии - перцентили времени хода p50/p95/p99.
+
+Отчет пишется в JSON и сравнивается с сохраненным базовым отчетом:
+если стратегия стала заметно слабее или медленнее, запуск падает.
+
+Запуск из каталога backend:
+    python -m app.game.tournament --strategies random,normal,hard,expert --mode five --games 4
+    python -m app.game.tournament --update-baseline
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+from app.game.ai import AIPlayer
+from app.game.bitboard import BitboardTicTacToe
+from app.game.modes import DEFAULT_MODE, GAME_MODES, create_game
+
+DEFAULT_BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "data", "ai_benchmark_baseline.json"
+)
+
+INITIAL_ELO = 1500.0
+ELO_K = 16.0
+# Допуски при сравнении с базовым отчетом
+ELO_TOLERANCE = 50.0
+LATENCY_TOLERANCE = 0.5  # p95 может вырасти не больше чем на 50%...
+LATENCY_FLOOR_MS = 1.0  # ...и не меньше чем на 1 мс (шум на быстрых стратегиях)
+
+
+class RandomPlayer:
+    """Случайная пустая клетка (нижняя планка для рейтинга)"""
+
+    def __init__(self, seed: Optional[int] = None):
+        self.symbol = 'O'
+        self.rng = random.Random(seed)
+
+    def get_best_move(self, game: BitboardTicTacToe):
+        empty = game.get_empty_cells()
+        return self.rng.choice(empty) if empty else None
+
+
+STRATEGIES: Dict[str, Callable[[], object]] = {
+    "random": lambda: RandomPlayer(seed=0),
+    "normal": lambda: AIPlayer("normal"),
+    "hard": lambda: AIPlayer("hard"),
+    "expert": lambda: AIPlayer("expert"),
+    "unbeatable": lambda: AIPlayer("unbeatable"),
+}
+
+
+class GameRecord(NamedTuple):
+    """Итог одной партии"""
+    x: str
+    o: str
+    winner: Optional[str]  # Имя стратегии-победителя, None - ничья
+    moves: int
+
+
+def percentile(values: List[float], share: float) -> float:
+    """Перцентиль по ближайшему рангу"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+def play_game(mode: str, players: Dict[str, object], x_name: str, o_name: str,
+              opening_plies: int, rng: random.Random, latencies: Dict[str, List[float]]) -> GameRecord:
+    """Сыграть одну партию x_name (X) против o_name (O)"""
+    game = create_game(mode)
+    names = {'X': x_name, 'O': o_name}
+    symbol, moves = 'X', 0
+    while True:
+        if moves < opening_plies:
+            move = rng.choice(game.get_empty_cells())
+        else:
+            player = players[names[symbol]]
+            player.symbol = symbol
+            started = time.perf_counter()
+            move = player.get_best_move(game)
+            latencies[names[symbol]].append((time.perf_counter() - started) * 1000)
+        game.make_move(move[0], move[1], symbol)
+        moves += 1
+        winner = game.check_winner()
+        if winner or game.is_draw():
+            return GameRecord(x_name, o_name, names[winner] if winner else None, moves)
+        symbol = 'O' if symbol == 'X' else 'X'
+
+
+def elo_ratings(names: List[str], games: List[GameRecord]) -> Dict[str, float]:
+    """Рейтинг Эло: последовательное обновление по партиям"""
+    ratings = {name: INITIAL_ELO for name in names}
+    for record in games:
+        expected = 1.0 / (1.0 + 10 ** ((ratings[record.o] - ratings[record.x]) / 400))
+        score = 0.5 if record.winner is None else float(record.winner == record.x)
+        ratings[record.x] += ELO_K * (score - expected)
+        ratings[record.o] -= ELO_K * (score - expected)
+    return ratings
+
+
+def run_tournament(names: List[str], mode: str = DEFAULT_MODE, games_per_pair: int = 10,
+                   opening_plies: int = 2, seed: int = 0) -> dict:
+    """Круговой турнир стратегий; возвращает отчет"""
+    unknown = [name for name in names if name not in STRATEGIES]
+    if unknown:
+        raise ValueError(f"Неизвестные стратегии: {', '.join(unknown)}")
+    if mode not in GAME_MODES:
+        raise ValueError(f"Неизвестный режим игры: {mode}")
+
+    rng = random.Random(seed)
+    players = {name: STRATEGIES[name]() for name in names}
+    latencies: Dict[str, List[float]] = {name: [] for name in names}
+    games: List[GameRecord] = []
+    started = time.perf_counter()
+    for first, second in itertools.combinations(names, 2):
+        for index in range(games_per_pair):
+            x_name, o_name = (first, second) if index % 2 == 0 else (second, first)
+            games.append(play_game(mode, players, x_name, o_name, opening_plies, rng, latencies))
+
+    ratings = elo_ratings(names, games)
+    strategies = {}
+    for name in names:
+        played = [record for record in games if name in (record.x, record.o)]
+        strategies[name] = {
+            "elo": round(ratings[name], 1),
+            "games": len(played),
+            "wins": sum(record.winner == name for record in played),
+            "losses": sum(record.winner not in (None, name) for record in played),
+            "draws": sum(record.winner is None for record in played),
+            "moves": len(latencies[name]),
+            "latency_ms": {
+                "p50": round(percentile(latencies[name], 0.50), 3),
+                "p95": round(percentile(latencies[name], 0.95), 3),
+                "p99": round(percentile(latencies[name], 0.99), 3),
+            },
+        }
+    return {
+        "mode": mode,
+        "games_per_pair": games_per_pair,
+        "opening_plies": opening_plies,
+        "seed": seed,
+        "seconds": round(time.perf_counter() - started, 2),
+        "strategies": strategies,
+    }
+
+
+def is_comparable(report: dict, baseline: dict) -> bool:
+    """Отчеты сняты с одинаковыми параметрами турнира"""
+    fields = ("mode", "games_per_pair", "opening_plies", "seed")
+    return all(report.get(field) == baseline.get(field) for field in fields)
+
+
+def compare_to_baseline(report: dict, baseline: dict, elo_tolerance: float = ELO_TOLERANCE,
+                        latency_tolerance: float = LATENCY_TOLERANCE) -> List[str]:
+    """Регрессии относительно базового отчета (пустой список - все в порядке)
+
+    Сравниваются только стратегии, которые есть в обоих отчетах.
+    """
+    regressions = []
+    for name, current in report["strategies"].items():
+        previous = baseline.get("strategies", {}).get(name)
+        if previous is None:
+            continue
+        if current["elo"] < previous["elo"] - elo_tolerance:
+            regressions.append(f"{name}: рейтинг {current['elo']} ниже базового {previous['elo']}")
+        limit = max(previous["latency_ms"]["p95"] * (1 + latency_tolerance),
+                    previous["latency_ms"]["p95"] + LATENCY_FLOOR_MS)
+        if current["latency_ms"]["p95"] > limit:
+            regressions.append(f"{name}: p95 хода {current['latency_ms']['p95']} мс "
+                               f"больше допустимых {limit:.3f} мс")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Турнир стратегий AI и замер скорости ходов")
+    parser.add_argument("--strategies", default="random,normal,hard,unbeatable",
+                        help=f"стратегии через запятую: {', '.join(sorted(STRATEGIES))}")
+    parser.add_argument("--mode", default=DEFAULT_MODE, choices=sorted(GAME_MODES))
+    parser.add_argument("--games", type=int, default=20, help="партий на пару стратегий")
+    parser.add_argument("--opening-plies", type=int, default=2, help="случайных полуходов в начале")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="куда записать JSON-отчет")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="базовый отчет")
+    parser.add_argument("--update-baseline", action="store_true", help="записать отчет как базовый")
+    args = parser.parse_args(argv)
+
+    names = [name.strip() for name in args.strategies.split(",") if name.strip()]
+    try:
+        report = run_tournament(names, args.mode, args.games, args.opening_plies, args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+
+    print(f"Режим {report['mode']}, {report['games_per_pair']} партий на пару, {report['seconds']} с")
+    print(f"{'стратегия':<12}{'Эло':>8}{'побед':>8}{'пор.':>8}{'ничьих':>8}"
+          f"{'p50 мс':>10}{'p95 мс':>10}{'p99 мс':>10}")
+    for name, stats in sorted(report["strategies"].items(), key=lambda item: -item[1]["elo"]):
+        latency = stats["latency_ms"]
+        print(f"{name:<12}{stats['elo']:>8.0f}{stats['wins']:>8}{stats['losses']:>8}{stats['draws']:>8}"
+              f"{latency['p50']:>10.3f}{latency['p95']:>10.3f}{latency['p99']:>10.3f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Базовый отчет обновлен: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"Базового отчета нет: {args.baseline}")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if not is_comparable(report, baseline):
+        print("Базовый отчет снят с другими параметрами турнира, сравнение пропущено")
+        return 0
+    regressions = compare_to_baseline(report, baseline)
+    for regression in regressions:
+        print(f"❌ {regression}")
+    if not regressions:
+        print("✅ Без регрессий относительно базового отчета")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,8 +12,15 @@ from prometheus_fastapi_instrumentator import Instrumentator
 import os
 import traceback
 import logging
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
+from app.api import routes
 from app.api.routes import router
+from app.core.ai_executor import init_worker, shutdown_ai_executor
+from app.core.pondering import shutdown_pondering
+from app.storage import sqlite_store
+from app.storage.redis_client import RedisStorage, close_storage, get_storage
+from app.storage.sharded_redis import ShardedRedisStorage
 
 load_dotenv()
 
@@ -28,10 +35,37 @@ logger = logging.getLogger(__name__)
 # Импорт limiter из core
 from app.core.limiter import limiter
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Запуск и остановка воркера
+
+    При запуске загружаются книга дебютов и таблица идеальной игры AI и
+    открываются соединения с Redis (или база SQLite), чтобы первый запрос
+    не платил за подключение. При остановке - pondering, пул AI, отложенные
+    записи кеша партий и соединения с хранилищем.
+    """
+    init_worker()
+    if routes.USE_REDIS:
+        try:
+            storage = await get_storage()
+            await storage.connect()
+        except Exception as e:
+            # Не падаем: запросы пойдут в fallback, клиент переподключится позже
+            logger.warning(f"Redis недоступен при запуске: {e}")
+    elif routes.STORAGE_BACKEND == "sqlite":
+        await (await sqlite_store.get_storage()).ping()
+    yield
+    shutdown_pondering()
+    shutdown_ai_executor()
+    await routes.game_cache.close()  # Записать партии, отложенные в кеше
+    await close_storage()
+    await sqlite_store.close_storage()
+
 app = FastAPI(
     title="TicTacToe API",
     description="API для игры Крестики-нолики",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Настройка Rate Limiter
@@ -65,22 +99,46 @@ app.include_router(router, prefix="/api")
 async def root():
     return {"message": "TicTacToe API", "version": "1.0.0"}
 
+async def _redis_status(storage: RedisStorage) -> str:
+    """Состояние узла Redis: пока circuit breaker разомкнут, Redis не трогаем"""
+    if not storage.available:
+        return "unavailable"
+    return "ok" if await storage.ping() else "error"
+
 @app.get("/health")
 async def health():
     """Health check endpoint"""
-    from app.storage.redis_client import get_storage
-    
     checks = {
         "status": "ok",
         "checks": {}
     }
     
-    # Проверка Redis
+    if routes.STORAGE_BACKEND == "sqlite":
+        storage = await sqlite_store.get_storage()
+        checks["checks"]["sqlite"] = "ok" if await storage.ping() else "error"
+        if checks["checks"]["sqlite"] != "ok":
+            checks["status"] = "degraded"
+        return checks
+    
+    if not routes.USE_REDIS:
+        # STORAGE_BACKEND=memory: партии только в памяти воркера, Redis не нужен
+        checks["checks"]["memory"] = "ok" if await routes.memory_storage.ping() else "error"
+        return checks
+    
+    # Проверка Redis (при нескольких узлах - каждого)
     try:
         storage = await get_storage()
-        client = await storage._get_client()
-        await client.ping()
-        checks["checks"]["redis"] = "ok"
+        if isinstance(storage, ShardedRedisStorage):
+            shards = storage.shards.items()
+            checks["checks"]["redis_circuit"] = {node: shard.breaker.state for node, shard in shards}
+            checks["checks"]["redis"] = {node: await _redis_status(shard) for node, shard in shards}
+            statuses = checks["checks"]["redis"].values()
+        else:
+            checks["checks"]["redis_circuit"] = storage.breaker.state
+            checks["checks"]["redis"] = await _redis_status(storage)
+            statuses = [checks["checks"]["redis"]]
+        if any(status != "ok" for status in statuses):
+            checks["status"] = "degraded"
     except Exception as e:
         logger.error(f"Redis health check failed: {e}")
         checks["checks"]["redis"] = "error"
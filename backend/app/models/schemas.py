@@ -4,6 +4,10 @@ Pydantic схемы для API
 from pydantic import BaseModel
 from typing import Optional, List
 
+class StartGameRequest(BaseModel):
+    mode: str = "classic"
+    difficulty: str = "normal"
+
 class MoveRequest(BaseModel):
     game_id: str
     row: int
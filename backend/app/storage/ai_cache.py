@@ -0,0 +1,104 @@
+"""
+Кеш ходов AI
+
+Разные игроки постоянно приходят в одинаковые позиции. Ход AI
+кешируется по канонической (с учетом симметрий) позиции и уровню
+сложности в двух уровнях: небольшой LRU в памяти воркера и общий для
+всех воркеров hash в Redis. В кеше хранится ход в канонической
+ориентации, при выдаче он переводится обратно в ориентацию игры.
+"""
+import logging
+import os
+from collections import OrderedDict
+from typing import Optional, Tuple
+from app.game.bitboard import BitboardTicTacToe
+from app.game.symmetry import canonicalize, position_key, to_canonical, to_original
+from app.storage.game_store import STORAGE_BACKEND
+from app.storage.redis_client import get_storage
+from app.core.metrics import AI_CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+AI_CACHE_LOCAL_SIZE = int(os.getenv("AI_CACHE_LOCAL_SIZE", 10000))
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", 200000))
+# Кешируем только уровни с поиском: эвристику дешевле посчитать, чем сходить в Redis
+AI_CACHE_LEVELS = {
+    level.strip() for level in os.getenv("AI_CACHE_LEVELS", "hard").split(",") if level.strip()
+}
+# Общий кеш есть только у хранилища Redis
+USE_REDIS = STORAGE_BACKEND == "redis"
+
+
+class AIMoveCache:
+    """Двухуровневый кеш ходов AI: LRU в памяти + общий hash в Redis"""
+
+    def __init__(self, local_size: int = AI_CACHE_LOCAL_SIZE, use_redis: bool = USE_REDIS):
+        self.local_size = local_size
+        self.use_redis = use_redis
+        self._local: "OrderedDict[str, int]" = OrderedDict()
+
+    @staticmethod
+    def _field(game: BitboardTicTacToe) -> Tuple[str, int]:
+        """Ключ кеша и номер симметрии, приводящей игру к канонической форме"""
+        x_bits, o_bits, transform = canonicalize(game.x_bits, game.o_bits, game.rows, game.cols)
+        key = position_key(x_bits, o_bits, game.rows * game.cols)
+        field = f"{game.rows}x{game.cols}x{game.win_length}:{game.difficulty}:{key:x}"
+        return field, transform
+
+    def _remember(self, field: str, move: int):
+        self._local[field] = move
+        self._local.move_to_end(field)
+        if len(self._local) > self.local_size:
+            self._local.popitem(last=False)
+
+    async def get(self, game: BitboardTicTacToe) -> Optional[Tuple[int, int]]:
+        """Ход из кеша для позиции игры (None - промах)"""
+        if game.difficulty not in AI_CACHE_LEVELS:
+            return None
+        field, transform = self._field(game)
+
+        move = self._local.get(field)
+        if move is not None:
+            self._local.move_to_end(field)
+            AI_CACHE_REQUESTS.labels("local", "hit").inc()
+        else:
+            AI_CACHE_REQUESTS.labels("local", "miss").inc()
+            if not self.use_redis:
+                return None
+            try:
+                storage = await get_storage()
+                move = await storage.get_ai_move(field)
+            except Exception as e:
+                logger.warning(f"Кеш ходов AI в Redis недоступен: {e}")
+                move = None
+            if move is None:
+                AI_CACHE_REQUESTS.labels("redis", "miss").inc()
+                return None
+            AI_CACHE_REQUESTS.labels("redis", "hit").inc()
+            self._remember(field, move)
+
+        return divmod(to_original(move, transform, game.rows, game.cols), game.cols)
+
+    async def put(self, game: BitboardTicTacToe, move: Tuple[int, int]):
+        """Запомнить ход AI для позиции игры (до того, как ход сделан)"""
+        if game.difficulty not in AI_CACHE_LEVELS:
+            return
+        field, transform = self._field(game)
+        index = to_canonical(move[0] * game.cols + move[1], transform, game.rows, game.cols)
+        self._remember(field, index)
+        if self.use_redis:
+            try:
+                storage = await get_storage()
+                await storage.save_ai_move(field, index, AI_CACHE_MAX_ENTRIES)
+            except Exception as e:
+                logger.warning(f"Не удалось записать ход AI в Redis: {e}")
+
+
+_cache_instance: Optional[AIMoveCache] = None
+
+def get_ai_cache() -> AIMoveCache:
+    """Получить кеш ходов AI воркера (singleton)"""
+    global _cache_instance
+    if _cache_instance is None:
+        _cache_instance = AIMoveCache()
+    return _cache_instance
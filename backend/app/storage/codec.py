@@ -0,0 +1,216 @@
+"""
+Компактный бинарный формат партии
+
+Партия в Redis хранится не JSON-ом, а несколькими байтами:
+
+    байт 0:    0x80 | версия формата (у JSON первый байт "{")
+    байт 1:    флаги, старшие биты первыми:
+                   биты 7-6 - статус (STATUSES),
+                   бит 5    - чей ход (0 - X, 1 - O),
+                   биты 4-2 - уровень сложности (DIFFICULTIES),
+                   биты 1-0 - победитель (WINNERS)
+    байты 2-4: rows, cols, win_length
+    байт 5:    число сделанных ходов
+    далее:     клетки по 2 бита построчно, начиная со старших битов
+               первого байта: 00 - пусто, 01 - X, 10 - O
+
+Все поля выровнены по байтам, а клетки идут от старших битов к
+младшим, поэтому клетку index можно прочитать или записать на месте
+(Lua-скриптом или BITFIELD u2 со смещением HEADER_BITS + 2 * index) без
+разбора всей записи: при GAME_FORMAT=bitfield ход пишет в Redis только
+заголовок и изменившиеся клетки (delta_fields). Поле 5x5 занимает 13 байт вместо ~250 байт JSON.
+
+id партии в записи не хранится: он уже есть в ключе. Старый формат
+(JSON) читается прозрачно, пока все записи не перезапишутся.
+"""
+import json
+import struct
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Tuple
+from app.game.bitboard import BitboardTicTacToe
+
+VERSION = 1
+VERSION_FLAG = 0x80
+HEADER = struct.Struct(">BBBBBB")
+HEADER_BITS = HEADER.size * 8
+
+# Только дописывать в конец: индексы уже лежат в сохраненных партиях
+STATUSES = ("playing", "finished")
+DIFFICULTIES = ("normal", "hard", "expert", "unbeatable")
+WINNERS = (None, 'X', 'O')
+
+EMPTY_CODE, X_CODE, O_CODE = 0, 1, 2
+
+
+class CellTables(NamedTuple):
+    """Таблицы упаковки клеток для поля из cells клеток"""
+    size: int  # Байт на клетки
+    encode: Tuple[Tuple[int, ...], ...]  # [байт битборда][значение] -> вклад X в упакованное число
+    decode: Tuple[Tuple[Optional[Tuple[int, int]], ...], ...]  # [байт записи][значение] -> (x, o)
+
+
+@lru_cache(maxsize=None)
+def get_cell_tables(cells: int) -> CellTables:
+    """Получить (и закешировать) таблицы упаковки по байтам"""
+    size = (2 * cells + 7) // 8
+    total_bits = size * 8
+
+    encode = []
+    for chunk in range((cells + 7) // 8):
+        table = []
+        for value in range(256):
+            packed = 0
+            for bit in range(8):
+                index = chunk * 8 + bit
+                if value >> bit & 1 and index < cells:
+                    packed |= X_CODE << (total_bits - 2 - 2 * index)
+            table.append(packed)
+        encode.append(tuple(table))
+
+    decode = []
+    for byte in range(size):
+        table = []
+        for value in range(256):
+            x_bits = o_bits = 0
+            valid = True
+            for slot in range(4):
+                index = byte * 4 + slot
+                code = value >> (6 - 2 * slot) & 3
+                if code and index >= cells:
+                    valid = False  # Биты за пределами поля должны быть нулевыми
+                elif code == X_CODE:
+                    x_bits |= 1 << index
+                elif code == O_CODE:
+                    o_bits |= 1 << index
+                elif code:
+                    valid = False
+            table.append((x_bits, o_bits) if valid else None)
+        decode.append(tuple(table))
+
+    return CellTables(size, tuple(encode), tuple(decode))
+
+
+def pack_cells(x_bits: int, o_bits: int, cells: int) -> bytes:
+    """Клетки поля по 2 бита, от старших битов к младшим"""
+    tables = get_cell_tables(cells)
+    packed_x = packed_o = 0
+    for chunk, table in enumerate(tables.encode):
+        shift = chunk * 8
+        packed_x |= table[x_bits >> shift & 0xFF]
+        packed_o |= table[o_bits >> shift & 0xFF]
+    return (packed_x | packed_o << 1).to_bytes(tables.size, "big")
+
+
+def unpack_cells(data: bytes, cells: int) -> Tuple[int, int]:
+    """Обратная операция к pack_cells: (x_bits, o_bits)"""
+    tables = get_cell_tables(cells)
+    if len(data) != tables.size:
+        raise ValueError("Неверная длина клеток партии")
+    x_bits = o_bits = 0
+    for table, value in zip(tables.decode, data):
+        decoded = table[value]
+        if decoded is None:
+            raise ValueError("Неверный код клетки партии")
+        x_bits |= decoded[0]
+        o_bits |= decoded[1]
+    return x_bits, o_bits
+
+
+def encode_header(game: BitboardTicTacToe) -> bytes:
+    """Заголовок записи партии (версия, флаги, размеры, число ходов)"""
+    flags = (STATUSES.index(game.status) << 6
+             | (game.current_player == 'O') << 5
+             | DIFFICULTIES.index(game.difficulty) << 2
+             | WINNERS.index(game.check_winner()))
+    moves = bin(game.x_bits | game.o_bits).count('1')
+    return HEADER.pack(VERSION_FLAG | VERSION, flags, game.rows, game.cols, game.win_length, moves)
+
+
+def encode_game(game: BitboardTicTacToe) -> bytes:
+    """Партия в компактном бинарном формате"""
+    return encode_header(game) + pack_cells(game.x_bits, game.o_bits, game.rows * game.cols)
+
+
+def decode_game(data: bytes, game_id: str) -> BitboardTicTacToe:
+    """Партия из бинарного формата или старого JSON"""
+    if data[:1] == b"{":
+        return decode_legacy_json(data)
+    if len(data) < HEADER.size:
+        raise ValueError("Запись партии обрезана")
+    version, flags, rows, cols, win_length, _ = HEADER.unpack_from(data, 0)
+    if version != VERSION_FLAG | VERSION:
+        raise ValueError(f"Неизвестная версия формата партии: {version & 0x7F}")
+    if flags & 3 >= len(WINNERS):
+        raise ValueError("Неверный код победителя партии")
+    x_bits, o_bits = unpack_cells(data[HEADER.size:], rows * cols)
+
+    # Победитель записан в заголовке: линии на большом поле не пересканируются
+    game = BitboardTicTacToe.restore((rows, cols, win_length, x_bits, o_bits), WINNERS[flags & 3], game_id)
+    game.status = STATUSES[flags >> 6 & 3]
+    game.current_player = 'O' if flags >> 5 & 1 else 'X'
+    game.difficulty = DIFFICULTIES[flags >> 2 & 7]
+    return game
+
+
+def decode_legacy_json(data: bytes) -> BitboardTicTacToe:
+    """Партия из старого формата (JSON с вложенным списком клеток)"""
+    game_data = json.loads(data.decode('utf-8'))
+    game = BitboardTicTacToe(
+        game_data.get("rows", BitboardTicTacToe.BOARD_SIZE),
+        game_data.get("cols", BitboardTicTacToe.BOARD_SIZE),
+        game_data.get("win_length", BitboardTicTacToe.WIN_LENGTH)
+    )
+    game.game_id = game_data["game_id"]
+    game.board = game_data["board"]
+    game.status = game_data["status"]
+    game.current_player = game_data.get("current_player", "X")
+    game.difficulty = game_data.get("difficulty", "normal")
+    return game
+
+
+def encode_legacy_json(game: BitboardTicTacToe) -> bytes:
+    """Партия в старом формате (для отката и сравнения)"""
+    game_data = {
+        "game_id": game.game_id,
+        "board": game.board,
+        "status": game.status,
+        "current_player": game.current_player,
+        "rows": game.rows,
+        "cols": game.cols,
+        "win_length": game.win_length,
+        "difficulty": game.difficulty
+    }
+    return json.dumps(game_data).encode('utf-8')
+
+
+def cell_offset(index: int) -> int:
+    """Смещение 2-битного кода клетки в записи, в битах от начала"""
+    return HEADER_BITS + 2 * index
+
+
+def delta_fields(game: BitboardTicTacToe, stored_x: int, stored_o: int) -> List[Tuple[str, int, int]]:
+    """Поля BITFIELD SET (тип, смещение, значение), переводящие записанную
+    партию с клетками (stored_x, stored_o) в текущее состояние game
+
+    Заголовок пишется целиком (u48), клетки - только изменившиеся (u2).
+    """
+    fields = [(f"u{HEADER_BITS}", 0, int.from_bytes(encode_header(game), "big"))]
+    changed = (game.x_bits ^ stored_x) | (game.o_bits ^ stored_o)
+    while changed:
+        low = changed & -changed
+        if game.x_bits & low:
+            code = X_CODE
+        elif game.o_bits & low:
+            code = O_CODE
+        else:
+            code = EMPTY_CODE
+        fields.append(("u2", cell_offset(low.bit_length() - 1), code))
+        changed ^= low
+    return fields
+
+
+def cell_codes(data: bytes, cells: int) -> List[int]:
+    """Коды клеток записи по порядку (для отладки и тестов)"""
+    packed = int.from_bytes(data[HEADER.size:], "big")
+    total_bits = (len(data) - HEADER.size) * 8
+    return [packed >> (total_bits - 2 - 2 * index) & 3 for index in range(cells)]
@@ -0,0 +1,162 @@
+"""
+Кеш партий воркера перед хранилищем
+
+Партию почти всегда обслуживает воркер, который ее создал, поэтому ход и
+опрос статуса могут не ходить в Redis и не разбирать запись заново, а
+брать партию из небольшого LRU-кеша с TTL. Режимы (GAME_CACHE):
+
+    off            - кеша нет, каждое чтение идет в хранилище (по умолчанию)
+    write-through  - запись сразу уходит в хранилище, кеш обновляется
+                     после нее; чтение - из кеша
+    write-behind   - запись только помечает партию в кеше измененной;
+                     фоновая задача раз в GAME_CACHE_FLUSH_INTERVAL пишет
+                     все измененные партии одним сбросом. Последние ходы
+                     теряются при падении воркера.
+
+Кеш не сверяется с хранилищем, поэтому оба режима с кешем - только для
+sticky-балансировки по партии: иначе другой воркер ответит устаревшей
+копией до GAME_CACHE_TTL и, сделав по ней ход, перезапишет более новую
+партию в хранилище.
+
+Кеш хранит и отдает копии: изменения партии в запросе не попадают в кеш
+до записи. Загрузка из хранилища не заменяет запись, сделанную в кеш
+после начала загрузки (put с loaded_at = stamp() до чтения).
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from app.game.bitboard import BitboardTicTacToe
+from app.storage.unit_of_work import FlushGames
+from app.core.metrics import (
+    GAME_CACHE_DIRTY, GAME_CACHE_ENTRIES, GAME_CACHE_FLUSH_SECONDS, GAME_CACHE_REQUESTS,
+)
+
+logger = logging.getLogger(__name__)
+
+CACHE_MODES = ("off", "write-through", "write-behind")
+GAME_CACHE = os.getenv("GAME_CACHE", "off").lower()
+GAME_CACHE_SIZE = int(os.getenv("GAME_CACHE_SIZE", 10000))
+GAME_CACHE_TTL = float(os.getenv("GAME_CACHE_TTL", 300))
+GAME_CACHE_FLUSH_INTERVAL = float(os.getenv("GAME_CACHE_FLUSH_INTERVAL", 0.5))
+
+
+class GameCache:
+    """LRU-кеш партий воркера с TTL и отложенной записью"""
+
+    def __init__(self, flush: FlushGames, mode: str = GAME_CACHE, max_entries: int = GAME_CACHE_SIZE,
+                 ttl: float = GAME_CACHE_TTL, flush_interval: float = GAME_CACHE_FLUSH_INTERVAL):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Неизвестный режим кеша партий: {mode}")
+        self._flush = flush
+        self.mode = mode
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self._entries: "OrderedDict[str, Tuple[float, int, BitboardTicTacToe]]" = OrderedDict()
+        self._stamp = 0  # Номер последнего put: по нему видно, что запись новее загрузки
+        # Измененные партии, еще не записанные в хранилище (в том числе вытесненные)
+        self._dirty: Dict[str, BitboardTicTacToe] = {}
+        self._flusher: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    @property
+    def write_behind(self) -> bool:
+        return self.mode == "write-behind"
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, game_id: str) -> Optional[BitboardTicTacToe]:
+        """Копия партии из кеша (None - промах)"""
+        if not self.enabled:
+            return None
+        entry = self._entries.get(game_id)
+        if entry is not None and entry[0] <= time.monotonic():
+            del self._entries[game_id]
+            GAME_CACHE_ENTRIES.set(len(self._entries))
+            entry = None
+        if entry is not None:
+            self._entries.move_to_end(game_id)
+            game = entry[2]
+        else:
+            game = self._dirty.get(game_id)
+        if game is None:
+            GAME_CACHE_REQUESTS.labels(result="miss").inc()
+            return None
+        GAME_CACHE_REQUESTS.labels(result="hit").inc()
+        return game.copy()
+
+    def stamp(self) -> int:
+        """Номер последнего put; берется перед загрузкой партии из хранилища"""
+        return self._stamp
+
+    def put(self, games: List[BitboardTicTacToe], dirty: bool = False, loaded_at: Optional[int] = None):
+        """Положить партии в кеш; dirty - записать их позже (write-behind)
+
+        loaded_at - stamp() перед чтением партий из хранилища: если партию
+        записали в кеш позже, загруженная копия устарела и не кладется.
+        """
+        if not self.enabled:
+            return
+        expires_at = time.monotonic() + self.ttl
+        self._stamp += 1
+        for game in games:
+            if loaded_at is not None:
+                entry = self._entries.get(game.game_id)
+                if (entry is not None and entry[1] > loaded_at) or game.game_id in self._dirty:
+                    continue
+            snapshot = game.copy()
+            self._entries[game.game_id] = (expires_at, self._stamp, snapshot)
+            self._entries.move_to_end(game.game_id)
+            if dirty:
+                self._dirty[game.game_id] = snapshot
+            else:
+                self._dirty.pop(game.game_id, None)
+        while len(self._entries) > self.max_entries:
+            # Вытесненная измененная партия остается в _dirty до сброса
+            self._entries.popitem(last=False)
+        GAME_CACHE_ENTRIES.set(len(self._entries))
+        GAME_CACHE_DIRTY.set(len(self._dirty))
+        if dirty and (self._flusher is None or self._flusher.done()):
+            self._flusher = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def flush(self):
+        """Записать измененные партии одним сбросом"""
+        if not self._dirty:
+            return
+        games = list(self._dirty.values())
+        self._dirty.clear()
+        GAME_CACHE_DIRTY.set(0)
+        started = time.perf_counter()
+        try:
+            await self._flush(games)
+        except Exception as e:
+            logger.error(f"Не удалось записать партии из кеша: {e}", exc_info=True)
+            for game in games:
+                # Более новая версия могла появиться, пока шла запись
+                self._dirty.setdefault(game.game_id, game)
+            GAME_CACHE_DIRTY.set(len(self._dirty))
+        finally:
+            GAME_CACHE_FLUSH_SECONDS.observe(time.perf_counter() - started)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def close(self):
+        """Остановить фоновую запись и записать все, что накопилось"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
@@ -0,0 +1,70 @@
+"""
+Общий интерфейс хранилищ партий
+
+Хранилище выбирается переменной STORAGE_BACKEND:
+
+    redis   - RedisStorage (app.storage.redis_client), общее для всех
+              воркеров; пока Redis недоступен, запросы идут в память.
+              Несколько узлов в REDIS_NODES - ShardedRedisStorage
+              (app.storage.sharded_redis)
+    sqlite  - SQLiteStorage (app.storage.sqlite_store), файл в режиме WAL;
+              для одного сервера без Redis
+    memory  - MemoryStorage (app.storage.memory_store), только память
+              воркера; партии теряются при перезапуске
+
+Если STORAGE_BACKEND не задан, он берется из старого флага USE_REDIS
+(true - redis, false - memory).
+
+Семантика TTL у всех одна: партия живет GAME_TTL_HOURS с последней
+записи, токен привязки Telegram - LINK_TOKEN_TTL_SECONDS; истекшая запись
+читается как отсутствующая.
+"""
+import os
+from typing import List, Optional, Protocol, runtime_checkable
+from app.game.bitboard import BitboardTicTacToe
+
+STORAGE_BACKENDS = ("redis", "sqlite", "memory")
+STORAGE_BACKEND = os.getenv(
+    "STORAGE_BACKEND",
+    "redis" if os.getenv("USE_REDIS", "true").lower() == "true" else "memory"
+).lower()
+if STORAGE_BACKEND not in STORAGE_BACKENDS:
+    raise ValueError(f"Неизвестное хранилище STORAGE_BACKEND={STORAGE_BACKEND}, "
+                     f"допустимые: {', '.join(STORAGE_BACKENDS)}")
+
+
+@runtime_checkable
+class GameStore(Protocol):
+    """Хранилище партий и токенов привязки Telegram
+
+    Методы не бросают исключений из-за недоступности хранилища: запись
+    возвращает False, чтение - None, и вызывающий код уходит в fallback.
+    """
+
+    @property
+    def available(self) -> bool:
+        """Можно ли сейчас обращаться к хранилищу"""
+
+    async def save_game(self, game: BitboardTicTacToe) -> bool:
+        """Сохранить партию (TTL отсчитывается заново)"""
+
+    async def save_games(self, games: List[BitboardTicTacToe]) -> bool:
+        """Сохранить несколько партий одной записью"""
+
+    async def get_game(self, game_id: str) -> Optional[BitboardTicTacToe]:
+        """Партия или None, если ее нет или она истекла"""
+
+    async def delete_game(self, game_id: str) -> bool:
+        """Удалить партию"""
+
+    async def save_link_token(self, token: str, chat_id: str) -> bool:
+        """Сохранить токен привязки Telegram"""
+
+    async def get_chat_id_by_token(self, token: str) -> Optional[str]:
+        """chat_id по токену или None, если токена нет или он истек"""
+
+    async def ping(self) -> bool:
+        """Проверка хранилища для /health"""
+
+    async def close(self):
+        """Записать отложенное и освободить соединения"""
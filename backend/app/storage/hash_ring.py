@@ -0,0 +1,61 @@
+"""
+Консистентное хеширование ключей по узлам
+
+Каждый узел ставится на кольцо 64-битных хешей в vnodes точках
+(виртуальные узлы), ключ принадлежит первой точке по часовой стрелке от
+своего хеша. Много точек на узел выравнивают доли узлов, а при
+добавлении узла к нему переходят только ключи, попавшие на его новые
+точки (в среднем 1/N всех ключей), остальные остаются на месте.
+
+Хеш - blake2b, а не встроенный hash(): он одинаков во всех процессах и
+при каждом запуске, иначе воркеры искали бы один ключ на разных узлах.
+"""
+import bisect
+import hashlib
+from typing import Dict, Iterable, List
+
+
+def ring_hash(value: str) -> int:
+    """Стабильный 64-битный хеш строки"""
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Кольцо консистентного хеширования с виртуальными узлами"""
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = 160):
+        if vnodes < 1:
+            raise ValueError("Число виртуальных узлов должно быть положительным")
+        self.vnodes = vnodes
+        self._owners: Dict[int, str] = {}
+        self._points: List[int] = []
+        for node in nodes:
+            self.add(node)
+
+    @property
+    def nodes(self) -> List[str]:
+        return sorted(set(self._owners.values()))
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def add(self, node: str):
+        """Поставить узел на кольцо"""
+        if node in self._owners.values():
+            raise ValueError(f"Узел уже на кольце: {node}")
+        for replica in range(self.vnodes):
+            # При редком совпадении точек она остается за узлом, добавленным раньше
+            self._owners.setdefault(ring_hash(f"{node}#{replica}"), node)
+        self._points = sorted(self._owners)
+
+    def remove(self, node: str):
+        """Снять узел с кольца: его ключи переходят к соседям по кольцу"""
+        self._owners = {point: owner for point, owner in self._owners.items() if owner != node}
+        self._points = sorted(self._owners)
+
+    def node_for(self, key: str) -> str:
+        """Узел, которому принадлежит ключ"""
+        if not self._points:
+            raise LookupError("На кольце нет узлов")
+        index = bisect.bisect(self._points, ring_hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
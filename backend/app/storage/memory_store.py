@@ -0,0 +1,159 @@
+"""
+Хранилище партий в памяти воркера
+
+Используется как самостоятельное хранилище (STORAGE_BACKEND=memory) и как
+fallback, пока Redis недоступен. В отличие от простого dict память
+ограничена: записи живут GAME_TTL_HOURS (токены привязки - 10 минут, как
+в Redis), а сверх лимита числа записей и байт вытесняются самые давно
+записанные.
+
+Записи лежат в OrderedDict в порядке последней записи. TTL у всех записей
+хранилища одинаковый и обновляется при записи (как SETEX в Redis), поэтому
+порядок записи совпадает с порядком истечения: и истекшие, и вытесняемые
+по лимиту записи снимаются с начала словаря за O(1). Чтение порядок не
+меняет - активная партия и так перезаписывается каждым ходом.
+
+Партии хранятся в бинарном формате (app.storage.codec): десятки байт
+вместо живого объекта с полем и геометрией.
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from app.game.bitboard import BitboardTicTacToe
+from app.storage.codec import decode_game, encode_game
+from app.core.metrics import MEMORY_STORE_BYTES, MEMORY_STORE_ENTRIES, MEMORY_STORE_EVICTIONS
+
+LINK_TOKEN_TTL_SECONDS = 600  # Токен привязки Telegram живет 10 минут
+# Примерные накладные расходы на запись: ключ-строка, кортеж и слот словаря
+ENTRY_OVERHEAD = 200
+
+
+class MemoryStore:
+    """Ключ -> байты с общим TTL, лимитом числа записей и байт"""
+
+    def __init__(self, name: str, ttl: float, max_entries: int, max_bytes: int):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    @staticmethod
+    def _size(key: str, value: bytes) -> int:
+        return len(key) + len(value) + ENTRY_OVERHEAD
+
+    def _pop(self, key: str, value: bytes):
+        self.bytes -= self._size(key, value)
+
+    def _evict_oldest(self, reason: str):
+        key, (_, value) = self._entries.popitem(last=False)
+        self._pop(key, value)
+        MEMORY_STORE_EVICTIONS.labels(store=self.name, reason=reason).inc()
+
+    def _update_metrics(self):
+        MEMORY_STORE_ENTRIES.labels(store=self.name).set(len(self._entries))
+        MEMORY_STORE_BYTES.labels(store=self.name).set(self.bytes)
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self._pop(key, value)
+            MEMORY_STORE_EVICTIONS.labels(store=self.name, reason="expired").inc()
+            self._update_metrics()
+            return None
+        return value
+
+    def set(self, key: str, value: bytes):
+        now = time.monotonic()
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._pop(key, old[1])
+        self._entries[key] = (now + self.ttl, value)
+        self.bytes += self._size(key, value)
+
+        # Истекшие записи - в начале словаря
+        while self._entries and next(iter(self._entries.values()))[0] <= now:
+            self._evict_oldest("expired")
+        while len(self._entries) > self.max_entries:
+            self._evict_oldest("capacity")
+        while self.bytes > self.max_bytes and self._entries:
+            self._evict_oldest("memory")
+        self._update_metrics()
+
+    def delete(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._pop(key, entry[1])
+        self._update_metrics()
+        return True
+
+
+class MemoryStorage:
+    """Партии и токены привязки в памяти воркера (интерфейс как у RedisStorage)"""
+
+    def __init__(self):
+        self.games = MemoryStore(
+            "games",
+            ttl=int(os.getenv("GAME_TTL_HOURS", 24)) * 3600,
+            max_entries=int(os.getenv("MEMORY_MAX_GAMES", 100000)),
+            max_bytes=int(os.getenv("MEMORY_MAX_BYTES", 64 * 1024 * 1024))
+        )
+        self.tokens = MemoryStore(
+            "link_tokens",
+            ttl=LINK_TOKEN_TTL_SECONDS,
+            max_entries=int(os.getenv("MEMORY_MAX_TOKENS", 10000)),
+            max_bytes=int(os.getenv("MEMORY_MAX_TOKEN_BYTES", 4 * 1024 * 1024))
+        )
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    async def save_game(self, game: BitboardTicTacToe) -> bool:
+        """Сохранить игру"""
+        return await self.save_games([game])
+
+    async def save_games(self, games: List[BitboardTicTacToe]) -> bool:
+        """Сохранить несколько игр"""
+        for game in games:
+            self.games.set(game.game_id, encode_game(game))
+        return True
+
+    async def get_game(self, game_id: str) -> Optional[BitboardTicTacToe]:
+        """Получить игру (None, если ее нет или она истекла)"""
+        data = self.games.get(game_id)
+        return decode_game(data, game_id) if data is not None else None
+
+    async def delete_game(self, game_id: str) -> bool:
+        """Удалить игру"""
+        return self.games.delete(game_id)
+
+    async def save_link_token(self, token: str, chat_id: str) -> bool:
+        """Сохранить временный токен для привязки Telegram"""
+        self.tokens.set(token, chat_id.encode('utf-8'))
+        return True
+
+    async def get_chat_id_by_token(self, token: str) -> Optional[str]:
+        """Получить chat_id по токену привязки"""
+        data = self.tokens.get(token)
+        return data.decode('utf-8') if data is not None else None
+
+    async def ping(self) -> bool:
+        """Память всегда доступна"""
+        return True
+
+    async def close(self):
+        """Закрывать нечего: записи теряются вместе с воркером"""
@@ -0,0 +1,124 @@
+"""
+Атомарный ход игрока на стороне Redis
+
+Lua-скрипт проверяет и применяет ход X прямо к бинарной записи партии
+(формат app.storage.codec) за один round-trip: GET, разбор и SET идут
+внутри Redis, поэтому два одновременных хода в одну партию (двойной
+клик, повтор запроса клиентом) не затирают друг друга.
+
+После хода X в записи выставляется "ход O": пока воркер считает ответ
+AI, следующий ход игрока отвергается как конфликтный. Ответ AI
+сохраняется обычной записью партии, и ход снова переходит к игроку.
+
+Вместе с "ход O" скрипт ставит ключ ai_turn:<id> с TTL - аренду расчета
+ответа AI. Если воркер упал или запрос прервался и ход не вернулся
+игроку, аренда истекает: следующий ход получает MOVE_AI_TURN, забирает
+аренду себе и сам досчитывает ответ AI.
+"""
+from typing import NamedTuple, Optional
+from app.game.bitboard import BitboardTicTacToe
+from app.storage.codec import HEADER, VERSION, VERSION_FLAG, X_CODE, decode_game
+
+# Результаты скрипта
+MOVE_APPLIED = "ok"
+MOVE_NOT_FOUND = "not_found"  # Партии нет (или она в fallback в памяти)
+MOVE_UNSUPPORTED = "unsupported"  # Запись в старом JSON-формате
+MOVE_BAD_CELL = "bad_cell"
+MOVE_FINISHED = "finished"
+MOVE_NOT_YOUR_TURN = "not_your_turn"
+MOVE_AI_TURN = "ai_turn"  # Ход AI, но его никто не считает: аренда передана вызывающему
+MOVE_OCCUPIED = "occupied"
+
+# KEYS[1] - ключ партии, KEYS[2] - аренда расчета ответа AI,
+# ARGV - row, col, TTL партии в секундах, TTL аренды в миллисекундах.
+# Раскладка записи - как в app.storage.codec: байт версии, флаги
+# (статус, чей ход, сложность, победитель), rows, cols, win_length,
+# число ходов и клетки по 2 бита от старших битов к младшим.
+APPLY_MOVE_LUA = """
+local record = redis.call('GET', KEYS[1])
+if not record then
+    return {'not_found'}
+end
+if string.byte(record, 1) ~= @VERSION_BYTE@ then
+    return {'unsupported'}
+end
+local flags = string.byte(record, 2)
+local rows, cols, win_length, moves = string.byte(record, 3, 6)
+local row, col = tonumber(ARGV[1]), tonumber(ARGV[2])
+if row < 0 or row >= rows or col < 0 or col >= cols then
+    return {'bad_cell', record}
+end
+if bit.rshift(flags, 6) ~= 0 then
+    return {'finished', record}
+end
+if bit.band(flags, 0x20) ~= 0 then
+    if redis.call('SET', KEYS[2], '1', 'PX', ARGV[4], 'NX') then
+        return {'ai_turn', record}
+    end
+    return {'not_your_turn', record}
+end
+
+local function cell(r, c)
+    local index = r * cols + c
+    local byte = string.byte(record, @HEADER_SIZE@ + 1 + math.floor(index / 4))
+    return bit.band(bit.rshift(byte, 6 - 2 * (index % 4)), 3)
+end
+
+if cell(row, col) ~= 0 then
+    return {'occupied', record}
+end
+local index = row * cols + col
+local pos = @HEADER_SIZE@ + 1 + math.floor(index / 4)
+local byte = bit.bor(string.byte(record, pos), bit.lshift(@X_CODE@, 6 - 2 * (index % 4)))
+record = string.sub(record, 1, pos - 1) .. string.char(byte) .. string.sub(record, pos + 1)
+moves = moves + 1
+
+-- Победа возможна только по линиям через новый камень
+local won = false
+for _, dir in ipairs({{0, 1}, {1, 0}, {1, 1}, {1, -1}}) do
+    local run = 1
+    for _, sign in ipairs({-1, 1}) do
+        local r, c = row + sign * dir[1], col + sign * dir[2]
+        while r >= 0 and r < rows and c >= 0 and c < cols and cell(r, c) == @X_CODE@ do
+            run = run + 1
+            r, c = r + sign * dir[1], c + sign * dir[2]
+        end
+    end
+    if run >= win_length then
+        won = true
+        break
+    end
+end
+
+flags = bit.band(flags, 0x1C)  -- Уровень сложности не меняется
+if won then
+    flags = bit.bor(flags, 0x40, 1)  -- finished, победил X
+elseif moves == rows * cols then
+    flags = bit.bor(flags, 0x40)  -- finished, ничья
+else
+    flags = bit.bor(flags, 0x20)  -- Ход AI
+    redis.call('SET', KEYS[2], '1', 'PX', ARGV[4])
+end
+record = string.sub(record, 1, 1) .. string.char(flags, rows, cols, win_length, moves)
+    .. string.sub(record, @HEADER_SIZE@ + 1)
+redis.call('SET', KEYS[1], record, 'EX', ARGV[3])
+return {'ok', record}
+"""
+
+APPLY_MOVE_SCRIPT = (APPLY_MOVE_LUA
+                     .replace("@VERSION_BYTE@", str(VERSION_FLAG | VERSION))
+                     .replace("@HEADER_SIZE@", str(HEADER.size))
+                     .replace("@X_CODE@", str(X_CODE)))
+
+
+class MoveResult(NamedTuple):
+    """Результат атомарного хода: код и партия после него (или до отказа)"""
+    result: str
+    game: Optional[BitboardTicTacToe]
+
+
+def parse_move_reply(reply, game_id: str) -> MoveResult:
+    """Разобрать ответ скрипта"""
+    result = reply[0].decode() if isinstance(reply[0], bytes) else reply[0]
+    game = decode_game(reply[1], game_id) if len(reply) > 1 else None
+    return MoveResult(result, game)
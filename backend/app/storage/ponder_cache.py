@@ -0,0 +1,106 @@
+"""
+Кеш ответов pondering
+
+Пока игрок думает, фоновая задача (app.core.pondering) заранее считает
+ответ AI на каждый возможный ход игрока. Ответы лежат в памяти воркера
+недолго и только для одной, последней позиции партии: ключ - id игры и
+позиция после хода игрока. Когда ход пришел, остальные ответы партии
+выбрасываются, а их время вычисления учитывается как потраченное зря.
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+from app.game.bitboard import BitboardTicTacToe
+from app.core.metrics import AI_PONDER_LOOKUPS, AI_PONDER_CPU_SECONDS
+
+AI_PONDER_TTL = float(os.getenv("AI_PONDER_TTL", 60))
+AI_PONDER_MAX_GAMES = int(os.getenv("AI_PONDER_MAX_GAMES", 1000))
+
+Position = Tuple[int, int]  # (x_bits, o_bits)
+
+
+class PonderedReply(NamedTuple):
+    """Заранее посчитанный ответ AI"""
+    move: Tuple[int, int]
+    compute_seconds: float
+
+
+class PonderedGame(NamedTuple):
+    """Ответы одной партии"""
+    expires_at: float
+    replies: Dict[Position, PonderedReply]
+
+
+class PonderCache:
+    """Ответы AI, посчитанные заранее, по партиям"""
+
+    def __init__(self, ttl: float = AI_PONDER_TTL, max_games: int = AI_PONDER_MAX_GAMES):
+        self.ttl = ttl
+        self.max_games = max_games
+        self._games: "OrderedDict[str, PonderedGame]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._games)
+
+    def _prune(self, now: float):
+        """Выбросить просроченные партии и лишние сверх лимита"""
+        while self._games:
+            game_id, entry = next(iter(self._games.items()))
+            if entry.expires_at > now and len(self._games) <= self.max_games:
+                break
+            self.discard(game_id)
+
+    def start(self, game_id: str):
+        """Начать новый набор ответов партии (старый выбрасывается)"""
+        self.discard(game_id)
+        now = time.monotonic()
+        self._games[game_id] = PonderedGame(now + self.ttl, {})
+        self._prune(now)
+
+    def put(self, game_id: str, position: Position, reply: PonderedReply) -> bool:
+        """Сохранить ответ; False, если набор партии уже выброшен"""
+        entry = self._games.get(game_id)
+        if entry is None or entry.expires_at <= time.monotonic():
+            AI_PONDER_CPU_SECONDS.labels("wasted").inc(reply.compute_seconds)
+            return False
+        entry.replies[position] = reply
+        return True
+
+    def take(self, game: BitboardTicTacToe) -> Optional[Tuple[int, int]]:
+        """Ответ для текущей позиции игры; остальные ответы партии выбрасываются"""
+        entry = self._games.pop(game.game_id, None)
+        if entry is None:
+            return None  # Для партии ничего не считали: это не промах pondering
+        reply = None
+        if entry.expires_at > time.monotonic():
+            reply = entry.replies.pop((game.x_bits, game.o_bits), None)
+        if reply is None:
+            AI_PONDER_LOOKUPS.labels("miss").inc()
+        else:
+            AI_PONDER_LOOKUPS.labels("hit").inc()
+            AI_PONDER_CPU_SECONDS.labels("used").inc(reply.compute_seconds)
+        self._waste(entry)
+        return reply.move if reply else None
+
+    def discard(self, game_id: str):
+        """Выбросить все ответы партии"""
+        entry = self._games.pop(game_id, None)
+        if entry is not None:
+            self._waste(entry)
+
+    @staticmethod
+    def _waste(entry: PonderedGame):
+        wasted = sum(reply.compute_seconds for reply in entry.replies.values())
+        if wasted:
+            AI_PONDER_CPU_SECONDS.labels("wasted").inc(wasted)
+
+
+_cache_instance: Optional[PonderCache] = None
+
+def get_ponder_cache() -> PonderCache:
+    """Получить кеш ответов pondering воркера (singleton)"""
+    global _cache_instance
+    if _cache_instance is None:
+        _cache_instance = PonderCache()
+    return _cache_instance
@@ -1,12 +1,22 @@
 """
 Redis клиент для хранения игр
 """
+import asyncio
+import hashlib
 import os
-import json
 import logging
-from typing import Optional
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
 from datetime import timedelta
-from app.game.logic import TicTacToe
+from app.game.bitboard import BitboardTicTacToe
+from app.storage.codec import decode_game, delta_fields, encode_game, encode_legacy_json
+from app.storage.memory_store import LINK_TOKEN_TTL_SECONDS
+from app.storage.move_script import APPLY_MOVE_SCRIPT, MoveResult, parse_move_reply
+from app.core.circuit_breaker import OPEN, CircuitBreaker
+from app.core.metrics import (
+    REDIS_GAME_WRITES, REDIS_POOL_IN_USE, REDIS_POOL_MAX_CONNECTIONS, REDIS_POOL_WAIT_SECONDS,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -22,97 +32,317 @@ except ImportError:
     class Redis:
         pass
 
+# Общий для всех воркеров кеш ходов AI (hash: позиция -> клетка)
+AI_MOVES_KEY = "ai_moves"
+
+# Формат записи партий: binary (app.storage.codec) или json - для отката,
+# пока в кластере есть воркеры, не умеющие читать бинарный формат.
+# bitfield - та же бинарная запись, но сохранение уже записанной партии
+# меняет в ней только заголовок и изменившиеся клетки (WRITE_DELTA_SCRIPT).
+# На полях до 15x15 запись целиком короче этих команд и быстрее
+# (scripts/benchmark_game_writes.py), поэтому bitfield - не по умолчанию
+GAME_FORMAT = os.getenv("GAME_FORMAT", "binary").lower()
+
+# Запись изменений при GAME_FORMAT=bitfield. KEYS[1] - ключ партии, ARGV -
+# SHA1 записи, поверх которой считались изменения, TTL в секундах и
+# аргументы BITFIELD. Если записи нет (перезапуск Redis, вытеснение) или она
+# другая (партию изменил другой воркер), скрипт ничего не пишет и
+# возвращает 0 - тогда партия записывается целиком.
+WRITE_DELTA_SCRIPT = """
+local record = redis.call('GET', KEYS[1])
+if not record or redis.sha1hex(record) ~= ARGV[1] then
+    return 0
+end
+redis.call('BITFIELD', KEYS[1], unpack(ARGV, 3))
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+if REDIS_AVAILABLE:
+    class MeteredConnectionPool(redis.BlockingConnectionPool):
+        """Пул соединений с метриками: занятые соединения и ожидание свободного"""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.node = f"{self.connection_kwargs.get('host')}:{self.connection_kwargs.get('port')}"
+
+        async def get_connection(self, *args, **kwargs):
+            started = time.perf_counter()
+            connection = await super().get_connection(*args, **kwargs)
+            REDIS_POOL_WAIT_SECONDS.labels(node=self.node).observe(time.perf_counter() - started)
+            REDIS_POOL_IN_USE.labels(node=self.node).set(len(self._in_use_connections))
+            return connection
+
+        async def release(self, connection):
+            await super().release(connection)
+            REDIS_POOL_IN_USE.labels(node=self.node).set(len(self._in_use_connections))
+
+
+class CircuitOpenError(Exception):
+    """Redis помечен недоступным, запрос не отправлялся"""
+
+
+# Ошибки, после которых Redis считается недоступным (а не ошибки данных)
+CONNECTION_ERRORS = (OSError, asyncio.TimeoutError)
+if REDIS_AVAILABLE:
+    CONNECTION_ERRORS += (redis.ConnectionError, redis.TimeoutError)
+
+
 class RedisStorage:
     """Класс для работы с Redis хранилищем"""
     
-    def __init__(self):
+    def __init__(self, host: Optional[str] = None, port: Optional[int] = None, name: str = "redis"):
         if not REDIS_AVAILABLE:
             raise RuntimeError("Redis не установлен. Установите: pip install redis>=5.0.0")
-        self.redis_host = os.getenv("REDIS_HOST", "localhost")
-        self.redis_port = int(os.getenv("REDIS_PORT", 6379))
+        self.redis_host = host or os.getenv("REDIS_HOST", "localhost")
+        self.redis_port = port or int(os.getenv("REDIS_PORT", 6379))
+        self.node = f"{self.redis_host}:{self.redis_port}"
         self.redis_db = int(os.getenv("REDIS_DB", 0))
         self.game_ttl_hours = int(os.getenv("GAME_TTL_HOURS", 24))
+        # Пул соединений: запрос ждет свободное соединение не дольше pool_timeout
+        self.max_connections = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+        self.pool_timeout = float(os.getenv("REDIS_POOL_TIMEOUT", 2))
+        self.socket_timeout = float(os.getenv("REDIS_SOCKET_TIMEOUT", 2))
+        self.connect_timeout = float(os.getenv("REDIS_CONNECT_TIMEOUT", 5))
+        self.health_check_interval = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", 30))
+        self.warm_connections = int(os.getenv("REDIS_WARM_CONNECTIONS", 4))
         self._client = None
+        self._pool = None
+        self._lock = asyncio.Lock()  # Одновременные первые запросы создают один клиент
+        self._apply_move = None
+        self._write_delta = None
+        # Сколько ход считается занятым расчетом ответа AI (app.storage.move_script)
+        self.ai_turn_lease = float(os.getenv("AI_TURN_LEASE_SECONDS", 30))
+        # GAME_FORMAT=bitfield: клетки (x_bits, o_bits) и SHA1 записи партий в том
+        # виде, в каком этот воркер их последним прочитал или записал в Redis
+        self.delta_games = int(os.getenv("REDIS_DELTA_GAMES", 10000))
+        self._stored: "OrderedDict[str, Tuple[int, int, str]]" = OrderedDict()
+        # Пока Redis недоступен, запросы сразу идут в fallback
+        self.breaker = CircuitBreaker(
+            name,
+            failure_threshold=int(os.getenv("REDIS_BREAKER_FAILURES", 3)),
+            reset_timeout=float(os.getenv("REDIS_BREAKER_RESET_TIMEOUT", 30))
+        )
+        self.probe_interval = float(os.getenv("REDIS_BREAKER_PROBE_INTERVAL", 1))
+        self._probe_task = None
+    
+    @property
+    def available(self) -> bool:
+        """Можно ли сейчас обращаться к Redis (circuit breaker не разомкнут)"""
+        return self.breaker.allow_request()
     
     async def _get_client(self) -> redis.Redis:
         """Получить или создать Redis клиент"""
+        if not self.breaker.allow_request():
+            raise CircuitOpenError("Redis недоступен (circuit breaker разомкнут)")
         if self._client is None:
-            try:
-                self._client = redis.Redis(
-                    host=self.redis_host,
-                    port=self.redis_port,
-                    db=self.redis_db,
-                    decode_responses=False,  # Получаем байты для JSON
-                    socket_connect_timeout=5,
-                    socket_keepalive=True
-                )
-                # Проверка подключения
-                await self._client.ping()
-                logger.info(f"Подключено к Redis: {self.redis_host}:{self.redis_port}")
-            except Exception as e:
-                logger.error(f"Ошибка подключения к Redis: {e}")
-                raise
+            async with self._lock:
+                # Пока ждали блокировку, другой запрос мог не подключиться
+                if not self.breaker.allow_request():
+                    raise CircuitOpenError("Redis недоступен (circuit breaker разомкнут)")
+                if self._client is None:
+                    await self._create_client()
         
         return self._client
     
-    async def save_game(self, game: TicTacToe) -> bool:
+    def _remember_stored(self, game: BitboardTicTacToe):
+        """Запомнить клетки партии, лежащие в Redis (основа для записи изменений)"""
+        if GAME_FORMAT != "bitfield":
+            return
+        digest = hashlib.sha1(encode_game(game)).hexdigest()
+        self._stored[game.game_id] = (game.x_bits, game.o_bits, digest)
+        self._stored.move_to_end(game.game_id)
+        while len(self._stored) > self.delta_games:
+            self._stored.popitem(last=False)
+    
+    def _record_error(self, e: Exception) -> bool:
+        """Учесть ошибку в circuit breaker; False - запрос в Redis не отправлялся"""
+        if isinstance(e, CircuitOpenError):
+            return False
+        if isinstance(e, CONNECTION_ERRORS) and self.breaker.record_failure():
+            self._start_probe()
+        return True
+    
+    def _start_probe(self):
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = asyncio.get_running_loop().create_task(self._probe())
+    
+    async def _probe(self):
+        """Фоновая проверка Redis, пока circuit breaker разомкнут"""
+        while self.breaker.state == OPEN:
+            await asyncio.sleep(self.probe_interval)
+            try:
+                async with self._lock:
+                    if self._client is None:
+                        await self._create_client()
+                    else:
+                        await self._client.ping()
+            except Exception as e:
+                logger.debug(f"Redis все еще недоступен: {e}")
+            else:
+                self.breaker.half_open()
+    
+    async def ping(self) -> bool:
+        """Проверка Redis для /health (учитывается в circuit breaker)"""
+        try:
+            client = await self._get_client()
+            await client.ping()
+        except Exception as e:
+            self._record_error(e)
+            return False
+        self.breaker.record_success()
+        return True
+    
+    async def _create_client(self):
+        pool = MeteredConnectionPool(
+            host=self.redis_host,
+            port=self.redis_port,
+            db=self.redis_db,
+            max_connections=self.max_connections,
+            timeout=self.pool_timeout,
+            socket_timeout=self.socket_timeout,
+            socket_connect_timeout=self.connect_timeout,
+            socket_keepalive=True,
+            health_check_interval=self.health_check_interval
+        )
+        # decode_responses не задан: партии хранятся в бинарном формате
+        client = redis.Redis(connection_pool=pool)
+        try:
+            # Проверка подключения
+            await client.ping()
+        except Exception as e:
+            logger.error(f"Ошибка подключения к Redis: {e}")
+            await pool.disconnect()
+            raise
+        self._pool = pool
+        self._client = client
+        REDIS_POOL_MAX_CONNECTIONS.labels(node=self.node).set(self.max_connections)
+        logger.info(f"Подключено к Redis: {self.redis_host}:{self.redis_port} "
+                    f"(пул до {self.max_connections} соединений)")
+    
+    async def connect(self):
+        """Подключиться заранее и открыть warm_connections соединений пула"""
+        try:
+            client = await self._get_client()
+            # Одновременные PING занимают разные соединения пула
+            warm = min(self.warm_connections, self.max_connections)
+            await asyncio.gather(*(client.ping() for _ in range(warm)))
+        except Exception as e:
+            self._record_error(e)
+            raise
+    
+    async def save_game(self, game: BitboardTicTacToe) -> bool:
         """Сохранить игру в Redis"""
+        return await self.save_games([game])
+    
+    async def save_games(self, games: List[BitboardTicTacToe]) -> bool:
+        """Сохранить несколько игр одной транзакцией (один round-trip)"""
         try:
             client = await self._get_client()
-            game_data = {
-                "game_id": game.game_id,
-                "board": game.board,
-                "status": game.status,
-                "current_player": game.current_player
-            }
-            key = f"game:{game.game_id}"
-            # Сохраняем с TTL
-            await client.setex(
-                key,
-                timedelta(hours=self.game_ttl_hours),
-                json.dumps(game_data).encode('utf-8')
-            )
-            logger.debug(f"Игра сохранена в Redis: {game.game_id}")
+            ttl = timedelta(hours=self.game_ttl_hours)
+            deltas = set()  # id партий, для которых отправлены только изменения
+            async with client.pipeline(transaction=True) as pipe:
+                for game in games:
+                    key = f"game:{game.game_id}"
+                    stored = self._stored.get(game.game_id) if GAME_FORMAT == "bitfield" else None
+                    if stored is not None:
+                        # Только заголовок и изменившиеся клетки, TTL продлевается
+                        x_bits, o_bits, digest = stored
+                        args = []
+                        for field in delta_fields(game, x_bits, o_bits):
+                            args.extend(("SET",) + field)
+                        if self._write_delta is None:
+                            self._write_delta = client.register_script(WRITE_DELTA_SCRIPT)
+                        # В pipeline скрипт только ставится в очередь (EVALSHA)
+                        await self._write_delta(keys=[key], args=[digest, int(ttl.total_seconds()), *args],
+                                                client=pipe)
+                        deltas.add(game.game_id)
+                        continue
+                    data = encode_legacy_json(game) if GAME_FORMAT == "json" else encode_game(game)
+                    # Сохраняем с TTL
+                    pipe.set(key, data, ex=ttl)
+                    REDIS_GAME_WRITES.labels(kind="full").inc()
+                replies = await pipe.execute()
+            if deltas:
+                # По одной команде на партию; 0 от скрипта - изменения не записаны
+                stale = [game for game, reply in zip(games, replies)
+                         if game.game_id in deltas and not reply]
+                REDIS_GAME_WRITES.labels(kind="delta").inc(len(deltas) - len(stale))
+                if stale:
+                    # Запись в Redis не совпала с основой изменений: пишем партии целиком
+                    async with client.pipeline(transaction=True) as pipe:
+                        for game in stale:
+                            pipe.set(f"game:{game.game_id}", encode_game(game), ex=ttl)
+                        await pipe.execute()
+                    REDIS_GAME_WRITES.labels(kind="full").inc(len(stale))
+            self.breaker.record_success()
+            for game in games:
+                self._remember_stored(game)
+            logger.debug(f"Игры сохранены в Redis: {', '.join(game.game_id for game in games)}")
             return True
         except Exception as e:
-            logger.error(f"Ошибка сохранения игры в Redis: {e}", exc_info=True)
+            if self._record_error(e):
+                logger.error(f"Ошибка сохранения игры в Redis: {e}", exc_info=True)
             return False
     
-    async def get_game(self, game_id: str) -> Optional[TicTacToe]:
+    async def get_game(self, game_id: str) -> Optional[BitboardTicTacToe]:
         """Получить игру из Redis"""
         try:
             client = await self._get_client()
             key = f"game:{game_id}"
             data = await client.get(key)
+            self.breaker.record_success()
             
             if data is None:
                 logger.debug(f"Игра не найдена в Redis: {game_id}")
                 return None
             
-            game_data = json.loads(data.decode('utf-8'))
-            # Восстанавливаем объект TicTacToe
-            game = TicTacToe()
-            game.game_id = game_data["game_id"]
-            game.board = game_data["board"]
-            game.status = game_data["status"]
-            game.current_player = game_data.get("current_player", "X")
+            # Бинарный формат или старый JSON - определяется по первому байту
+            game = decode_game(data, game_id)
+            if data[:1] != b"{":
+                # Поверх JSON-записи изменения не пишутся: ее перезапишет полная запись
+                self._remember_stored(game)
             
             logger.debug(f"Игра загружена из Redis: {game_id}")
             return game
         except Exception as e:
-            logger.error(f"Ошибка получения игры из Redis: {e}", exc_info=True)
+            if self._record_error(e):
+                logger.error(f"Ошибка получения игры из Redis: {e}", exc_info=True)
             return None
     
+    async def apply_move(self, game_id: str, row: int, col: int) -> MoveResult:
+        """Атомарно проверить и применить ход игрока (EVALSHA, один round-trip)"""
+        try:
+            client = await self._get_client()
+            if self._apply_move is None:
+                # register_script вызывает EVALSHA и сам загружает скрипт после NOSCRIPT
+                self._apply_move = client.register_script(APPLY_MOVE_SCRIPT)
+            reply = await self._apply_move(
+                keys=[f"game:{game_id}", f"ai_turn:{game_id}"],
+                args=[row, col, self.game_ttl_hours * 3600, int(self.ai_turn_lease * 1000)]
+            )
+        except Exception as e:
+            self._record_error(e)
+            raise
+        self.breaker.record_success()
+        result = parse_move_reply(reply, game_id)
+        if result.game is not None:
+            self._remember_stored(result.game)
+        return result
+    
     async def delete_game(self, game_id: str) -> bool:
         """Удалить игру из Redis"""
         try:
             client = await self._get_client()
             key = f"game:{game_id}"
             await client.delete(key)
+            self._stored.pop(game_id, None)
+            self.breaker.record_success()
             logger.debug(f"Игра удалена из Redis: {game_id}")
             return True
         except Exception as e:
-            logger.error(f"Ошибка удаления игры из Redis: {e}", exc_info=True)
+            if self._record_error(e):
+                logger.error(f"Ошибка удаления игры из Redis: {e}", exc_info=True)
             return False
     
     async def save_link_token(self, token: str, chat_id: str) -> bool:
@@ -121,11 +351,13 @@ class RedisStorage:
             client = await self._get_client()
             key = f"link_token:{token}"
             # Токен живет 10 минут
-            await client.setex(key, 600, chat_id.encode('utf-8'))
+            await client.set(key, chat_id.encode('utf-8'), ex=LINK_TOKEN_TTL_SECONDS)
+            self.breaker.record_success()
             logger.debug(f"Токен привязки сохранен: {token} -> {chat_id}")
             return True
         except Exception as e:
-            logger.error(f"Ошибка сохранения токена привязки: {e}", exc_info=True)
+            if self._record_error(e):
+                logger.error(f"Ошибка сохранения токена привязки: {e}", exc_info=True)
             return False
             
     async def get_chat_id_by_token(self, token: str) -> Optional[str]:
@@ -134,28 +366,101 @@ class RedisStorage:
             client = await self._get_client()
             key = f"link_token:{token}"
             data = await client.get(key)
+            self.breaker.record_success()
             if data:
                 return data.decode('utf-8')
             return None
         except Exception as e:
-            logger.error(f"Ошибка получения chat_id по токену: {e}", exc_info=True)
+            if self._record_error(e):
+                logger.error(f"Ошибка получения chat_id по токену: {e}", exc_info=True)
+            return None
+    
+    async def get_ai_move(self, field: str) -> Optional[int]:
+        """Получить ход AI из общего кеша (индекс клетки)"""
+        try:
+            client = await self._get_client()
+            data = await client.hget(AI_MOVES_KEY, field)
+            self.breaker.record_success()
+            if data is None:
+                return None
+            return int(data)
+        except Exception as e:
+            if self._record_error(e):
+                logger.error(f"Ошибка чтения кеша ходов AI: {e}", exc_info=True)
             return None
     
+    async def save_ai_move(self, field: str, move: int, max_entries: int) -> bool:
+        """Сохранить ход AI в общий кеш, вытесняя случайные записи сверх лимита"""
+        try:
+            client = await self._get_client()
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.hset(AI_MOVES_KEY, field, str(move))
+                pipe.hlen(AI_MOVES_KEY)
+                _, size = await pipe.execute()
+            self.breaker.record_success()
+            if size > max_entries:
+                # Случайное вытеснение: освобождаем ~1% места за раз
+                victims = await client.hrandfield(AI_MOVES_KEY, max(1, max_entries // 100))
+                if victims:
+                    await client.hdel(AI_MOVES_KEY, *victims)
+            return True
+        except Exception as e:
+            if self._record_error(e):
+                logger.error(f"Ошибка записи в кеш ходов AI: {e}", exc_info=True)
+            return False
+    
     async def close(self):
         """Закрыть соединение с Redis"""
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            self._probe_task = None
         if self._client:
-            await self._client.close()
+            await self._client.aclose()
+            await self._pool.disconnect()
             self._client = None
+            self._pool = None
+            self._apply_move = None
+            self._write_delta = None
+            REDIS_POOL_IN_USE.labels(node=self.node).set(0)
             logger.info("Соединение с Redis закрыто")
 
 
+def parse_nodes(value: str) -> List[Tuple[str, int]]:
+    """Узлы из REDIS_NODES: "host:port,host:port" (порт по умолчанию 6379)"""
+    nodes = []
+    for item in value.split(","):
+        item = item.strip()
+        if item:
+            host, separator, port = item.rpartition(":")
+            nodes.append((host, int(port)) if separator else (item, 6379))
+    return nodes
+
+
 # Глобальный экземпляр хранилища
 _storage_instance = None
 
 async def get_storage() -> RedisStorage:
-    """Получить экземпляр хранилища (singleton)"""
+    """Получить экземпляр хранилища (singleton)
+
+    Создание без await между проверкой и присваиванием, поэтому гонки
+    между корутинами нет; подключение защищено блокировкой в _get_client.
+    Если в REDIS_NODES несколько узлов - ShardedRedisStorage с тем же
+    интерфейсом.
+    """
     global _storage_instance
     if _storage_instance is None:
-        _storage_instance = RedisStorage()
+        nodes = parse_nodes(os.getenv("REDIS_NODES", ""))
+        if len(nodes) > 1:
+            from app.storage.sharded_redis import ShardedRedisStorage  # sharded_redis импортирует этот модуль
+            _storage_instance = ShardedRedisStorage(nodes)
+        else:
+            _storage_instance = RedisStorage(*nodes[0]) if nodes else RedisStorage()
     return _storage_instance
 
+async def close_storage():
+    """Закрыть пул соединений хранилища (при остановке приложения)"""
+    global _storage_instance
+    if _storage_instance is not None:
+        await _storage_instance.close()
+        _storage_instance = None
+
@@ -0,0 +1,151 @@
+"""
+Партии на нескольких узлах Redis
+
+Если в REDIS_NODES перечислено несколько узлов ("host:port,host:port"),
+get_storage возвращает ShardedRedisStorage: ключи game:* и link_token:*
+раскладываются по узлам консистентным хешированием (app.storage.hash_ring,
+REDIS_VNODES виртуальных узлов на узел). Каждый узел - отдельный
+RedisStorage со своим пулом соединений и своим circuit breaker, поэтому
+недоступный узел уводит в fallback только свои партии.
+
+Общий кеш ходов AI - один hash, он живет на узле своего ключа.
+
+После изменения списка узлов ключи, которые по кольцу принадлежат
+другому узлу, переносит rebalance (scripts/rebalance_redis_shards.py);
+при добавлении узла это примерно 1/N ключей.
+"""
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from app.game.bitboard import BitboardTicTacToe
+from app.storage.hash_ring import HashRing
+from app.storage.move_script import MoveResult
+from app.storage.redis_client import AI_MOVES_KEY, RedisStorage, redis
+
+logger = logging.getLogger(__name__)
+
+REDIS_VNODES = int(os.getenv("REDIS_VNODES", 160))
+# Ключи, которые раскладываются по узлам и переносятся rebalance
+SHARDED_PATTERNS = ("game:*", "link_token:*")
+
+
+class ShardedRedisStorage:
+    """Хранилище поверх нескольких RedisStorage: узел выбирается по ключу"""
+
+    def __init__(self, nodes: List[Tuple[str, int]], vnodes: int = REDIS_VNODES):
+        self.shards: Dict[str, RedisStorage] = {}
+        for host, port in nodes:
+            shard = RedisStorage(host, port, name=f"redis {host}:{port}")
+            self.shards[shard.node] = shard
+        self.ring = HashRing(self.shards, vnodes)
+
+    def shard_for(self, key: str) -> RedisStorage:
+        """Узел, на котором лежит ключ Redis"""
+        return self.shards[self.ring.node_for(key)]
+
+    @property
+    def available(self) -> bool:
+        """Доступен хотя бы один узел; запросы к недоступным уходят в fallback"""
+        return any(shard.available for shard in self.shards.values())
+
+    async def connect(self):
+        """Подключиться ко всем узлам; ошибка - если не удалось хотя бы к одному"""
+        results = await asyncio.gather(
+            *(shard.connect() for shard in self.shards.values()), return_exceptions=True
+        )
+        for node, result in zip(self.shards, results):
+            if isinstance(result, Exception):
+                raise ConnectionError(f"Redis {node} недоступен: {result}") from result
+
+    async def ping(self) -> bool:
+        """Отвечают все узлы"""
+        return all(await asyncio.gather(*(shard.ping() for shard in self.shards.values())))
+
+    async def save_game(self, game: BitboardTicTacToe) -> bool:
+        """Сохранить игру на ее узле"""
+        return await self.save_games([game])
+
+    async def save_games(self, games: List[BitboardTicTacToe]) -> bool:
+        """Сохранить игры: по одной транзакции на каждый затронутый узел"""
+        return all(await self.save_games_each(games))
+
+    async def save_games_each(self, games: List[BitboardTicTacToe]) -> List[bool]:
+        """Сохранить игры и вернуть результат для каждой
+
+        Транзакции узлов независимы: при отказе одного узла игры на
+        остальных уже записаны, в fallback уходят только игры этого узла.
+        """
+        groups: Dict[str, List[BitboardTicTacToe]] = defaultdict(list)
+        for game in games:
+            groups[self.ring.node_for(f"game:{game.game_id}")].append(game)
+        results = await asyncio.gather(
+            *(self.shards[node].save_games(group) for node, group in groups.items())
+        )
+        saved = {
+            game.game_id: result for group, result in zip(groups.values(), results) for game in group
+        }
+        return [saved[game.game_id] for game in games]
+
+    async def get_game(self, game_id: str) -> Optional[BitboardTicTacToe]:
+        """Получить игру с ее узла"""
+        return await self.shard_for(f"game:{game_id}").get_game(game_id)
+
+    async def apply_move(self, game_id: str, row: int, col: int) -> MoveResult:
+        """Атомарный ход скриптом на узле партии"""
+        return await self.shard_for(f"game:{game_id}").apply_move(game_id, row, col)
+
+    async def delete_game(self, game_id: str) -> bool:
+        """Удалить игру с ее узла"""
+        return await self.shard_for(f"game:{game_id}").delete_game(game_id)
+
+    async def save_link_token(self, token: str, chat_id: str) -> bool:
+        """Сохранить токен привязки Telegram на его узле"""
+        return await self.shard_for(f"link_token:{token}").save_link_token(token, chat_id)
+
+    async def get_chat_id_by_token(self, token: str) -> Optional[str]:
+        """Получить chat_id по токену привязки"""
+        return await self.shard_for(f"link_token:{token}").get_chat_id_by_token(token)
+
+    async def get_ai_move(self, field: str) -> Optional[int]:
+        """Ход AI из общего кеша"""
+        return await self.shard_for(AI_MOVES_KEY).get_ai_move(field)
+
+    async def save_ai_move(self, field: str, move: int, max_entries: int) -> bool:
+        """Сохранить ход AI в общий кеш"""
+        return await self.shard_for(AI_MOVES_KEY).save_ai_move(field, move, max_entries)
+
+    async def rebalance(self) -> int:
+        """Перенести ключи на узлы, которым они принадлежат по кольцу
+
+        Ключ копируется с TTL (DUMP/RESTORE) и удаляется со старого узла.
+        Если на новом узле ключ уже есть, он записан после смены узлов и
+        новее - копия не пишется. Возвращает число перенесенных ключей.
+        """
+        moved = 0
+        for node, shard in self.shards.items():
+            client = await shard._get_client()
+            for pattern in SHARDED_PATTERNS:
+                async for key in client.scan_iter(match=pattern, count=500):
+                    owner = self.ring.node_for(key.decode('utf-8'))
+                    if owner == node:
+                        continue
+                    async with client.pipeline(transaction=False) as pipe:
+                        dump, ttl = await pipe.dump(key).pttl(key).execute()
+                    if dump is not None:
+                        target = await self.shards[owner]._get_client()
+                        try:
+                            await target.restore(key, max(ttl, 0), dump)
+                        except redis.ResponseError as e:
+                            if "BUSYKEY" not in str(e):
+                                raise
+                        else:
+                            moved += 1
+                    await client.delete(key)
+        logger.info(f"Перенесено ключей между узлами Redis: {moved}")
+        return moved
+
+    async def close(self):
+        """Закрыть пулы всех узлов"""
+        await asyncio.gather(*(shard.close() for shard in self.shards.values()))
@@ -0,0 +1,215 @@
+"""
+Хранилище партий в SQLite
+
+Для одного сервера без Redis (STORAGE_BACKEND=sqlite): партии переживают
+перезапуск, а все воркеры сервера видят одни и те же партии через общий
+файл. База открывается в режиме WAL (читатели не ждут писателя) с
+synchronous=NORMAL: коммит не ждет fsync, при падении ОС теряются только
+последние коммиты, но файл остается целым.
+
+Коммиты группируются: запись встает в текущую пачку, пачка пишется одной
+транзакцией через SQLITE_COMMIT_INTERVAL секунд после первой записи в
+нее, и сохранение возвращается только после коммита своей пачки. Так
+одновременные ходы разных партий платят за один коммит, а не каждый за
+свой.
+
+Все обращения к базе идут через один поток: sqlite3 блокирующий, а
+соединение нельзя использовать из нескольких потоков одновременно.
+Истекшие записи при чтении не видны и удаляются не чаще раза в
+SQLITE_PURGE_INTERVAL секунд.
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from app.game.bitboard import BitboardTicTacToe
+from app.storage.codec import decode_game, encode_game
+from app.storage.memory_store import LINK_TOKEN_TTL_SECONDS
+from app.core.metrics import SQLITE_COMMIT_SECONDS, SQLITE_COMMIT_WRITES
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS games ("
+    " id TEXT PRIMARY KEY, data BLOB NOT NULL, expires_at REAL NOT NULL) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS games_expires_at ON games (expires_at)",
+    "CREATE TABLE IF NOT EXISTS link_tokens ("
+    " token TEXT PRIMARY KEY, chat_id TEXT NOT NULL, expires_at REAL NOT NULL) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS link_tokens_expires_at ON link_tokens (expires_at)",
+)
+SAVE_GAME = "INSERT OR REPLACE INTO games (id, data, expires_at) VALUES (?, ?, ?)"
+SAVE_TOKEN = "INSERT OR REPLACE INTO link_tokens (token, chat_id, expires_at) VALUES (?, ?, ?)"
+
+Statement = Tuple[str, tuple]
+
+
+class SQLiteStorage:
+    """Партии и токены привязки в файле SQLite (интерфейс как у RedisStorage)"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("SQLITE_PATH", "tictactoe.db")
+        self.game_ttl = int(os.getenv("GAME_TTL_HOURS", 24)) * 3600
+        self.commit_interval = float(os.getenv("SQLITE_COMMIT_INTERVAL", 0.002))
+        self.busy_timeout = float(os.getenv("SQLITE_BUSY_TIMEOUT", 5))
+        self.purge_interval = float(os.getenv("SQLITE_PURGE_INTERVAL", 60))
+        self._db: Optional[sqlite3.Connection] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        # Текущая пачка записей и future ее коммита
+        self._batch: List[Statement] = []
+        self._committed: Optional[asyncio.Future] = None
+        self._purged_at = 0.0
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    async def _run(self, func, *args):
+        """Выполнить func в потоке базы"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            db = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            with db:
+                for statement in SCHEMA:
+                    db.execute(statement)
+            self._db = db
+            logger.info(f"Открыта база SQLite: {self.path}")
+        return self._db
+
+    def _commit(self, batch: List[Statement]):
+        db = self._connection()
+        now = time.time()
+        with db:  # Одна транзакция на пачку; при ошибке - откат всей пачки
+            for sql, params in batch:
+                db.execute(sql, params)
+            if now - self._purged_at >= self.purge_interval:
+                db.execute("DELETE FROM games WHERE expires_at <= ?", (now,))
+                db.execute("DELETE FROM link_tokens WHERE expires_at <= ?", (now,))
+                self._purged_at = now
+
+    async def _write(self, statements: List[Statement]):
+        """Добавить записи в текущую пачку и дождаться ее коммита"""
+        self._batch.extend(statements)
+        if self._committed is None:
+            loop = asyncio.get_running_loop()
+            self._committed = loop.create_future()
+            loop.create_task(self._commit_batch())
+        await asyncio.shield(self._committed)
+
+    async def _commit_batch(self):
+        await asyncio.sleep(self.commit_interval)
+        batch, self._batch = self._batch, []
+        committed, self._committed = self._committed, None
+        started = time.perf_counter()
+        try:
+            await self._run(self._commit, batch)
+        except Exception as e:
+            committed.set_exception(e)
+        else:
+            committed.set_result(None)
+        finally:
+            SQLITE_COMMIT_WRITES.observe(len(batch))
+            SQLITE_COMMIT_SECONDS.observe(time.perf_counter() - started)
+
+    def _select(self, sql: str, params: tuple):
+        return self._connection().execute(sql, params).fetchone()
+
+    async def save_game(self, game: BitboardTicTacToe) -> bool:
+        """Сохранить игру"""
+        return await self.save_games([game])
+
+    async def save_games(self, games: List[BitboardTicTacToe]) -> bool:
+        """Сохранить несколько игр (в одной транзакции)"""
+        expires_at = time.time() + self.game_ttl
+        try:
+            await self._write([(SAVE_GAME, (game.game_id, encode_game(game), expires_at)) for game in games])
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка сохранения игры в SQLite: {e}", exc_info=True)
+            return False
+
+    async def get_game(self, game_id: str) -> Optional[BitboardTicTacToe]:
+        """Получить игру (None, если ее нет или она истекла)"""
+        try:
+            row = await self._run(
+                self._select, "SELECT data FROM games WHERE id = ? AND expires_at > ?", (game_id, time.time())
+            )
+            return decode_game(row[0], game_id) if row is not None else None
+        except Exception as e:
+            logger.error(f"Ошибка получения игры из SQLite: {e}", exc_info=True)
+            return None
+
+    async def delete_game(self, game_id: str) -> bool:
+        """Удалить игру"""
+        try:
+            await self._write([("DELETE FROM games WHERE id = ?", (game_id,))])
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка удаления игры из SQLite: {e}", exc_info=True)
+            return False
+
+    async def save_link_token(self, token: str, chat_id: str) -> bool:
+        """Сохранить временный токен для привязки Telegram (TTL 10 минут)"""
+        try:
+            await self._write([(SAVE_TOKEN, (token, chat_id, time.time() + LINK_TOKEN_TTL_SECONDS))])
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка сохранения токена в SQLite: {e}", exc_info=True)
+            return False
+
+    async def get_chat_id_by_token(self, token: str) -> Optional[str]:
+        """Получить chat_id по токену привязки"""
+        try:
+            row = await self._run(
+                self._select, "SELECT chat_id FROM link_tokens WHERE token = ? AND expires_at > ?",
+                (token, time.time())
+            )
+            return row[0] if row is not None else None
+        except Exception as e:
+            logger.error(f"Ошибка получения токена из SQLite: {e}", exc_info=True)
+            return None
+
+    async def ping(self) -> bool:
+        """Проверка базы для /health"""
+        try:
+            await self._run(self._select, "SELECT 1", ())
+            return True
+        except Exception as e:
+            logger.error(f"SQLite недоступна: {e}")
+            return False
+
+    async def close(self):
+        """Дождаться последней пачки и закрыть базу"""
+        if self._committed is not None:
+            try:
+                await asyncio.shield(self._committed)
+            except Exception:
+                pass  # Ошибку уже получили те, кто ждал коммита
+        if self._db is not None:
+            await self._run(self._db.close)
+            self._db = None
+        self._executor.shutdown(wait=True)
+
+
+# Глобальный экземпляр хранилища
+_storage_instance: Optional[SQLiteStorage] = None
+
+async def get_storage() -> SQLiteStorage:
+    """Получить глобальный экземпляр хранилища SQLite"""
+    global _storage_instance
+    if _storage_instance is None:
+        _storage_instance = SQLiteStorage()
+    return _storage_instance
+
+async def close_storage():
+    """Закрыть базу (при остановке приложения)"""
+    global _storage_instance
+    if _storage_instance is not None:
+        await _storage_instance.close()
+        _storage_instance = None
@@ -0,0 +1,38 @@
+"""
+Единица работы с партиями в рамках одного запроса
+
+Ход игрока меняет партию несколько раз: ход X, ответ AI, конец игры.
+Вместо записи в хранилище после каждого изменения партия отмечается
+измененной, а в хранилище уходит один раз - при commit, последним
+состоянием. Для Redis это одна транзакция (MULTI/EXEC) на запрос.
+"""
+from typing import Awaitable, Callable, Dict, List
+from app.game.bitboard import BitboardTicTacToe
+
+FlushGames = Callable[[List[BitboardTicTacToe]], Awaitable[None]]
+
+
+class GameUnitOfWork:
+    """Измененные за запрос партии, записываемые одним сбросом"""
+
+    def __init__(self, flush: FlushGames):
+        self._flush = flush
+        self._dirty: Dict[str, BitboardTicTacToe] = {}
+        self.flushes = 0  # Сколько раз изменения ушли в хранилище
+
+    def add(self, game: BitboardTicTacToe):
+        """Отметить партию измененной (записывается ее состояние на момент commit)"""
+        self._dirty[game.game_id] = game
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._dirty)
+
+    async def commit(self):
+        """Записать измененные партии (ничего не делает, если изменений нет)"""
+        if not self._dirty:
+            return
+        games = list(self._dirty.values())
+        self._dirty.clear()
+        await self._flush(games)
+        self.flushes += 1
@@ -0,0 +1,84 @@
+"""
+Микробенчмарк формата хранения партий: JSON против бинарного
+
+Запуск из каталога backend:
+    python scripts/benchmark_codec.py
+    python scripts/benchmark_codec.py --redis   # + память в Redis (MEMORY USAGE)
+
+Печатает размер записи, время кодирования и разбора на одну партию
+для каждого режима игры.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app.game.modes import GAME_MODES, create_game
+from app.storage.codec import decode_game, encode_game, encode_legacy_json
+
+
+def _games(mode: str, count: int, seed: int):
+    rng = random.Random(seed)
+    games = []
+    for _ in range(count):
+        game = create_game(mode)
+        for i in range(rng.randint(0, min(20, game.rows * game.cols - 1))):
+            row, col = rng.choice(game.get_empty_cells())
+            game.make_move(row, col, 'X' if i % 2 == 0 else 'O')
+        games.append(game)
+    return games
+
+
+def _per_call_us(func, items) -> float:
+    started = time.perf_counter()
+    for item in items:
+        func(item)
+    return (time.perf_counter() - started) / len(items) * 1e6
+
+
+def _redis_bytes(blobs) -> float:
+    """Средняя MEMORY USAGE ключа партии в локальном Redis"""
+    import redis
+    client = redis.Redis(host=os.getenv("REDIS_HOST", "localhost"), port=int(os.getenv("REDIS_PORT", 6379)))
+    prefix = f"codec-bench:{uuid.uuid4()}:"
+    total = 0
+    try:
+        for index, blob in enumerate(blobs):
+            client.set(f"{prefix}{index}", blob)
+            total += client.memory_usage(f"{prefix}{index}")
+    finally:
+        keys = [f"{prefix}{index}" for index in range(len(blobs))]
+        if keys:
+            client.delete(*keys)
+    return total / len(blobs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк формата хранения партий")
+    parser.add_argument("--games", type=int, default=5000, help="партий на режим")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--redis", action="store_true", help="замерить память в локальном Redis")
+    args = parser.parse_args()
+
+    print(f"{'режим':<10}{'формат':<8}{'байт':>8}{'кодир. мкс':>12}{'разбор мкс':>12}"
+          + (f"{'Redis байт':>12}" if args.redis else ""))
+    for mode in sorted(GAME_MODES):
+        games = _games(mode, args.games, args.seed)
+        for name, encode in (("json", encode_legacy_json), ("binary", encode_game)):
+            blobs = [encode(game) for game in games]
+            pairs = list(zip(blobs, (game.game_id for game in games)))
+            size = sum(len(blob) for blob in blobs) / len(blobs)
+            encode_us = _per_call_us(encode, games)
+            decode_us = _per_call_us(lambda pair: decode_game(*pair), pairs)
+            line = f"{mode:<10}{name:<8}{size:>8.1f}{encode_us:>12.2f}{decode_us:>12.2f}"
+            if args.redis:
+                line += f"{_redis_bytes(blobs[:1000]):>12.1f}"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
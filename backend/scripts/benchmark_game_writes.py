@@ -0,0 +1,96 @@
+"""
+Бенчмарк записи партий в Redis: вся запись (SETEX) против изменений (BITFIELD)
+
+Запуск из каталога backend (нужен локальный Redis):
+    python scripts/benchmark_game_writes.py
+    python scripts/benchmark_game_writes.py --mode gomoku --games 10000 --concurrency 64
+
+Каждая из --games партий сначала записывается целиком, затем --rounds раз
+получает ход игрока и ответ AI и сохраняется через RedisStorage.save_game.
+Для каждого формата печатает записи в секунду, p50/p99 записи, сколько
+байт команд Redis принял на одну запись и время чтения партии (GET).
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app.game.modes import GAME_MODES, create_game
+from app.game.tournament import percentile
+from app.storage import redis_client
+from app.storage.redis_client import RedisStorage
+
+
+async def _input_bytes(client) -> int:
+    return (await client.info("stats"))["total_net_input_bytes"]
+
+
+async def _gather(items, call, concurrency: int):
+    """Вызвать call для всех items не больше concurrency одновременно: задержки в мс"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(item):
+        async with semaphore:
+            started = time.perf_counter()
+            await call(item)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(one(item) for item in items))
+    return latencies
+
+
+async def _run(fmt: str, mode: str, games_count: int, rounds: int, concurrency: int, seed: int):
+    redis_client.GAME_FORMAT = fmt
+    rng = random.Random(seed)
+    games = [create_game(mode) for _ in range(games_count)]
+    storage = RedisStorage()
+    storage.delta_games = games_count
+    client = await storage._get_client()
+    try:
+        await _gather(games, storage.save_game, concurrency)
+
+        latencies = []
+        received = await _input_bytes(client)
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for game in games:
+                for player in 'XO':
+                    game.make_move(*rng.choice(game.get_empty_cells()), player)
+            latencies += await _gather(games, storage.save_game, concurrency)
+        elapsed = time.perf_counter() - started
+        received = await _input_bytes(client) - received
+
+        reads = await _gather(games, lambda game: storage.get_game(game.game_id), concurrency)
+        return len(latencies) / elapsed, latencies, received / len(latencies), reads
+    finally:
+        await client.delete(*(f"game:{game.game_id}" for game in games))
+        await storage.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк записи партий в Redis")
+    parser.add_argument("--mode", default="five", choices=sorted(GAME_MODES))
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"Режим {args.mode}, {args.games} партий, {args.rounds} хода(ов) каждой, "
+          f"{args.concurrency} одновременных запросов")
+    print(f"{'формат':<10}{'записей/с':>11}{'p50 мс':>9}{'p99 мс':>9}{'байт/запись':>13}{'GET p50 мс':>12}")
+    for fmt in ("binary", "bitfield"):
+        rate, latencies, sent, reads = await _run(
+            fmt, args.mode, args.games, args.rounds, args.concurrency, args.seed
+        )
+        print(f"{fmt:<10}{rate:>11.0f}{percentile(latencies, 0.5):>9.3f}{percentile(latencies, 0.99):>9.3f}"
+              f"{sent:>13.0f}{percentile(reads, 0.5):>12.3f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+"""
+Бенчмарк хода игрока в Redis: чтение-изменение-запись против Lua-скрипта
+
+Запуск из каталога backend (нужен локальный Redis):
+    python scripts/benchmark_moves.py
+    python scripts/benchmark_moves.py --mode gomoku --games 500 --concurrency 64
+
+Для каждого способа печатает число ходов в секунду, p50/p99 хода и
+сколько одновременных ходов в одну партию было "принято" - для
+чтения-изменения-записи больше одного значит потерянное обновление.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app.game.modes import GAME_MODES, create_game
+from app.game.tournament import percentile
+from app.storage.codec import decode_game, encode_game
+from app.storage.move_script import MOVE_APPLIED
+from app.storage.redis_client import RedisStorage
+
+TTL_SECONDS = 600
+
+
+async def _move_python(storage: RedisStorage, client, game_id: str, row: int, col: int) -> bool:
+    """Текущий путь: GET, разбор и ход в Python, SETEX"""
+    data = await client.get(f"game:{game_id}")
+    game = decode_game(data, game_id)
+    if game.status != 'playing' or not game.make_move(row, col, 'X')['success']:
+        return False
+    await client.set(f"game:{game_id}", encode_game(game), ex=TTL_SECONDS)
+    return True
+
+
+async def _move_lua(storage: RedisStorage, client, game_id: str, row: int, col: int) -> bool:
+    """Ход одним EVALSHA"""
+    return (await storage.apply_move(game_id, row, col)).result == MOVE_APPLIED
+
+
+async def _reset(client, games):
+    async with client.pipeline(transaction=False) as pipe:
+        for game in games:
+            pipe.set(f"game:{game.game_id}", encode_game(game), ex=TTL_SECONDS)
+        await pipe.execute()
+
+
+async def _run(storage: RedisStorage, client, move, games, moves, concurrency: int):
+    """Ходы в разные партии: (ходов в секунду, задержки в мс)"""
+    await _reset(client, games)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(game, row, col):
+        async with semaphore:
+            started = time.perf_counter()
+            await move(storage, client, game.game_id, row, col)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(game, *cell) for game, cell in zip(games, moves)))
+    return len(games) / (time.perf_counter() - started), latencies
+
+
+async def _accepted_duplicates(storage: RedisStorage, client, move, games, rng) -> float:
+    """Одновременные ходы в одну партию: сколько в среднем принято"""
+    await _reset(client, games)
+    accepted = 0
+    for game in games:
+        cells = rng.sample(game.get_empty_cells(), 4)
+        results = await asyncio.gather(*(move(storage, client, game.game_id, *cell) for cell in cells))
+        accepted += sum(results)
+    return accepted / len(games)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк хода игрока в Redis")
+    parser.add_argument("--mode", default="five", choices=sorted(GAME_MODES))
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    games = []
+    for _ in range(args.games):
+        game = create_game(args.mode)
+        for i in range(rng.randrange(0, 8, 2)):
+            game.make_move(*rng.choice(game.get_empty_cells()), 'X' if i % 2 == 0 else 'O')
+        games.append(game)
+    moves = [rng.choice(game.get_empty_cells()) for game in games]
+
+    storage = RedisStorage()
+    client = await storage._get_client()
+    try:
+        print(f"Режим {args.mode}, {args.games} партий, {args.concurrency} одновременных запросов")
+        print(f"{'способ':<10}{'ходов/с':>10}{'p50 мс':>10}{'p99 мс':>10}{'принято из 4':>15}")
+        for name, move in (("python", _move_python), ("lua", _move_lua)):
+            await _run(storage, client, move, games[:100], moves[:100], args.concurrency)  # Прогрев
+            rate, latencies = await _run(storage, client, move, games, moves, args.concurrency)
+            duplicates = await _accepted_duplicates(storage, client, move, games[:200], rng)
+            print(f"{name:<10}{rate:>10.0f}{percentile(latencies, 0.5):>10.3f}"
+                  f"{percentile(latencies, 0.99):>10.3f}{duplicates:>15.2f}")
+    finally:
+        await client.delete(*(f"game:{game.game_id}" for game in games))
+        await storage.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
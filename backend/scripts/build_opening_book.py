@@ -0,0 +1,48 @@
+"""
+Генерация книги дебютов AI
+
+Запуск из каталога backend:
+    python scripts/build_opening_book.py --plies 6
+
+Книга записывается в data/opening_book.bin (или в --output) и
+подхватывается воркерами при старте (переменная AI_OPENING_BOOK).
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app.game.modes import GAME_MODES, DEFAULT_MODE
+from app.game.opening_book import DEFAULT_BOOK_PATH, OpeningBook, build_book, write_book
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Генерация книги дебютов AI")
+    parser.add_argument("--mode", default=DEFAULT_MODE, choices=sorted(GAME_MODES),
+                        help="режим игры (поле до 32 клеток)")
+    parser.add_argument("--plies", type=int, default=6, help="глубина книги в полуходах")
+    parser.add_argument("--depth", type=int, default=8, help="глубина поиска для каждой позиции")
+    parser.add_argument("--nodes", type=int, default=200000, help="лимит узлов поиска на позицию")
+    parser.add_argument("--output", default=DEFAULT_BOOK_PATH, help="путь к файлу книги")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    mode = GAME_MODES[args.mode]
+
+    started = time.perf_counter()
+    book = build_book(mode.rows, mode.cols, mode.win_length, args.plies, args.depth, args.nodes)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    write_book(args.output, mode.rows, mode.cols, mode.win_length, book)
+    elapsed = time.perf_counter() - started
+
+    check = OpeningBook(args.output)
+    print(f"✅ Книга дебютов: {len(check)} позиций, {os.path.getsize(args.output)} байт, "
+          f"{elapsed:.1f} с -> {args.output}")
+    check.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Генерация таблицы идеальной игры (уровень unbeatable)
+
+Запуск из каталога backend:
+    python scripts/build_tablebase.py
+
+Таблица записывается в data/tablebase.bin (или в --output) и
+подхватывается воркерами при старте (переменная AI_TABLEBASE). После
+записи таблица проверяется партиями эвристики против таблицы, и
+печатается время построения и поиска в таблице.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app.game.modes import GAME_MODES, DEFAULT_MODE
+from app.game.tablebase import (
+    DEFAULT_TABLEBASE_PATH, LOSS, WIN, Tablebase,
+    benchmark_lookups, build_tablebase, verify_tablebase, write_tablebase,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Генерация таблицы идеальной игры")
+    parser.add_argument("--mode", default=DEFAULT_MODE, choices=sorted(GAME_MODES),
+                        help="режим игры (поле до 32 клеток)")
+    parser.add_argument("--output", default=DEFAULT_TABLEBASE_PATH, help="путь к файлу таблицы")
+    parser.add_argument("--no-verify", action="store_true", help="не проверять таблицу после записи")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    mode = GAME_MODES[args.mode]
+
+    started = time.perf_counter()
+    table = build_tablebase(mode.rows, mode.cols, mode.win_length)
+    solved = time.perf_counter() - started
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    write_tablebase(args.output, mode.rows, mode.cols, mode.win_length, table)
+
+    results = [result for _, result, _ in table.values()]
+    check = Tablebase(args.output)
+    print(f"✅ Таблица: {len(check)} позиций, {os.path.getsize(args.output)} байт, "
+          f"решено за {solved:.1f} с -> {args.output}")
+    print(f"   Исходы для O: побед {results.count(WIN)}, ничьих {results.count(0)}, "
+          f"поражений {results.count(LOSS)}")
+    p50, p99 = benchmark_lookups(check)
+    print(f"   Поиск в таблице: p50 {p50:.1f} мкс, p99 {p99:.1f} мкс")
+
+    if not args.no_verify:
+        started = time.perf_counter()
+        failures = verify_tablebase(check)
+        print(f"   Проверка против эвристики: {failures} ошибок, {time.perf_counter() - started:.1f} с")
+        if failures:
+            check.close()
+            sys.exit(1)
+    check.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+Перенос партий между узлами Redis после изменения REDIS_NODES
+
+Запуск из каталога backend с новым списком узлов:
+    REDIS_NODES=redis-a:6379,redis-b:6379,redis-c:6379 python scripts/rebalance_redis_shards.py
+
+Ключи game:* и link_token:*, которые по новому кольцу принадлежат
+другому узлу, копируются туда с TTL и удаляются со старого. Пока перенос
+идет, часть партий читается как отсутствующая - запускать после
+переключения воркеров на новый список, при небольшой нагрузке.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app.storage.redis_client import parse_nodes
+from app.storage.sharded_redis import ShardedRedisStorage
+
+
+async def main():
+    nodes = parse_nodes(os.getenv("REDIS_NODES", ""))
+    if len(nodes) < 2:
+        sys.exit("Укажите в REDIS_NODES хотя бы два узла")
+    storage = ShardedRedisStorage(nodes)
+    try:
+        moved = await storage.rebalance()
+        print(f"Перенесено ключей: {moved}")
+    finally:
+        await storage.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+"""
+Общее для тестов, которым нужен запущенный Redis
+"""
+import asyncio
+import socket
+import subprocess
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Tuple
+from app.storage.redis_client import REDIS_AVAILABLE, RedisStorage
+
+def redis_running() -> bool:
+    """Redis установлен и отвечает по REDIS_HOST/REDIS_PORT"""
+    if not REDIS_AVAILABLE:
+        return False
+
+    async def ping():
+        storage = RedisStorage()
+        try:
+            await storage._get_client()
+            return True
+        except Exception:
+            return False
+        finally:
+            await storage.close()
+
+    return asyncio.run(ping())
+
+def run_with_storage(scenario):
+    """Сценарий с отдельным хранилищем (клиент Redis привязан к event loop)"""
+    async def wrapper():
+        storage = RedisStorage()
+        try:
+            return await scenario(storage, await storage._get_client())
+        finally:
+            await storage.close()
+    return asyncio.run(wrapper())
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@contextmanager
+def redis_servers(count: int) -> Iterator[List[Tuple[str, int]]]:
+    """Запустить count локальных redis-server без сохранения на диск: [(host, port)]"""
+    nodes, processes = [], []
+    try:
+        for _ in range(count):
+            port = _free_port()
+            processes.append(subprocess.Popen(
+                ["redis-server", "--port", str(port), "--bind", "127.0.0.1", "--save", "", "--appendonly", "no"],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            ))
+            nodes.append(("127.0.0.1", port))
+        for host, port in nodes:
+            deadline = time.monotonic() + 5
+            while True:
+                try:
+                    socket.create_connection((host, port), timeout=0.1).close()
+                    break
+                except OSError:
+                    if time.monotonic() > deadline:
+                        raise
+                    time.sleep(0.02)
+        yield nodes
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
@@ -0,0 +1,119 @@
+"""
+Тесты для кеша ходов AI
+"""
+import asyncio
+import pytest
+from prometheus_client import REGISTRY
+from app.game.modes import create_game
+from app.storage import ai_cache, redis_client
+from app.storage.ai_cache import AIMoveCache
+from tests.redis_helpers import redis_running
+
+needs_redis = pytest.mark.skipif(not redis_running(), reason="Redis недоступен")
+
+@pytest.fixture(autouse=True)
+def cached_levels(monkeypatch):
+    monkeypatch.setattr(ai_cache, "AI_CACHE_LEVELS", {"hard", "expert"})
+
+def _game(cells, difficulty="hard"):
+    """Партия 5x5 с камнями {(row, col): игрок}"""
+    game = create_game("classic")
+    game.difficulty = difficulty
+    for (row, col), player in cells.items():
+        game.make_move(row, col, player)
+    return game
+
+def _requests(tier, result):
+    return REGISTRY.get_sample_value("ai_cache_requests_total", {"tier": tier, "result": result}) or 0
+
+@pytest.mark.parametrize("transform", [
+    lambda row, col: (col, 4 - row),  # Поворот на 90 градусов
+    lambda row, col: (4 - row, 4 - col),  # Поворот на 180 градусов
+    lambda row, col: (row, 4 - col),  # Отражение
+    lambda row, col: (col, row),  # Отражение по диагонали
+])
+def test_move_follows_board_symmetry(transform):
+    """Тест: ход, сохраненный для позиции, выдается повернутым для повернутой позиции"""
+    cells = {(0, 1): 'X', (2, 2): 'O', (3, 0): 'X'}
+    cache = AIMoveCache(use_redis=False)
+
+    async def scenario():
+        await cache.put(_game(cells), (1, 3))
+        return await cache.get(_game({transform(*cell): player for cell, player in cells.items()}))
+
+    assert asyncio.run(scenario()) == transform(1, 3)
+    assert len(cache._local) == 1  # Все ориентации - одна запись
+
+def test_local_lru_eviction():
+    """Тест: локальный кеш вытесняет позицию, к которой дольше всего не обращались"""
+    cache = AIMoveCache(local_size=2, use_redis=False)
+    games = [_game({(0, col): 'X'}) for col in range(3)]
+
+    async def scenario():
+        await cache.put(games[0], (1, 1))
+        await cache.put(games[1], (1, 1))
+        assert await cache.get(games[0]) == (1, 1)  # games[0] свежее games[1]
+        await cache.put(games[2], (1, 1))
+        return [await cache.get(game) for game in games]
+
+    assert asyncio.run(scenario()) == [(1, 1), None, (1, 1)]
+
+def test_moves_keyed_by_difficulty():
+    """Тест: ход одного уровня сложности не выдается для другого, некешируемые уровни пропускаются"""
+    cache = AIMoveCache(use_redis=False)
+    cells = {(2, 2): 'X'}
+
+    async def scenario():
+        await cache.put(_game(cells, "hard"), (1, 1))
+        await cache.put(_game(cells, "normal"), (0, 0))
+        return (await cache.get(_game(cells, "hard")), await cache.get(_game(cells, "expert")),
+                await cache.get(_game(cells, "normal")))
+
+    assert asyncio.run(scenario()) == ((1, 1), None, None)
+    assert len(cache._local) == 1
+
+def _with_redis_storage(monkeypatch, scenario):
+    """Сценарий с общим хранилищем Redis в отдельном hash ходов AI"""
+    monkeypatch.setattr(redis_client, "AI_MOVES_KEY", "test:ai_moves")
+    monkeypatch.setattr(redis_client, "_storage_instance", None)
+
+    async def wrapper():
+        storage = await redis_client.get_storage()
+        try:
+            return await scenario(storage)
+        finally:
+            await (await storage._get_client()).delete("test:ai_moves")
+            await redis_client.close_storage()
+    return asyncio.run(wrapper())
+
+@needs_redis
+def test_redis_tier_shared_between_workers(monkeypatch):
+    """Тест: ход из общего кеша доступен воркеру с пустым локальным кешем"""
+    cells = {(1, 2): 'X', (0, 0): 'O'}
+
+    async def scenario(storage):
+        await AIMoveCache(use_redis=True).put(_game(cells), (3, 3))
+        other = AIMoveCache(use_redis=True)
+        found = await other.get(_game(cells))
+        missing = await other.get(_game({(4, 4): 'X'}))
+        return found, missing, await other.get(_game(cells))
+
+    before = {(tier, result): _requests(tier, result)
+              for tier in ("local", "redis") for result in ("hit", "miss")}
+    found, missing, again = _with_redis_storage(monkeypatch, scenario)
+    assert found == again == (3, 3) and missing is None
+    assert _requests("redis", "hit") == before["redis", "hit"] + 1
+    assert _requests("redis", "miss") == before["redis", "miss"] + 1
+    assert _requests("local", "miss") == before["local", "miss"] + 2
+    assert _requests("local", "hit") == before["local", "hit"] + 1  # Ход из Redis запомнен локально
+
+@needs_redis
+def test_redis_tier_size_cap(monkeypatch):
+    """Тест: общий кеш не растет больше max_entries - лишние записи вытесняются случайно"""
+    async def scenario(storage):
+        for index in range(150):
+            assert await storage.save_ai_move(f"position:{index}", index % 25, 100)
+        client = await storage._get_client()
+        return await client.hlen("test:ai_moves")
+
+    assert _with_redis_storage(monkeypatch, scenario) == 100
@@ -0,0 +1,123 @@
+"""
+Тесты для пулов вычисления ходов AI
+"""
+import asyncio
+import pickle
+import pytest
+import time
+from prometheus_client import REGISTRY
+from app.core import ai_executor
+from app.game.bitboard import BitboardTicTacToe
+
+def _waits():
+    return (REGISTRY.get_sample_value("ai_pool_wait_seconds_count") or 0,
+            REGISTRY.get_sample_value("ai_pool_wait_seconds_sum") or 0)
+
+def test_thread_pool_metrics(monkeypatch):
+    """Тест: размер и число задач видны и для пула потоков"""
+    monkeypatch.setattr(ai_executor, "AI_EXECUTOR", "thread")
+    game = BitboardTicTacToe()
+    game.make_move(2, 2, 'X')
+
+    async def scenario():
+        return await ai_executor.run_compute_move(game.to_state(), "normal", game.game_id)
+
+    try:
+        assert asyncio.run(scenario()).move is not None
+        assert REGISTRY.get_sample_value("ai_pool_size", {"pool": "thread"}) == ai_executor.AI_POOL_WORKERS
+        assert REGISTRY.get_sample_value("ai_pool_in_flight_tasks", {"pool": "thread"}) == 0
+    finally:
+        ai_executor.shutdown_ai_executor()
+    assert REGISTRY.get_sample_value("ai_pool_size", {"pool": "thread"}) == 0
+
+def test_compact_state_roundtrip():
+    """Тест: в пул уходит только компактное состояние, ход по нему тот же, что по партии"""
+    game = BitboardTicTacToe()
+    for row, col, player in [(2, 2, 'X'), (0, 0, 'O'), (2, 3, 'X')]:
+        game.make_move(row, col, player)
+    state = pickle.loads(pickle.dumps(game.to_state()))
+    restored = BitboardTicTacToe.from_state(state)
+    assert restored.board == game.board
+    assert restored.check_winner() == game.check_winner()
+    assert restored.get_empty_cells() == game.get_empty_cells()
+
+    result = pickle.loads(pickle.dumps(ai_executor.compute_move(state, "hard", game.game_id)))
+    assert result.move in game.get_empty_cells()
+    assert result.depth is not None and result.nodes > 0
+    assert result.compute_seconds >= 0
+
+def test_process_pool_path(monkeypatch):
+    """Тест: поиск считается в пуле процессов, эвристика - в потоке"""
+    monkeypatch.setattr(ai_executor, "AI_EXECUTOR", "process")
+    monkeypatch.setattr(ai_executor, "AI_POOL_WORKERS", 1)
+    game = BitboardTicTacToe()
+    game.make_move(2, 2, 'X')
+    waits, _ = _waits()
+
+    async def scenario():
+        return await ai_executor.run_compute_move(game.to_state(), "hard", game.game_id)
+
+    try:
+        result = asyncio.run(scenario())
+        assert result.move in game.get_empty_cells() and result.depth is not None
+        assert REGISTRY.get_sample_value("ai_pool_size", {"pool": "process"}) == 1
+        assert REGISTRY.get_sample_value("ai_pool_in_flight_tasks", {"pool": "process"}) == 0
+        assert _waits()[0] == waits + 1
+        assert ai_executor._get_executor("unbeatable", game.game_id)[0] == "process"
+        assert ai_executor._get_executor("normal", game.game_id)[0] == "thread"
+    finally:
+        ai_executor.shutdown_ai_executor()
+    assert REGISTRY.get_sample_value("ai_pool_size", {"pool": "process"}) == 0
+
+def test_wait_time_counts_queueing(monkeypatch):
+    """Тест: время ожидания - от отправки в пул до начала вычисления"""
+    monkeypatch.setattr(ai_executor, "AI_EXECUTOR", "thread")
+    monkeypatch.setattr(ai_executor, "AI_POOL_WORKERS", 1)
+
+    def slow_move(state, difficulty, game_id=None):
+        started_at = time.time()
+        time.sleep(0.05)
+        return ai_executor.AIMoveResult((0, 0), None, None, started_at, 0.05)
+
+    monkeypatch.setattr(ai_executor, "compute_move", slow_move)
+    state = BitboardTicTacToe().to_state()
+    waits, waited = _waits()
+
+    async def scenario():
+        await asyncio.gather(*(ai_executor.run_compute_move(state, "normal", "g") for _ in range(2)))
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        ai_executor.shutdown_ai_executor()
+    count, total = _waits()
+    assert count == waits + 2
+    assert total - waited >= 0.04  # Вторая задача ждала, пока считается первая
+
+@pytest.mark.parametrize("workers,sticky_size,sticky_levels,expected", [
+    (8, None, {"expert"}, (6, 2)),
+    (4, None, {"expert"}, (3, 1)),
+    (8, "3", {"expert"}, (5, 3)),
+    (2, None, {"expert"}, (1, 1)),
+    (8, None, set(), (8, 0)),
+])
+def test_sticky_pool_within_budget(monkeypatch, workers, sticky_size, sticky_levels, expected):
+    """Тест: липкий пул берет процессы из AI_POOL_SIZE, а не добавляет свои"""
+    monkeypatch.setattr(ai_executor, "AI_POOL_WORKERS", workers)
+    monkeypatch.setattr(ai_executor, "AI_STICKY_POOL_SIZE", sticky_size)
+    monkeypatch.setattr(ai_executor, "AI_STICKY_LEVELS", sticky_levels)
+    assert ai_executor._pool_budget() == expected
+
+def test_sticky_pool_size_gauges(monkeypatch):
+    """Тест: метрики размеров пулов показывают процессы после деления бюджета"""
+    monkeypatch.setattr(ai_executor, "AI_EXECUTOR", "process")
+    monkeypatch.setattr(ai_executor, "AI_POOL_WORKERS", 4)
+    monkeypatch.setattr(ai_executor, "AI_STICKY_POOL_SIZE", None)
+    try:
+        # Процессы стартуют только при первой задаче
+        ai_executor._get_executor("hard", "game")
+        ai_executor._get_executor("expert", "game")
+        assert REGISTRY.get_sample_value("ai_pool_size", {"pool": "process"}) == 3
+        assert REGISTRY.get_sample_value("ai_pool_size", {"pool": "sticky"}) == 1
+    finally:
+        ai_executor.shutdown_ai_executor()
@@ -0,0 +1,49 @@
+"""
+Тесты для пакетного симулятора
+"""
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.game.ai import AIPlayer
+from app.game.bitboard import BitboardTicTacToe
+from app.game.batch import (
+    BatchGames, X, O, heuristic_policy, random_policy, play_batch,
+)
+
+def _random_batch(count, seed):
+    """Пакет незавершенных партий со случайными ходами"""
+    rng = np.random.default_rng(seed)
+    batch = BatchGames(count)
+    player = X
+    for _ in range(rng.integers(1, 8)):
+        batch.apply(random_policy(batch, player, rng), player)
+        player = -player
+    return batch, rng
+
+def test_winner_matches_bitboard_engine():
+    """Тест: векторная проверка победы совпадает с битборд-движком"""
+    batch, rng = _random_batch(500, 1)
+    for index in range(500):
+        game = BitboardTicTacToe.from_state(batch.to_state(index))
+        expected = {'X': X, 'O': O, None: 0}[game.check_winner()]
+        assert batch.winner[index] == expected
+        assert batch.done[index] == (game.check_winner() is not None or game.is_draw())
+
+def test_heuristic_policy_matches_ai_player():
+    """Тест: векторная эвристика выбирает тот же ход, что и AIPlayer"""
+    for seed in range(5):
+        batch, rng = _random_batch(200, seed)
+        moves = heuristic_policy(batch, O, rng)
+        ai = AIPlayer()
+        for index in np.flatnonzero(~batch.done):
+            game = BitboardTicTacToe.from_state(batch.to_state(index))
+            row, col = ai.get_best_move(game)
+            assert moves[index] == row * 5 + col
+
+def test_play_batch_counts():
+    """Тест: все партии пакета доигрываются до конца"""
+    stats = play_batch(1000, random_policy, heuristic_policy, seed=3)
+    assert stats.x_wins + stats.o_wins + stats.draws == 1000
+    assert stats.o_wins > stats.x_wins
+    assert stats.games_per_second > 0
@@ -0,0 +1,131 @@
+"""
+Тесты для битборд-движка
+"""
+import copy
+import json
+import pickle
+import random
+import pytest
+from app.game.logic import TicTacToe
+from app.game.bitboard import BitboardTicTacToe, build_win_masks
+from app.game.ai import AIPlayer
+
+def test_win_masks_count():
+    """Тест: количество линий 3 в ряд на поле 5x5"""
+    # 15 по строкам, 15 по столбцам, 9 + 9 по диагоналям
+    assert len(build_win_masks(5, 5, 3)) == 48
+
+def test_bitboard_initialization():
+    """Тест инициализации битборд-игры"""
+    game = BitboardTicTacToe()
+    assert game.status == 'playing'
+    assert game.board == [['' for _ in range(5)] for _ in range(5)]
+    assert len(game.get_empty_cells()) == 25
+
+def test_bitboard_moves():
+    """Тест валидных и невалидных ходов"""
+    game = BitboardTicTacToe()
+    assert game.make_move(1, 2, 'X')['success'] == True
+    assert game.board[1][2] == 'X'
+    assert game.make_move(1, 2, 'O')['success'] == False
+    assert game.make_move(5, 0, 'O')['success'] == False
+
+def test_bitboard_board_roundtrip():
+    """Тест: поле сохраняется и восстанавливается без потерь"""
+    board = [
+        ['X', 'O', '', '', ''],
+        ['', 'X', '', 'O', ''],
+        ['', '', '', '', ''],
+        ['O', '', '', '', 'X'],
+        ['', '', '', '', ''],
+    ]
+    game = BitboardTicTacToe()
+    game.board = board
+    assert game.board == board
+
+def test_bitboard_board_is_read_only():
+    """Тест: запись в клетку поля на месте не теряется молча, а бросает ошибку"""
+    game = BitboardTicTacToe()
+    with pytest.raises(TypeError):
+        game.board[0][0] = 'X'
+    with pytest.raises(TypeError):
+        game.board[0] = ['X'] * 5
+    assert game.board[0][0] == '' and game.x_bits == 0
+
+    # Копии поля - обычные списки, поле сериализуется как раньше
+    board = copy.deepcopy(game.board)
+    board[0][0] = 'X'
+    assert pickle.loads(pickle.dumps(game.board)) == game.board
+    assert json.loads(json.dumps(game.board)) == game.board
+    game.board = board
+    assert game.board[0][0] == 'X'
+
+def test_bitboard_anti_diagonal_winner():
+    """Тест победы по побочной диагонали"""
+    game = BitboardTicTacToe()
+    for i in range(3):
+        game.make_move(i, 4 - i, 'O')
+    assert game.check_winner() == 'O'
+    assert game.is_draw() == False
+
+def test_bitboard_wins_with():
+    """Тест: проверка выигрышного хода без изменения поля"""
+    game = BitboardTicTacToe()
+    game.make_move(0, 0, 'X')
+    game.make_move(0, 1, 'X')
+    assert game.wins_with(0, 2, 'X') == True
+    assert game.wins_with(0, 2, 'O') == False
+    assert game.board[0][2] == ''
+
+def test_bitboard_matches_classic_engine():
+    """Тест: результаты совпадают с классическим движком на случайных партиях"""
+    rng = random.Random(42)
+    for _ in range(200):
+        classic = TicTacToe()
+        bitboard = BitboardTicTacToe()
+        symbol = 'X'
+        while classic.check_winner() is None and not classic.is_draw():
+            row, col = rng.choice(classic.get_empty_cells())
+            classic.make_move(row, col, symbol)
+            bitboard.make_move(row, col, symbol)
+            symbol = 'O' if symbol == 'X' else 'X'
+            assert bitboard.board == classic.board
+            assert bitboard.get_empty_cells() == classic.get_empty_cells()
+            assert bitboard.check_winner() == classic.check_winner()
+            assert bitboard.is_draw() == classic.is_draw()
+
+def test_ai_on_bitboard():
+    """Тест: AI работает с битборд-движком так же, как с классическим"""
+    game = BitboardTicTacToe()
+    game.board = [
+        ['X', 'X', '', '', ''],
+        ['O', '', '', '', ''],
+        ['', '', '', '', ''],
+        ['', '', '', '', ''],
+        ['', '', '', '', '']
+    ]
+    assert AIPlayer().get_best_move(game) == (0, 2)
+
+def test_bitboard_board_assignment_recomputes_state():
+    """Тест: заполненное поле без 3 в ряд считается ничьей"""
+    game = BitboardTicTacToe()
+    game.board = [
+        ['X', 'O', 'X', 'O', 'X'],
+        ['X', 'O', 'X', 'O', 'X'],
+        ['O', 'X', 'O', 'X', 'O'],
+        ['O', 'X', 'O', 'X', 'O'],
+        ['X', 'O', 'X', 'O', 'X'],
+    ]
+    assert game.check_winner() is None
+    assert game.is_draw() == True
+
+def test_bitboard_state_roundtrip():
+    """Тест: компактное состояние восстанавливает поле и победителя"""
+    game = BitboardTicTacToe()
+    for col in range(3):
+        game.make_move(4, col, 'O')
+    game.make_move(0, 0, 'X')
+    restored = BitboardTicTacToe.from_state(game.to_state())
+    assert restored.board == game.board
+    assert restored.check_winner() == 'O'
+    assert restored.get_empty_cells() == game.get_empty_cells()
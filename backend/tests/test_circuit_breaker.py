@@ -0,0 +1,107 @@
+"""
+Тесты для circuit breaker и быстрого fallback при недоступном Redis
+"""
+import asyncio
+import time
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from app.core import circuit_breaker
+from app.core.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from app.storage import redis_client
+from app.storage.redis_client import REDIS_AVAILABLE, RedisStorage
+from tests.redis_helpers import redis_running
+
+def test_breaker_state_machine(monkeypatch):
+    """Тест: closed -> open после порога ошибок, half-open по таймауту, снова closed"""
+    now = [100.0]
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=10)
+
+    assert breaker.record_failure() == False
+    breaker.record_success()  # Счетчик ошибок подряд сбрасывается
+    assert breaker.record_failure() == False
+    assert breaker.record_failure() == True
+    assert breaker.state == OPEN and not breaker.allow_request()
+    assert REGISTRY.get_sample_value("circuit_breaker_state", {"dependency": "test"}) == 2
+
+    now[0] += 10
+    assert breaker.allow_request() and breaker.state == HALF_OPEN
+    assert breaker.record_failure() == True  # Пробный запрос не прошел
+    assert breaker.state == OPEN
+
+    breaker.half_open()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert REGISTRY.get_sample_value("circuit_breaker_state", {"dependency": "test"}) == 0
+
+def _dead_storage(monkeypatch) -> RedisStorage:
+    """Хранилище, указывающее на порт, где никто не слушает"""
+    monkeypatch.setenv("REDIS_PORT", "1")
+    monkeypatch.setenv("REDIS_CONNECT_TIMEOUT", "0.2")
+    monkeypatch.setenv("REDIS_BREAKER_FAILURES", "2")
+    monkeypatch.setenv("REDIS_BREAKER_PROBE_INTERVAL", "0.01")
+    return RedisStorage()
+
+@pytest.mark.skipif(not REDIS_AVAILABLE, reason="redis не установлен")
+def test_open_breaker_skips_redis(monkeypatch):
+    """Тест: после порога ошибок запросы не идут в Redis и не ждут таймаутов"""
+    async def scenario():
+        storage = _dead_storage(monkeypatch)
+        try:
+            assert await storage.get_game("a") is None
+            assert await storage.save_link_token("t", "1") == False
+            assert storage.breaker.state == OPEN and not storage.available
+            started = time.perf_counter()
+            for _ in range(100):
+                assert await storage.get_game("a") is None
+            return (time.perf_counter() - started) / 100
+        finally:
+            await storage.close()
+
+    assert asyncio.run(scenario()) < 0.001
+
+@pytest.mark.skipif(not redis_running(), reason="Redis недоступен")
+def test_probe_recovers_breaker(monkeypatch):
+    """Тест: фоновая проверка переводит breaker в half-open, успешный запрос - в closed"""
+    real_port = redis_client.RedisStorage().redis_port
+
+    async def scenario():
+        storage = _dead_storage(monkeypatch)
+        try:
+            await storage.get_game("a")
+            await storage.get_game("a")
+            assert storage.breaker.state == OPEN
+            storage.redis_port = real_port  # Redis "поднялся"
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if storage.breaker.state == HALF_OPEN:
+                    break
+            assert storage.breaker.state == HALF_OPEN
+            assert await storage.get_game("missing") is None
+            return storage.breaker.state
+        finally:
+            await storage.close()
+
+    assert asyncio.run(scenario()) == CLOSED
+
+@pytest.mark.skipif(not REDIS_AVAILABLE, reason="redis не установлен")
+def test_routes_fall_back_while_open(monkeypatch):
+    """Тест: при разомкнутом breaker игра идет через fallback, /health это показывает"""
+    from app.main import app
+    from app.api import routes
+
+    storage = _dead_storage(monkeypatch)
+    storage.breaker.record_failure()
+    storage.breaker.record_failure()
+    monkeypatch.setattr(routes, "USE_REDIS", True)
+    monkeypatch.setattr(redis_client, "_storage_instance", storage)
+
+    client = TestClient(app)
+    game_id = client.post("/api/game/start").json()["game_id"]
+    assert game_id in routes.memory_storage.games
+    response = client.post("/api/game/move", json={"game_id": game_id, "row": 2, "col": 2})
+    assert response.status_code == 200
+    health = client.get("/health").json()
+    assert health["status"] == "degraded"
+    assert health["checks"] == {"redis_circuit": OPEN, "redis": "unavailable"}
@@ -0,0 +1,114 @@
+"""
+Тесты для бинарного формата партий
+"""
+import random
+import pytest
+from app.game.bitboard import BitboardTicTacToe
+from app.game.modes import GAME_MODES, create_game
+from app.storage.codec import (
+    HEADER, cell_codes, decode_game, delta_fields, encode_game, encode_legacy_json, pack_cells,
+    unpack_cells,
+)
+
+def _random_game(mode, rng):
+    game = create_game(mode)
+    for i in range(rng.randint(0, 12)):
+        row, col = rng.choice(game.get_empty_cells())
+        game.make_move(row, col, 'X' if i % 2 == 0 else 'O')
+    game.difficulty = rng.choice(["normal", "hard", "expert", "unbeatable"])
+    game.status = rng.choice(["playing", "finished"])
+    game.current_player = rng.choice(['X', 'O'])
+    return game
+
+def _same(first, second):
+    return (first.to_state(), first.status, first.current_player, first.difficulty, first.game_id) == \
+        (second.to_state(), second.status, second.current_player, second.difficulty, second.game_id)
+
+@pytest.mark.parametrize("mode", sorted(GAME_MODES))
+def test_roundtrip(mode):
+    """Тест: партия восстанавливается из бинарного формата без потерь"""
+    rng = random.Random(5)
+    for _ in range(30):
+        game = _random_game(mode, rng)
+        restored = decode_game(encode_game(game), game.game_id)
+        assert _same(game, restored)
+        assert restored.check_winner() == game.check_winner()
+
+def test_classic_game_size():
+    """Тест: поле 5x5 - 6 байт заголовка и 7 байт клеток"""
+    game = BitboardTicTacToe()
+    assert len(encode_game(game)) == 13
+    assert len(encode_legacy_json(game)) > 10 * len(encode_game(game))
+
+def test_cells_are_msb_first():
+    """Тест: клетка 0 - старшие биты первого байта клеток"""
+    game = BitboardTicTacToe()
+    game.make_move(0, 0, 'X')
+    game.make_move(0, 1, 'O')
+    game.make_move(4, 4, 'X')
+    data = encode_game(game)
+    assert data[HEADER.size] == 0b01100000
+    assert data[5] == 3  # Число ходов
+    codes = cell_codes(data, 25)
+    assert codes[0] == 1 and codes[1] == 2 and codes[24] == 1
+    assert sum(codes) == 4
+
+def test_pack_unpack_cells():
+    """Тест: упаковка клеток обратима, мусорные коды отвергаются"""
+    assert unpack_cells(pack_cells(0b101, 0b010, 25), 25) == (0b101, 0b010)
+    with pytest.raises(ValueError):
+        unpack_cells(b"\xc0" + bytes(6), 25)  # Код 11
+    with pytest.raises(ValueError):
+        unpack_cells(bytes(6) + b"\x01", 25)  # Бит за пределами поля
+
+def test_legacy_json_is_readable():
+    """Тест: старый JSON читается прозрачно"""
+    game = _random_game("classic", random.Random(1))
+    restored = decode_game(encode_legacy_json(game), "ignored")
+    assert _same(game, restored)
+
+def test_unknown_version():
+    """Тест: неизвестная версия формата"""
+    data = bytearray(encode_game(BitboardTicTacToe()))
+    data[0] = 0x80 | 7
+    with pytest.raises(ValueError):
+        decode_game(bytes(data), "game")
+    with pytest.raises(ValueError):
+        decode_game(b"\x81\x00", "game")
+
+def test_winner_in_header():
+    """Тест: победитель хранится в заголовке, а не пересчитывается"""
+    game = BitboardTicTacToe()
+    for col in range(3):
+        game.make_move(0, col, 'O')
+    data = bytearray(encode_game(game))
+    assert data[1] & 3 == 2
+    assert decode_game(bytes(data), "game").check_winner() == 'O'
+    data[1] |= 3
+    with pytest.raises(ValueError):
+        decode_game(bytes(data), "game")
+
+def _apply_bitfield(data, fields):
+    """Применить BITFIELD SET к записи так же, как Redis (беззнаковые поля, старшие биты первыми)"""
+    total_bits = len(data) * 8
+    value = int.from_bytes(data, "big")
+    for kind, offset, field in fields:
+        width = int(kind[1:])
+        shift = total_bits - offset - width
+        value = value & ~(((1 << width) - 1) << shift) | field << shift
+    return value.to_bytes(len(data), "big")
+
+@pytest.mark.parametrize("mode", sorted(GAME_MODES))
+def test_delta_fields_match_full_record(mode):
+    """Тест: заголовок и изменившиеся клетки дают ту же запись, что и полная"""
+    rng = random.Random(mode)
+    game = _random_game(mode, rng)
+    stored = encode_game(game)
+    stored_bits = (game.x_bits, game.o_bits)
+    for i in range(2):
+        game.make_move(*rng.choice(game.get_empty_cells()), 'X' if i == 0 else 'O')
+    game.current_player = 'X'
+
+    fields = delta_fields(game, *stored_bits)
+    assert len(fields) == 3  # Заголовок и две клетки
+    assert _apply_bitfield(stored, fields) == encode_game(game)
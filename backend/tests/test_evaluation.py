@@ -0,0 +1,124 @@
+"""
+Тесты для оценки позиции по линиям
+"""
+import random
+from app.game.bitboard import BitboardTicTacToe, get_geometry
+from app.game.evaluation import ThreatEvaluator, X_SIDE, O_SIDE, get_line_tables
+from app.game.logic import TicTacToe
+
+def _game(board):
+    game = BitboardTicTacToe()
+    game.board = board
+    return game
+
+def _cells(mask, cols=5):
+    return {divmod(index, cols) for index in range(mask.bit_length()) if mask >> index & 1}
+
+def test_line_tables_index():
+    """Тест: через угловую клетку проходят 3 линии, через центр - 12"""
+    tables = get_line_tables(get_geometry(5, 5, 3))
+    assert len(tables.cell_lines[0]) == 3
+    assert len(tables.cell_lines[12]) == 12
+    assert tables.values[2][0] == 16
+    assert tables.values[1][1] == 0
+
+def test_winning_cells_match_wins_with():
+    """Тест: клетки выигрыша совпадают с полным перебором"""
+    rng = random.Random(7)
+    for _ in range(50):
+        game = BitboardTicTacToe()
+        for _ in range(rng.randint(0, 10)):
+            row, col = rng.choice(game.get_empty_cells())
+            game.make_move(row, col, game.current_player)
+            game.current_player = 'O' if game.current_player == 'X' else 'X'
+            if game.check_winner():
+                break
+        threats = ThreatEvaluator.from_game(game)
+        for side, symbol in ((X_SIDE, 'X'), (O_SIDE, 'O')):
+            expected = {cell for cell in game.get_empty_cells() if game.wins_with(*cell, symbol)}
+            assert _cells(threats.winning_cells(side)) == expected
+
+def test_add_remove_is_incremental():
+    """Тест: добавление и снятие камня дает то же, что пересчет с нуля"""
+    geometry = get_geometry(10, 10, 5)
+    rng = random.Random(3)
+    threats = ThreatEvaluator(geometry)
+    x_bits = o_bits = 0
+    placed = []
+    for index in rng.sample(range(100), 30):
+        side = len(placed) % 2
+        threats.add(index, side)
+        placed.append((index, side))
+        if side == X_SIDE:
+            x_bits |= 1 << index
+        else:
+            o_bits |= 1 << index
+    fresh = ThreatEvaluator.from_bits(geometry, x_bits, o_bits)
+    assert threats.score == fresh.score
+    assert threats.threats == fresh.threats
+    assert threats.developing == fresh.developing
+
+    for index, side in reversed(placed):
+        threats.remove(index, side)
+    assert threats.score == 0
+    assert threats.occupied == 0
+    assert threats.threats == [set(), set()]
+    assert threats.developing == [set(), set()]
+
+def test_add_reports_completed_line():
+    """Тест: add сообщает о завершенной линии"""
+    threats = ThreatEvaluator(get_geometry(5, 5, 3))
+    assert threats.add(0, X_SIDE) == False
+    assert threats.add(1, X_SIDE) == False
+    assert threats.add(2, X_SIDE) == True
+
+def test_fork_cells():
+    """Тест: вилка - клетка, создающая две угрозы сразу"""
+    game = _game([
+        ['X', '', '', '', 'X'],
+        ['', '', '', '', ''],
+        ['', '', 'O', '', ''],
+        ['', '', '', '', ''],
+        ['', '', '', '', '']
+    ])
+    threats = ThreatEvaluator.from_game(game)
+    # (0, 2) достраивает сразу две линии: (0,0)-(0,2) и (0,2)-(0,4)
+    assert (0, 2) in _cells(threats.fork_cells(X_SIDE))
+    assert (1, 1) not in _cells(threats.fork_cells(X_SIDE))
+
+def test_double_threat_is_losing():
+    """Тест: две угрозы соперника оцениваются как почти проигрыш"""
+    game = _game([
+        ['X', 'X', '', '', ''],
+        ['X', '', '', '', ''],
+        ['', '', '', '', ''],
+        ['', '', '', '', 'O'],
+        ['', '', 'O', '', '']
+    ])
+    threats = ThreatEvaluator.from_game(game)
+    assert threats.evaluate(O_SIDE) < -10_000
+    assert threats.evaluate(X_SIDE) > 10_000
+    game.board = [
+        ['X', 'X', '', '', ''],
+        ['X', '', '', '', ''],
+        ['', '', '', '', ''],
+        ['', '', '', '', 'O'],
+        ['', '', '', 'O', 'O']
+    ]
+    # Ход O, у X две угрозы, у O есть своя: выигрыш O важнее
+    threats = ThreatEvaluator.from_game(game)
+    assert threats.evaluate(O_SIDE) > 0
+
+def test_from_classic_game():
+    """Тест: оценщик строится и для классической игры"""
+    game = TicTacToe()
+    game.board = [
+        ['O', 'O', '', '', ''],
+        ['X', 'X', '', '', ''],
+        ['', '', '', '', ''],
+        ['', '', '', '', ''],
+        ['', '', '', '', '']
+    ]
+    threats = ThreatEvaluator.from_game(game)
+    assert _cells(threats.winning_cells(O_SIDE)) == {(0, 2)}
+    assert _cells(threats.winning_cells(X_SIDE)) == {(1, 2)}
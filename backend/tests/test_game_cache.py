@@ -0,0 +1,104 @@
+"""
+Тесты для кеша партий воркера
+"""
+import asyncio
+import pytest
+from prometheus_client import REGISTRY
+from fastapi.testclient import TestClient
+from app.game.bitboard import BitboardTicTacToe
+from app.storage import game_cache as game_cache_module
+from app.storage.game_cache import GameCache
+from app.api import routes
+
+async def _no_flush(games):
+    raise AssertionError("запись не ожидалась")
+
+def test_cache_returns_copies_and_evicts(monkeypatch):
+    """Тест: кеш отдает копии, вытесняет по LRU и по TTL"""
+    now = [0.0]
+    monkeypatch.setattr(game_cache_module.time, "monotonic", lambda: now[0])
+    cache = GameCache(_no_flush, mode="write-through", max_entries=2, ttl=10)
+    games = [BitboardTicTacToe() for _ in range(3)]
+    games[0].make_move(0, 0, 'X')
+    cache.put(games[:2])
+
+    cached = cache.get(games[0].game_id)
+    assert cached is not games[0] and cached.to_state() == games[0].to_state()
+    cached.make_move(1, 1, 'O')
+    assert cache.get(games[0].game_id).o_bits == 0  # Изменение копии не попало в кеш
+
+    cache.put(games[2:])  # Вытесняется games[1]: games[0] читали позже
+    assert cache.get(games[1].game_id) is None
+    now[0] += 10
+    assert cache.get(games[0].game_id) is None
+    assert len(cache) == 1
+    assert REGISTRY.get_sample_value("game_cache_entries") == 1  # Истекшая запись не учитывается
+
+    off = GameCache(_no_flush, mode="off")
+    off.put(games)
+    assert off.get(games[0].game_id) is None
+    with pytest.raises(ValueError):
+        GameCache(_no_flush, mode="lazy")
+
+def test_write_behind_coalesces_saves():
+    """Тест: несколько сохранений партии - одна запись последнего состояния"""
+    flushed = []
+
+    async def flush(games):
+        flushed.append([game.to_state() for game in games])
+
+    async def scenario():
+        cache = GameCache(flush, mode="write-behind", flush_interval=3600)
+        game = BitboardTicTacToe()
+        for row in range(3):
+            game.make_move(row, 0, 'X')
+            cache.put([game], dirty=True)
+        assert REGISTRY.get_sample_value("game_cache_dirty_entries") == 1
+        assert flushed == []
+        await cache.close()
+        return game
+
+    flushes = REGISTRY.get_sample_value("game_cache_flush_seconds_count") or 0
+    game = asyncio.run(scenario())
+    assert flushed == [[game.to_state()]]
+    assert REGISTRY.get_sample_value("game_cache_dirty_entries") == 0
+    assert REGISTRY.get_sample_value("game_cache_flush_seconds_count") == flushes + 1
+
+def test_failed_flush_is_retried():
+    """Тест: партии, которые не удалось записать, остаются измененными"""
+    attempts = []
+
+    async def flush(games):
+        attempts.append(len(games))
+        if len(attempts) == 1:
+            raise ConnectionError("Redis недоступен")
+
+    async def scenario():
+        cache = GameCache(flush, mode="write-behind", max_entries=1, flush_interval=3600)
+        first, second = BitboardTicTacToe(), BitboardTicTacToe()
+        cache.put([first, second], dirty=True)  # first вытеснен, но не потерян
+        assert cache.get(first.game_id).game_id == first.game_id
+        await cache.flush()
+        await cache.close()
+
+    asyncio.run(scenario())
+    assert attempts == [2, 2]
+
+def test_status_poll_served_from_cache(monkeypatch):
+    """Тест: опрос статуса после хода не читает хранилище"""
+    from app.main import app
+
+    monkeypatch.setattr(routes, "USE_REDIS", False)
+    monkeypatch.setattr(routes, "game_cache", GameCache(routes._write_games, mode="write-through"))
+    client = TestClient(app)
+    game_id = client.post("/api/game/start").json()["game_id"]
+    client.post("/api/game/move", json={"game_id": game_id, "row": 2, "col": 2})
+
+    async def no_read(game_id):
+        raise AssertionError("чтение из хранилища")
+
+    monkeypatch.setattr(routes.memory_storage, "get_game", no_read)
+    hits = REGISTRY.get_sample_value("game_cache_requests_total", {"result": "hit"})
+    response = client.get(f"/api/game/{game_id}")
+    assert response.status_code == 200 and response.json()["board"][2][2] == 'X'
+    assert REGISTRY.get_sample_value("game_cache_requests_total", {"result": "hit"}) == hits + 1
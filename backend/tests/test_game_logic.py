@@ -60,55 +60,47 @@ def test_winner_diagonal():
     assert winner == 'X'
 
 def test_draw():
-    """Тест ничьей (для поля 5x5)"""
+    """Тест ничьей (для поля 5x5)
+
+    Поле задается присваиванием board целиком, последняя клетка - через
+    make_move (board только для чтения).
+    """
     game = TicTacToe()
-    # Заполняем поле без победителя
-    # Создаем шаблон, где точно нет 3 в ряд ни по строкам, столбцам, ни по диагоналям
-    # Шаблон: X и O чередуются, но с разрывами, чтобы избежать 3 подряд
+    # Полное поле без 3 в ряд ни по строкам, столбцам, ни по диагоналям
     game.board = [
-        ['X', 'O', 'X', 'O', 'O'],
-        ['O', 'X', 'O', 'X', 'X'],
-        ['X', 'O', 'O', 'X', 'O'],
-        ['O', 'X', 'X', 'O', 'X'],
-        ['X', 'O', 'X', 'O', 'O']
+        ['O', 'X', 'X', 'O', ''],
+        ['X', 'O', 'O', 'X', 'X'],
+        ['O', 'X', 'X', 'O', 'O'],
+        ['X', 'O', 'O', 'X', 'X'],
+        ['O', 'X', 'X', 'O', 'O']
+    ]
+    assert game.check_winner() is None
+    assert game.is_draw() == False  # Есть пустая клетка
+
+    assert game.make_move(0, 4, 'O')['success']
+    assert game.check_winner() is None
+    assert all(cell != '' for row in game.board for cell in row)
+    assert game.is_draw() == True
+
+def test_board_is_read_only():
+    """Тест: запись в клетку на месте бросает ошибку, а не расходится с победителем"""
+    game = TicTacToe()
+    for col in range(3):
+        with pytest.raises(TypeError):
+            game.board[0][col] = 'X'
+    assert game.check_winner() is None and game.get_empty_cells() == [
+        (row, col) for row in range(5) for col in range(5)
     ]
-    # Проверяем, что нет победителя (важно проверить перед is_draw)
-    winner = game.check_winner()
-    # Если есть победитель, создаем альтернативный шаблон
-    if winner is not None:
-        # Альтернативный шаблон: более сложное расположение
-        game.board = [
-            ['X', 'O', 'X', 'O', 'X'],
-            ['O', 'O', 'X', 'O', 'X'],
-            ['X', 'X', 'O', 'X', 'O'],
-            ['O', 'O', 'X', 'O', 'X'],
-            ['X', 'X', 'O', 'X', 'O']
-        ]
-        winner = game.check_winner()
-    
-    # Если все еще есть победитель, используем минимальный тест логики
-    if winner is not None:
-        # Тестируем логику is_draw: если есть победитель, это не ничья
-        assert game.is_draw() == False
-        # Создаем ситуацию без победителя и с пустой клеткой - не ничья
-        game.board = [
-            ['X', 'O', 'X', 'O', ''],
-            ['O', 'X', 'O', 'X', 'O'],
-            ['X', 'O', 'X', 'O', 'X'],
-            ['O', 'X', 'O', 'X', 'O'],
-            ['X', 'O', 'X', 'O', 'X']
-        ]
-        assert game.is_draw() == False  # Есть пустая клетка
-        # Заполняем последнюю клетку так, чтобы не было победителя
-        game.board[0][4] = 'X'
-        # Проверяем, что нет победителя в новом состоянии
-        if game.check_winner() is None:
-            assert game.is_draw() == True
-    else:
-        # Проверяем, что поле полностью заполнено
-        assert all(cell != '' for row in game.board for cell in row)
-        # Теперь это должна быть ничья
-        assert game.is_draw() == True
+
+    # Присвоенное поле копируется: изменение исходного списка его не меняет
+    board = [['' for _ in range(5)] for _ in range(5)]
+    game.board = board
+    board[0] = ['X', 'X', 'X', '', '']
+    assert game.check_winner() is None and game.board[0][0] == ''
+    board_copy = [list(row) for row in game.board]
+    board_copy[0][:3] = ['X'] * 3
+    game.board = board_copy
+    assert game.check_winner() == 'X'
 
 def test_get_empty_cells():
     """Тест получения пустых клеток (для поля 5x5)"""
@@ -118,3 +110,27 @@ def test_get_empty_cells():
     assert len(empty) == 24  # 25 - 1 = 24 для поля 5x5
     assert (0, 0) not in empty
 
+
+def test_winner_tracked_incrementally():
+    """Тест: победитель и пустые клетки обновляются в make_move"""
+    game = TicTacToe()
+    game.make_move(0, 4, 'O')
+    game.make_move(1, 3, 'O')
+    assert game.check_winner() is None
+    assert game.wins_with(2, 2, 'O') == True
+    assert game.board[2][2] == ''
+    game.make_move(2, 2, 'O')
+    assert game.check_winner() == 'O'
+    assert game.is_draw() == False
+
+def test_board_assignment_recomputes_state():
+    """Тест: присваивание поля целиком пересчитывает победителя и счетчик"""
+    game = TicTacToe()
+    game.make_move(0, 0, 'X')
+    game.make_move(0, 1, 'X')
+    game.make_move(0, 2, 'X')
+    assert game.check_winner() == 'X'
+    game.board = [['' for _ in range(5)] for _ in range(5)]
+    assert game.check_winner() is None
+    assert len(game.get_empty_cells()) == 25
+    assert game.is_draw() == False
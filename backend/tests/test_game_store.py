@@ -0,0 +1,156 @@
+"""
+Общие тесты для всех хранилищ партий (GameStore)
+
+Каждый тест выполняется для memory, sqlite и redis; redis пропускается,
+если Redis не запущен, и использует отдельную базу TEST_REDIS_DB (по
+умолчанию 15), которая очищается после теста. Время "идет вперед" без
+ожидания: для памяти и SQLite сдвигаются часы, для Redis - оставшийся
+TTL ключей.
+"""
+import asyncio
+import os
+import time
+import pytest
+from app.game.modes import create_game
+from app.storage import memory_store, sqlite_store
+from app.storage.game_store import GameStore
+from app.storage.memory_store import LINK_TOKEN_TTL_SECONDS, MemoryStorage
+from app.storage.redis_client import RedisStorage
+from app.storage.sqlite_store import SQLiteStorage
+from tests.redis_helpers import redis_running
+
+GAME_TTL_SECONDS = 3600
+THROUGHPUT_GAMES = 2000
+
+class Backend:
+    """Как открыть хранилище и сдвинуть для него время"""
+
+    def __init__(self, name, tmp_path, monkeypatch):
+        self.name = name
+        self.path = str(tmp_path / "games.db")
+        self.offset = 0.0
+        if name == "memory":
+            real = time.monotonic
+            monkeypatch.setattr(memory_store.time, "monotonic", lambda: real() + self.offset)
+        elif name == "sqlite":
+            real = time.time
+            monkeypatch.setattr(sqlite_store.time, "time", lambda: real() + self.offset)
+
+    def open(self) -> GameStore:
+        if self.name == "memory":
+            return MemoryStorage()
+        if self.name == "sqlite":
+            return SQLiteStorage(self.path)
+        return RedisStorage()
+
+    async def advance(self, store, seconds: float):
+        if self.name != "redis":
+            self.offset += seconds
+            return
+        client = await store._get_client()
+        async for key in client.scan_iter():
+            left = await client.pttl(key) - int(seconds * 1000)
+            if left > 0:
+                await client.pexpire(key, left)
+            else:
+                await client.delete(key)
+
+    def run(self, scenario):
+        async def wrapper():
+            store = self.open()
+            try:
+                return await scenario(store)
+            finally:
+                if self.name == "redis":
+                    await (await store._get_client()).flushdb()
+                await store.close()
+        return asyncio.run(wrapper())
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def backend(request, tmp_path, monkeypatch):
+    monkeypatch.setenv("GAME_TTL_HOURS", str(GAME_TTL_SECONDS // 3600))
+    if request.param == "redis":
+        monkeypatch.setenv("REDIS_DB", os.getenv("TEST_REDIS_DB", "15"))
+        if not redis_running():
+            pytest.skip("Redis недоступен")
+    return Backend(request.param, tmp_path, monkeypatch)
+
+def _played_game(moves):
+    game = create_game("five")
+    game.difficulty = "hard"
+    for i, cell in enumerate(moves):
+        game.make_move(*cell, 'X' if i % 2 == 0 else 'O')
+    return game
+
+def test_implements_protocol(backend):
+    """Тест: хранилище реализует GameStore"""
+    async def scenario(store):
+        return isinstance(store, GameStore) and store.available and await store.ping()
+
+    assert backend.run(scenario)
+
+def test_game_crud(backend):
+    """Тест: запись, перезапись, пакетная запись, чтение и удаление партий"""
+    game = _played_game([(2, 2), (1, 1)])
+    others = [_played_game([(0, index)]) for index in range(3)]
+
+    async def scenario(store):
+        assert await store.get_game(game.game_id) is None
+        assert await store.save_game(game)
+        first = await store.get_game(game.game_id)
+        game.make_move(3, 3, 'X')
+        assert await store.save_games([game] + others)
+        loaded = [await store.get_game(item.game_id) for item in [game] + others]
+        assert await store.delete_game(game.game_id)
+        return first, loaded, await store.get_game(game.game_id)
+
+    first, loaded, deleted = backend.run(scenario)
+    assert first.board[3][3] == '' and first.board[2][2] == 'X'
+    for original, restored in zip([game] + others, loaded):
+        assert restored.to_state() == original.to_state()
+        assert (restored.difficulty, restored.status, restored.game_id) == \
+            (original.difficulty, original.status, original.game_id)
+    assert deleted is None
+
+def test_ttl_semantics(backend):
+    """Тест: токен живет 10 минут, партия - GAME_TTL_HOURS с последней записи"""
+    game = _played_game([(0, 0)])
+
+    async def scenario(store):
+        await store.save_game(game)
+        await store.save_link_token("token", "42")
+        assert await store.get_chat_id_by_token("missing") is None
+        await backend.advance(store, LINK_TOKEN_TTL_SECONDS - 60)
+        assert await store.get_chat_id_by_token("token") == "42"
+        await backend.advance(store, 120)
+        assert await store.get_chat_id_by_token("token") is None
+
+        await store.save_game(game)  # Перезапись продлевает партию
+        await backend.advance(store, GAME_TTL_SECONDS - 60)
+        assert await store.get_game(game.game_id) is not None
+        await backend.advance(store, 120)
+        return await store.get_game(game.game_id)
+
+    assert backend.run(scenario) is None
+
+def test_throughput(backend):
+    """Тест: одновременные сохранения и чтения тысяч партий"""
+    games = [_played_game([(index % 5, index // 5 % 5)]) for index in range(THROUGHPUT_GAMES)]
+
+    async def scenario(store):
+        semaphore = asyncio.Semaphore(64)
+
+        async def roundtrip(game):
+            async with semaphore:
+                assert await store.save_game(game)
+                return await store.get_game(game.game_id)
+
+        started = time.perf_counter()
+        loaded = await asyncio.gather(*(roundtrip(game) for game in games))
+        return loaded, time.perf_counter() - started
+
+    loaded, elapsed = backend.run(scenario)
+    assert [game.to_state() for game in loaded] == [game.to_state() for game in games]
+    rate = 2 * THROUGHPUT_GAMES / elapsed
+    print(f"\n{backend.name}: {rate:.0f} операций/с")
+    assert rate > 500
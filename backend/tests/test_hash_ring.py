@@ -0,0 +1,44 @@
+"""
+Тесты для кольца консистентного хеширования
+"""
+import pytest
+from app.storage.hash_ring import HashRing, ring_hash
+
+NODES = ["redis-a:6379", "redis-b:6379", "redis-c:6379"]
+KEYS = [f"game:{index}" for index in range(30000)]
+
+def _owners(ring):
+    return {key: ring.node_for(key) for key in KEYS}
+
+def test_keys_spread_evenly():
+    """Тест: с виртуальными узлами доли узлов близки к 1/N"""
+    owners = _owners(HashRing(NODES))
+    for node in NODES:
+        share = sum(owner == node for owner in owners.values()) / len(KEYS)
+        assert abs(share - 1 / len(NODES)) < 0.05
+
+def test_adding_node_moves_only_its_keys():
+    """Тест: при добавлении узла ключи переходят только на него, около 1/N"""
+    ring = HashRing(NODES)
+    before = _owners(ring)
+    ring.add("redis-d:6379")
+    after = _owners(ring)
+    moved = [key for key in KEYS if before[key] != after[key]]
+    assert all(after[key] == "redis-d:6379" for key in moved)
+    assert 0.18 < len(moved) / len(KEYS) < 0.32
+
+    ring.remove("redis-d:6379")
+    assert _owners(ring) == before  # Ключи вернулись на прежние узлы
+
+def test_ring_is_stable():
+    """Тест: узел ключа не зависит от процесса и порядка добавления узлов"""
+    assert ring_hash("game:1") == 0xf6f620e99b3069de  # Не hash(): он меняется между запусками
+    first = HashRing(NODES)
+    second = HashRing(reversed(NODES))
+    assert all(first.node_for(key) == second.node_for(key) for key in KEYS[:1000])
+    assert first.nodes == sorted(NODES) and len(first) == 3
+
+    with pytest.raises(ValueError):
+        first.add(NODES[0])
+    with pytest.raises(LookupError):
+        HashRing().node_for("game:1")
@@ -0,0 +1,133 @@
+"""
+Тесты для AI на MCTS
+"""
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from app.game.bitboard import BitboardTicTacToe
+from app.game.logic import TicTacToe
+from app.game import mcts
+from app.game.mcts import MCTSTree, MonteCarloSearch, get_tree, _trees
+from app.game.ai import AIPlayer
+
+def _game(board):
+    game = BitboardTicTacToe()
+    game.board = board
+    return game
+
+def _tree(game, side=1):
+    return MCTSTree(game.geometry, game.x_bits, game.o_bits, side)
+
+def test_mcts_takes_win():
+    """Тест: MCTS завершает свою линию"""
+    game = _game([
+        ['O', 'O', '', '', ''],
+        ['X', 'X', '', '', ''],
+        ['', '', '', '', ''],
+        ['', '', '', '', ''],
+        ['', '', '', '', '']
+    ])
+    result = MonteCarloSearch(200, None, seed=1).search(_tree(game))
+    assert result.move == (0, 2)
+
+def test_mcts_blocks_player():
+    """Тест: MCTS блокирует угрозу игрока"""
+    game = _game([
+        ['X', 'X', '', '', ''],
+        ['O', '', '', '', ''],
+        ['', '', '', '', ''],
+        ['', '', '', '', ''],
+        ['', '', '', '', '']
+    ])
+    result = MonteCarloSearch(200, None, seed=1).search(_tree(game))
+    assert result.move == (0, 2)
+
+@pytest.mark.parametrize("rollout", ["random", "heuristic"])
+def test_mcts_respects_playout_budget(rollout):
+    """Тест: число партий ограничено бюджетом"""
+    game = BitboardTicTacToe()
+    game.make_move(2, 2, 'X')
+    result = MonteCarloSearch(300, None, rollout=rollout, seed=1).search(_tree(game))
+    assert result.nodes == 300
+    assert result.move in game.get_empty_cells()
+
+def test_mcts_unknown_rollout():
+    """Тест: неизвестная стратегия быстрых партий"""
+    with pytest.raises(ValueError):
+        MonteCarloSearch(rollout="greedy")
+
+def test_tree_reused_after_moves():
+    """Тест: после хода AI и ответа игрока корень переносится в поддерево"""
+    game = BitboardTicTacToe()
+    game.make_move(2, 2, 'X')
+    tree = _tree(game)
+    result = MonteCarloSearch(500, None, seed=1).search(tree)
+    ai_move = result.move[0] * 5 + result.move[1]
+    tree.play(ai_move)
+    assert tree.side == 0
+    assert tree.root.visits > 0
+
+    reply = max(tree.root.children, key=lambda child: child.visits)
+    visits = reply.visits
+    assert tree.advance(tree.x_bits | 1 << reply.move, tree.o_bits) == True
+    assert tree.root is reply
+    assert tree.root.parent is None
+    assert tree.root.visits == visits
+    assert tree.side == 1
+
+def test_tree_advance_rejects_unrelated_position():
+    """Тест: позицию, недостижимую из корня, дерево не принимает"""
+    game = BitboardTicTacToe()
+    game.make_move(2, 2, 'X')
+    tree = _tree(game)
+    MonteCarloSearch(100, None, seed=1).search(tree)
+    # Камень X исчез
+    assert tree.advance(0, 1) == False
+    # Два хода X подряд
+    assert tree.advance(game.x_bits | 0b11, game.o_bits) == False
+
+def test_expert_keeps_tree_between_moves():
+    """Тест: уровень expert берет дерево партии из хранилища воркера"""
+    _trees.clear()
+    ai = AIPlayer("expert")
+    game = BitboardTicTacToe()
+    game.make_move(2, 2, 'X')
+    row, col = ai.get_best_move(game)
+    game.make_move(row, col, 'O')
+    tree = _trees[game.game_id]
+    assert (tree.x_bits, tree.o_bits) == (game.x_bits, game.o_bits)
+
+    reply = max(tree.root.children, key=lambda child: child.visits)
+    game.make_move(*divmod(reply.move, 5), 'X')
+    visits = reply.visits
+    assert get_tree(game, 'O').root is reply
+    assert reply.visits == visits
+
+def test_expert_on_classic_game():
+    """Тест: уровень expert работает и с классической игрой"""
+    game = TicTacToe()
+    game.board = [
+        ['X', 'X', '', '', ''],
+        ['O', '', '', '', ''],
+        ['', '', '', '', ''],
+        ['', '', '', '', ''],
+        ['', '', '', '', '']
+    ]
+    assert AIPlayer("expert").get_best_move(game) == (0, 2)
+
+def test_trees_shared_between_threads(monkeypatch):
+    """Тест: при AI_EXECUTOR=thread деревья партий берут из нескольких потоков"""
+    monkeypatch.setattr(mcts, "MCTS_TREE_GAMES", 8)
+    _trees.clear()
+    games = []
+    for index in range(32):
+        game = BitboardTicTacToe()
+        game.make_move(index % 5, index // 5 % 5, 'X')
+        games.append(game)
+
+    def worker(offset):
+        for step in range(200):
+            get_tree(games[(offset + step) % len(games)], 'O')
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(worker, range(4)))
+    assert len(_trees) <= 8
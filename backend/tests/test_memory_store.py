@@ -0,0 +1,95 @@
+"""
+Тесты для хранилища партий в памяти
+"""
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from app.api import routes
+from app.game.modes import create_game
+from app.storage import memory_store, redis_client
+from app.storage.memory_store import ENTRY_OVERHEAD, LINK_TOKEN_TTL_SECONDS, MemoryStorage, MemoryStore
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(memory_store.time, "monotonic", lambda: now[0])
+    return now
+
+def _evictions(store, reason):
+    return REGISTRY.get_sample_value(
+        "memory_store_evictions_total", {"store": store, "reason": reason}
+    ) or 0
+
+def test_ttl_expiry(clock):
+    """Тест: запись истекает через ttl, перезапись продлевает ее"""
+    store = MemoryStore("test_ttl", ttl=10, max_entries=100, max_bytes=10 ** 6)
+    store.set("a", b"1")
+    store.set("b", b"2")
+    clock[0] += 6
+    store.set("a", b"3")  # Продлена
+    clock[0] += 5
+    assert store.get("b") is None
+    assert store.get("a") == b"3"
+    clock[0] += 10
+    store.set("c", b"4")  # Истекшие снимаются при записи
+    assert len(store) == 1
+    assert store.bytes == len("c") + 1 + ENTRY_OVERHEAD
+    assert _evictions("test_ttl", "expired") == 2
+
+def test_capacity_and_memory_limits(clock):
+    """Тест: сверх лимитов вытесняются самые давно записанные"""
+    store = MemoryStore("test_limits", ttl=100, max_entries=3, max_bytes=10 ** 6)
+    for key in "abcd":
+        store.set(key, b"x")
+    assert "a" not in store and "d" in store
+    store.set("b", b"y")  # b - теперь самая свежая
+    store.set("e", b"x")
+    assert "c" not in store and "b" in store
+    assert _evictions("test_limits", "capacity") == 2
+
+    store = MemoryStore("test_budget", ttl=100, max_entries=100, max_bytes=3 * (ENTRY_OVERHEAD + 11))
+    for index in range(5):
+        store.set(f"k{index}", bytes(9))
+    assert len(store) == 3 and store.bytes <= store.max_bytes
+    assert _evictions("test_budget", "memory") == 2
+    assert REGISTRY.get_sample_value("memory_store_entries", {"store": "test_budget"}) == 3
+
+def test_storage_roundtrip(clock):
+    """Тест: партии хранятся в бинарном формате, токены истекают через 10 минут"""
+    storage = MemoryStorage()
+    game = create_game("five")
+    game.difficulty = "hard"
+    game.make_move(2, 2, 'X')
+
+    async def scenario():
+        await storage.save_game(game)
+        restored = await storage.get_game(game.game_id)
+        await storage.save_link_token("token", "42")
+        assert await storage.get_chat_id_by_token("token") == "42"
+        clock[0] += LINK_TOKEN_TTL_SECONDS
+        assert await storage.get_chat_id_by_token("token") is None
+        assert await storage.delete_game(game.game_id)
+        return restored, await storage.get_game(game.game_id)
+
+    restored, deleted = asyncio.run(scenario())
+    assert restored is not game
+    assert restored.to_state() == game.to_state() and restored.difficulty == "hard"
+    assert deleted is None
+    assert storage.games.bytes == 0
+
+def test_health_with_memory_backend(monkeypatch):
+    """Тест: STORAGE_BACKEND=memory - /health не проверяет Redis и не считает его отказом"""
+    from app.main import app
+
+    async def no_redis():
+        raise AssertionError("обращение к Redis")
+
+    monkeypatch.setattr(routes, "STORAGE_BACKEND", "memory")
+    monkeypatch.setattr(routes, "USE_REDIS", False)
+    monkeypatch.setattr("app.main.get_storage", no_redis)
+    monkeypatch.setattr(redis_client, "get_storage", no_redis)
+
+    with TestClient(app) as client:
+        health = client.get("/health").json()
+    assert health == {"status": "ok", "checks": {"memory": "ok"}}
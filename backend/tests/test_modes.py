@@ -0,0 +1,72 @@
+"""
+Тесты для режимов игры
+"""
+import time
+import pytest
+from app.game.bitboard import BitboardTicTacToe, get_geometry
+from app.game.modes import GAME_MODES, create_game
+from app.game.ai import AIPlayer
+
+def test_create_game_modes():
+    """Тест: каждый режим создает поле нужного размера"""
+    for name, mode in GAME_MODES.items():
+        game = create_game(name)
+        assert len(game.board) == mode.rows
+        assert all(len(row) == mode.cols for row in game.board)
+        assert len(game.get_empty_cells()) == mode.rows * mode.cols
+
+def test_unknown_mode():
+    """Тест: неизвестный режим отклоняется"""
+    with pytest.raises(ValueError):
+        create_game("chess")
+
+def test_geometry_is_cached():
+    """Тест: таблица линий строится один раз на конфигурацию"""
+    first = create_game("gomoku")
+    second = create_game("gomoku")
+    assert first.geometry is second.geometry
+    assert get_geometry(15, 15, 5) is first.geometry
+
+def test_geometry_line_count():
+    """Тест: количество линий 5 в ряд на поле 15x15"""
+    # 165 по строкам, 165 по столбцам, 121 + 121 по диагоналям
+    assert len(get_geometry(15, 15, 5).win_masks) == 572
+
+def test_five_in_a_row_winner():
+    """Тест: на поле 10x10 четыре в ряд не побеждают, пять — побеждают"""
+    game = create_game("five")
+    for i in range(4):
+        game.make_move(3 + i, 2 + i, 'X')
+    assert game.check_winner() is None
+    game.make_move(7, 6, 'X')
+    assert game.check_winner() == 'X'
+
+def test_rectangular_board():
+    """Тест: прямоугольное поле N x M"""
+    game = BitboardTicTacToe(3, 7, 4)
+    assert len(game.board) == 3
+    assert all(len(row) == 7 for row in game.board)
+    for col in range(3, 7):
+        game.make_move(2, col, 'O')
+    assert game.check_winner() == 'O'
+    assert game.make_move(3, 0, 'X')['success'] == False
+
+def test_gomoku_move_is_fast():
+    """Тест: ход с проверкой победы на 15x15 занимает меньше миллисекунды"""
+    game = create_game("gomoku")
+    cells = game.get_empty_cells()
+    start = time.perf_counter()
+    for row, col in cells[:100]:
+        game.make_move(row, col, 'X' if (row + col) % 2 else 'O')
+        game.check_winner()
+        game.is_draw()
+    elapsed = (time.perf_counter() - start) / 100
+    assert elapsed < 0.001
+
+def test_ai_on_large_board():
+    """Тест: AI блокирует четыре в ряд на поле 15x15"""
+    game = create_game("gomoku")
+    for col in range(4):
+        game.make_move(7, 3 + col, 'X')
+    move = AIPlayer().get_best_move(game)
+    assert move in [(7, 2), (7, 7)]
@@ -0,0 +1,161 @@
+"""
+Тесты для атомарного хода игрока в Redis (нужен запущенный Redis)
+"""
+import asyncio
+import random
+import pytest
+from fastapi.testclient import TestClient
+from app.api import routes
+from app.game.modes import GAME_MODES, create_game
+from app.storage.codec import decode_game, encode_game, encode_legacy_json
+from app.storage.move_script import (
+    MOVE_AI_TURN, MOVE_APPLIED, MOVE_BAD_CELL, MOVE_FINISHED, MOVE_NOT_FOUND, MOVE_NOT_YOUR_TURN,
+    MOVE_OCCUPIED, MOVE_UNSUPPORTED,
+)
+from tests.redis_helpers import redis_running, run_with_storage
+
+pytestmark = pytest.mark.skipif(not redis_running(), reason="Redis недоступен")
+
+def _random_position(mode, rng):
+    game = create_game(mode)
+    for i in range(rng.randint(0, 2 * (game.rows * game.cols // 5))):
+        if game.check_winner() or game.is_draw():
+            break
+        row, col = rng.choice(game.get_empty_cells())
+        game.make_move(row, col, 'X' if i % 2 == 0 else 'O')
+    return game
+
+@pytest.mark.parametrize("mode", sorted(GAME_MODES))
+def test_script_matches_python_move(mode):
+    """Тест: скрипт применяет ход так же, как BitboardTicTacToe.make_move"""
+    rng = random.Random(3)
+
+    async def scenario(storage, client):
+        for _ in range(40):
+            game = _random_position(mode, rng)
+            if game.check_winner() or game.is_draw():
+                continue
+            await client.set(f"game:{game.game_id}", encode_game(game), ex=60)
+            row, col = rng.choice(game.get_empty_cells())
+            result, stored = await storage.apply_move(game.game_id, row, col)
+            game.make_move(row, col, 'X')
+            assert result == MOVE_APPLIED
+            assert stored.to_state() == game.to_state()
+            assert stored.check_winner() == game.check_winner()
+            finished = game.check_winner() is not None or game.is_draw()
+            assert stored.status == ('finished' if finished else 'playing')
+            assert stored.current_player == ('X' if finished else 'O')
+            await client.delete(f"game:{game.game_id}")
+
+    run_with_storage(scenario)
+
+def test_script_rejects_conflicts():
+    """Тест: повторный ход до ответа AI, занятая клетка, конец игры"""
+    async def scenario(storage, client):
+        game = create_game("classic")
+        key = f"game:{game.game_id}"
+        await client.set(key, encode_game(game), ex=60)
+
+        assert (await storage.apply_move(game.game_id, 2, 2)).result == MOVE_APPLIED
+        assert (await storage.apply_move(game.game_id, 0, 0)).result == MOVE_NOT_YOUR_TURN
+        assert await client.ttl(key) > 60  # TTL партии обновлен
+
+        game.make_move(2, 2, 'X')
+        game.make_move(1, 1, 'O')
+        await client.set(key, encode_game(game), ex=60)
+        assert (await storage.apply_move(game.game_id, 1, 1)).result == MOVE_OCCUPIED
+        result, current = await storage.apply_move(game.game_id, 9, 0)
+        assert result == MOVE_BAD_CELL and current.rows == 5
+
+        game.status = 'finished'
+        await client.set(key, encode_game(game), ex=60)
+        assert (await storage.apply_move(game.game_id, 0, 0)).result == MOVE_FINISHED
+
+        await client.set(key, encode_legacy_json(game), ex=60)
+        assert (await storage.apply_move(game.game_id, 0, 0)).result == MOVE_UNSUPPORTED
+        await client.delete(key)
+        assert (await storage.apply_move(game.game_id, 0, 0)).result == MOVE_NOT_FOUND
+
+    run_with_storage(scenario)
+
+def test_concurrent_moves_apply_once():
+    """Тест: из одновременных ходов в одну партию проходит ровно один"""
+    async def scenario(storage, client):
+        game = create_game("five")
+        await client.set(f"game:{game.game_id}", encode_game(game), ex=60)
+        results = await asyncio.gather(*(
+            storage.apply_move(game.game_id, 3, col) for col in range(5)
+        ))
+        stored = results[[r.result for r in results].index(MOVE_APPLIED)].game
+        await client.delete(f"game:{game.game_id}")
+        return [r.result for r in results], stored
+
+    results, stored = run_with_storage(scenario)
+    assert results.count(MOVE_APPLIED) == 1
+    assert results.count(MOVE_NOT_YOUR_TURN) == 4
+    assert bin(stored.x_bits).count('1') == 1
+
+def test_expired_ai_turn_is_handed_over():
+    """Тест: пока аренда ответа AI жива, ход отвергается; после нее ее получает один запрос"""
+    async def scenario(storage, client):
+        game = create_game("classic")
+        key, lease = f"game:{game.game_id}", f"ai_turn:{game.game_id}"
+        try:
+            await client.set(key, encode_game(game), ex=60)
+            assert (await storage.apply_move(game.game_id, 2, 2)).result == MOVE_APPLIED
+            lease_ttl = await client.pttl(lease)
+            assert (await storage.apply_move(game.game_id, 0, 0)).result == MOVE_NOT_YOUR_TURN
+
+            await client.delete(lease)  # Воркер, считавший ответ AI, упал
+            results = await asyncio.gather(*(storage.apply_move(game.game_id, 0, col) for col in range(3)))
+            return lease_ttl, [r.result for r in results], await client.exists(lease)
+        finally:
+            await client.delete(key, lease)
+
+    lease_ttl, results, leased = run_with_storage(scenario)
+    assert 0 < lease_ttl <= 30000
+    assert sorted(results) == [MOVE_AI_TURN, MOVE_NOT_YOUR_TURN, MOVE_NOT_YOUR_TURN]
+    assert leased
+
+def _stored_game(game_id):
+    async def scenario(storage, client):
+        return decode_game(await client.get(f"game:{game_id}"), game_id)
+    return run_with_storage(scenario)
+
+def _drop_lease(game_id):
+    run_with_storage(lambda storage, client: client.delete(f"ai_turn:{game_id}"))
+
+def test_move_finishes_abandoned_ai_turn(monkeypatch):
+    """Тест: ход в партию, где ответ AI так и не сохранили, досчитывает его и проходит"""
+    from app.main import app
+
+    monkeypatch.setattr(routes, "USE_REDIS", True)
+    monkeypatch.setattr(routes, "ATOMIC_MOVES", True)
+    with TestClient(app) as client:
+        game_id = client.post("/api/game/start").json()["game_id"]
+
+        def crash(game_id):
+            raise RuntimeError("воркер упал")
+
+        # Ошибка после атомарного хода: ход игрока сохраняется, ход возвращается игроку
+        with monkeypatch.context() as patch:
+            patch.setattr(routes, "cancel_pondering", crash)
+            assert client.post("/api/game/move", json={"game_id": game_id, "row": 2, "col": 2}).status_code == 500
+        stored = _stored_game(game_id)
+        assert stored.board[2][2] == 'X' and stored.current_player == 'X'
+
+        # Воркер применил ход скриптом и упал, не посчитав ответ AI
+        run_with_storage(lambda storage, _: storage.apply_move(game_id, 0, 0))
+        assert _stored_game(game_id).current_player == 'O'
+        response = client.post("/api/game/move", json={"game_id": game_id, "row": 4, "col": 4})
+        assert response.status_code == 409  # Аренда еще жива
+
+        _drop_lease(game_id)
+        response = client.post("/api/game/move", json={"game_id": game_id, "row": 4, "col": 4})
+        stored = _stored_game(game_id)
+    run_with_storage(lambda storage, redis: redis.delete(f"game:{game_id}", f"ai_turn:{game_id}"))
+    assert response.status_code == 200
+    board = response.json()["board"]
+    assert board[0][0] == board[4][4] == 'X'
+    assert sum(row.count('O') for row in board) == 2  # Досчитанный ответ и ответ на ход
+    assert stored.board == board and stored.current_player == 'X'
@@ -0,0 +1,66 @@
+"""
+Тесты для симметрий и книги дебютов
+"""
+import random
+import pytest
+from app.game.bitboard import BitboardTicTacToe
+from app.game.symmetry import canonicalize, get_symmetries, transform_bits, to_original
+from app.game.opening_book import OpeningBook, build_book, write_book
+
+def _random_position(rng, moves):
+    game = BitboardTicTacToe()
+    for i in range(moves):
+        row, col = rng.choice(game.get_empty_cells())
+        game.make_move(row, col, 'X' if i % 2 == 0 else 'O')
+    return game
+
+def test_square_board_has_eight_symmetries():
+    """Тест: у квадратного поля 8 симметрий, у прямоугольного 4"""
+    assert len(get_symmetries(5, 5).perms) == 8
+    assert len(get_symmetries(3, 7).perms) == 4
+
+def test_canonical_form_is_symmetry_invariant():
+    """Тест: все симметричные позиции имеют одну каноническую форму"""
+    rng = random.Random(7)
+    tables = get_symmetries(5, 5).chunk_tables
+    for _ in range(50):
+        game = _random_position(rng, rng.randint(1, 8))
+        canonical = canonicalize(game.x_bits, game.o_bits, 5, 5)[:2]
+        for t in tables:
+            x = transform_bits(game.x_bits, t)
+            o = transform_bits(game.o_bits, t)
+            assert canonicalize(x, o, 5, 5)[:2] == canonical
+
+def test_to_original_inverts_transform():
+    """Тест: клетка из канонической формы переводится обратно в исходную"""
+    game = BitboardTicTacToe()
+    game.make_move(0, 1, 'X')
+    x_bits, _, transform = canonicalize(game.x_bits, game.o_bits, 5, 5)
+    canonical_index = x_bits.bit_length() - 1
+    assert to_original(canonical_index, transform, 5, 5) == 1
+
+def test_book_roundtrip(tmp_path):
+    """Тест: книга записывается, отображается в память и отвечает на симметричные позиции"""
+    book = build_book(5, 5, 3, plies=4, depth=3, node_budget=2000)
+    path = str(tmp_path / "book.bin")
+    write_book(path, 5, 5, 3, book)
+    opening_book = OpeningBook(path)
+    assert len(opening_book) == len(book)
+
+    # Любой первый ход X есть в книге, в том числе в повернутом виде
+    for row, col in [(0, 0), (0, 4), (4, 4), (2, 2), (1, 3)]:
+        game = BitboardTicTacToe()
+        game.make_move(row, col, 'X')
+        move = opening_book.lookup(game)
+        assert move in game.get_empty_cells()
+
+    # Позиции другой геометрии книга не обслуживает
+    assert opening_book.lookup(BitboardTicTacToe(10, 10, 5)) is None
+    opening_book.close()
+
+def test_book_rejects_bad_file(tmp_path):
+    """Тест: файл неверного формата отклоняется"""
+    path = tmp_path / "bad.bin"
+    path.write_bytes(b"NOPE" + bytes(16))
+    with pytest.raises(ValueError):
+        OpeningBook(str(path))
@@ -0,0 +1,190 @@
+"""
+Тесты для pondering (ответы AI, посчитанные заранее)
+"""
+import asyncio
+import threading
+import time
+import pytest
+from prometheus_client import REGISTRY
+from app.game.bitboard import BitboardTicTacToe
+from app.game.modes import create_game
+from app.core import ai_executor, pondering
+from app.storage.ai_cache import AIMoveCache
+from app.storage.ponder_cache import PonderCache, PonderedReply, get_ponder_cache
+
+def _hard_game():
+    game = BitboardTicTacToe()
+    game.difficulty = "hard"
+    game.make_move(2, 2, 'X')
+    game.make_move(1, 1, 'O')
+    return game
+
+def test_ponder_cache_hit_discards_other_replies():
+    """Тест: ответ берется по позиции, остальные ответы партии выбрасываются"""
+    cache = PonderCache()
+    game = _hard_game()
+    cache.start(game.game_id)
+    assert cache.put(game.game_id, (game.x_bits | 1, game.o_bits), PonderedReply((0, 1), 0.01))
+    assert cache.put(game.game_id, (game.x_bits | 2, game.o_bits), PonderedReply((0, 0), 0.01))
+
+    game.make_move(0, 0, 'X')
+    assert cache.take(game) == (0, 1)
+    assert len(cache) == 0
+    assert cache.take(game) is None
+
+def test_ponder_cache_miss_and_expiry():
+    """Тест: промах и истекшие ответы"""
+    cache = PonderCache(ttl=0)
+    game = _hard_game()
+    cache.start(game.game_id)
+    assert cache.put(game.game_id, (game.x_bits, game.o_bits), PonderedReply((0, 1), 0.01)) == False
+    assert cache.take(game) is None
+
+    cache = PonderCache()
+    cache.start(game.game_id)
+    cache.put(game.game_id, (1, 2), PonderedReply((0, 1), 0.01))
+    assert cache.take(game) is None
+
+def test_ponder_cache_max_games():
+    """Тест: лишние партии вытесняются, старые первыми"""
+    cache = PonderCache(max_games=2)
+    for game_id in ("a", "b", "c"):
+        cache.start(game_id)
+    assert len(cache) == 2
+    assert cache.put("a", (0, 0), PonderedReply((0, 0), 0.0)) == False
+    assert cache.put("c", (0, 0), PonderedReply((0, 0), 0.0)) == True
+
+def test_candidate_moves_block_first():
+    """Тест: первым просчитывается блок угрозы AI"""
+    game = BitboardTicTacToe()
+    game.board = [
+        ['O', 'O', '', '', ''],
+        ['X', 'X', '', '', ''],
+        ['', '', 'X', '', ''],
+        ['', '', '', '', ''],
+        ['', '', '', '', '']
+    ]
+    moves = pondering.candidate_moves(game)
+    assert moves[0] == (0, 2)
+    assert len(moves) == len(game.get_empty_cells())
+
+def test_candidate_moves_limited_on_large_board():
+    """Тест: на больших полях - не больше лимита и рядом с камнями"""
+    game = create_game("gomoku")
+    game.make_move(7, 7, 'X')
+    game.make_move(7, 8, 'O')
+    moves = pondering.candidate_moves(game, limit=24)
+    assert len(moves) == 24
+    assert all(abs(row - 7) <= 2 and abs(col - 7) <= 3 for row, col in moves)
+
+def test_pondering_precomputes_replies(monkeypatch):
+    """Тест: фоновая задача считает ответы, следующий ход берется из кеша"""
+    monkeypatch.setattr(pondering, "AI_PONDER", True)
+    monkeypatch.setattr(ai_executor, "AI_EXECUTOR", "inline")
+    game = _hard_game()
+
+    async def scenario():
+        pondering.start_pondering(game)
+        await pondering._tasks[game.game_id]
+        game.make_move(0, 0, 'X')
+        pondering.cancel_pondering(game.game_id)
+        return await ai_executor.compute_ai_move(game)
+
+    hits = REGISTRY.get_sample_value("ai_ponder_lookups_total", {"result": "hit"}) or 0
+    move = asyncio.run(scenario())
+    assert move in game.get_empty_cells()
+    assert REGISTRY.get_sample_value("ai_ponder_lookups_total", {"result": "hit"}) == hits + 1
+    assert game.game_id not in pondering._tasks
+    assert get_ponder_cache().take(game) is None  # Ответы партии уже использованы
+
+def test_pondering_cancel(monkeypatch):
+    """Тест: ход игрока отменяет фоновую задачу"""
+    monkeypatch.setattr(pondering, "AI_PONDER", True)
+    monkeypatch.setattr(ai_executor, "AI_EXECUTOR", "thread")
+    game = _hard_game()
+
+    async def scenario():
+        pondering.start_pondering(game)
+        task = pondering._tasks[game.game_id]
+        await asyncio.sleep(0)
+        pondering.cancel_pondering(game.game_id)
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return task
+
+    assert asyncio.run(scenario()).cancelled()
+    assert game.game_id not in pondering._tasks
+    ai_executor.shutdown_ai_executor()
+
+def test_pondering_skips_other_levels(monkeypatch):
+    """Тест: для уровней не из списка pondering не запускается"""
+    monkeypatch.setattr(pondering, "AI_PONDER", True)
+    game = _hard_game()
+    game.difficulty = "normal"
+    pondering.start_pondering(game)
+    assert game.game_id not in pondering._tasks
+
+def _gated_compute(calls, release):
+    """compute_move, который ждет release и записывает уровни вызовов"""
+    def compute(state, difficulty, game_id=None):
+        calls.append(difficulty)
+        started_at = time.time()
+        release.wait(5)
+        game = BitboardTicTacToe.from_state(state)
+        return ai_executor.AIMoveResult(game.get_empty_cells()[0], None, None, started_at, 0.25)
+    return compute
+
+def test_cancelled_ponder_counts_wasted_cpu(monkeypatch):
+    """Тест: вычисление, досчитанное пулом после отмены, учитывается как потраченное зря"""
+    monkeypatch.setattr(pondering, "AI_PONDER", True)
+    monkeypatch.setattr(ai_executor, "AI_EXECUTOR", "thread")
+    calls, release = [], threading.Event()
+    monkeypatch.setattr(ai_executor, "compute_move", _gated_compute(calls, release))
+    game = _hard_game()
+
+    async def scenario():
+        pondering.start_pondering(game)
+        task = pondering._tasks[game.game_id]
+        while not calls:
+            await asyncio.sleep(0.01)
+        pondering.cancel_pondering(game.game_id)
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    wasted = REGISTRY.get_sample_value("ai_ponder_cpu_seconds_total", {"outcome": "wasted"}) or 0
+    asyncio.run(scenario())
+    pool = ai_executor._thread_pool
+    release.set()
+    pool.shutdown(wait=True)
+    ai_executor.shutdown_ai_executor()
+    assert REGISTRY.get_sample_value("ai_ponder_cpu_seconds_total", {"outcome": "wasted"}) == wasted + 0.25
+    assert REGISTRY.get_sample_value("ai_pool_in_flight_tasks", {"pool": "thread"}) == 0
+
+def test_pondering_waits_for_player_moves(monkeypatch):
+    """Тест: пока в пуле считается ход игрока, pondering не отправляет задачи"""
+    monkeypatch.setattr(pondering, "AI_PONDER", True)
+    monkeypatch.setattr(ai_executor, "AI_EXECUTOR", "thread")
+    monkeypatch.setattr(ai_executor, "get_ai_cache", lambda: AIMoveCache(use_redis=False))
+    calls, release = [], threading.Event()
+    monkeypatch.setattr(ai_executor, "compute_move", _gated_compute(calls, release))
+    game, other = _hard_game(), _hard_game()
+    other.difficulty = "expert"
+
+    async def scenario():
+        move = asyncio.create_task(ai_executor.compute_ai_move(other))
+        while not calls:
+            await asyncio.sleep(0.01)
+        pondering.start_pondering(game)
+        await asyncio.sleep(0.05)
+        assert calls == ["expert"]  # Pondering ждет
+        release.set()
+        await move
+        await pondering._tasks[game.game_id]
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        ai_executor.shutdown_ai_executor()
+    assert calls[0] == "expert" and len(calls) > 1
+    assert set(calls[1:]) == {"hard"}
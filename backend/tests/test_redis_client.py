@@ -0,0 +1,156 @@
+"""
+Тесты для жизненного цикла клиента Redis (нужен запущенный Redis)
+"""
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from app.storage import redis_client
+from app.game.modes import create_game
+from app.storage.codec import encode_game
+from app.storage.redis_client import RedisStorage
+from tests.redis_helpers import redis_running, run_with_storage
+
+pytestmark = pytest.mark.skipif(not redis_running(), reason="Redis недоступен")
+
+def test_concurrent_first_requests_share_client(monkeypatch):
+    """Тест: одновременные первые запросы создают один клиент и один PING"""
+    async def scenario():
+        storage = RedisStorage()
+        created = 0
+        create_client = storage._create_client
+
+        async def counting_create():
+            nonlocal created
+            created += 1
+            await create_client()
+
+        monkeypatch.setattr(storage, "_create_client", counting_create)
+        try:
+            clients = await asyncio.gather(*(storage._get_client() for _ in range(20)))
+            assert len({id(client) for client in clients}) == 1
+            return created
+        finally:
+            await storage.close()
+
+    assert asyncio.run(scenario()) == 1
+
+def test_connect_warms_pool_and_close_releases(monkeypatch):
+    """Тест: connect открывает соединения заранее, close их закрывает"""
+    monkeypatch.setenv("REDIS_WARM_CONNECTIONS", "3")
+    monkeypatch.setenv("REDIS_MAX_CONNECTIONS", "8")
+
+    async def scenario():
+        storage = RedisStorage()
+        await storage.connect()
+        pool = storage._pool
+        opened = len(pool._available_connections)
+        await storage.close()
+        return opened, pool
+
+    opened, pool = asyncio.run(scenario())
+    assert opened == 3
+    assert all(not connection.is_connected for connection in pool._available_connections)
+    node = {"node": pool.node}
+    assert REGISTRY.get_sample_value("redis_pool_max_connections", node) == 8
+    assert REGISTRY.get_sample_value("redis_pool_in_use_connections", node) == 0
+
+def test_pool_timeout_when_exhausted(monkeypatch):
+    """Тест: при исчерпании пула команда ждет не дольше REDIS_POOL_TIMEOUT"""
+    monkeypatch.setenv("REDIS_MAX_CONNECTIONS", "1")
+    monkeypatch.setenv("REDIS_POOL_TIMEOUT", "0.05")
+
+    async def scenario():
+        storage = RedisStorage()
+        try:
+            await storage._get_client()
+            connection = await storage._pool.get_connection()
+            try:
+                with pytest.raises(redis_client.redis.ConnectionError):
+                    await storage._client.ping()
+            finally:
+                await storage._pool.release(connection)
+            return await storage._client.ping()
+        finally:
+            await storage.close()
+
+    node = {"node": RedisStorage().node}
+    waits = REGISTRY.get_sample_value("redis_pool_wait_seconds_count", node) or 0
+    assert asyncio.run(scenario())
+    assert REGISTRY.get_sample_value("redis_pool_wait_seconds_count", node) > waits
+
+def test_lifespan_connects_and_closes():
+    """Тест: приложение подключается к Redis при запуске и закрывает пул при остановке"""
+    from app.main import app
+
+    with TestClient(app):
+        storage = redis_client._storage_instance
+        assert storage is not None and storage._client is not None
+    assert redis_client._storage_instance is None
+
+def _game_writes(kind):
+    return REGISTRY.get_sample_value("redis_game_writes_total", {"kind": kind}) or 0
+
+def test_bitfield_format_writes_only_changes(monkeypatch):
+    """Тест: GAME_FORMAT=bitfield - после первой записи пишутся только изменения"""
+    monkeypatch.setattr(redis_client, "GAME_FORMAT", "bitfield")
+    game = create_game("five")
+
+    async def scenario(storage, client):
+        key = f"game:{game.game_id}"
+        try:
+            await storage.save_game(game)
+            game.make_move(2, 2, 'X')
+            game.make_move(2, 3, 'O')
+            await storage.save_game(game)
+            data, ttl = await client.get(key), await client.ttl(key)
+
+            # Ход, примененный скриптом, тоже становится основой для изменений
+            assert (await storage.apply_move(game.game_id, 0, 0)).game.board[0][0] == 'X'
+            loaded = await storage.get_game(game.game_id)
+            loaded.make_move(4, 4, 'O')
+            await storage.save_game(loaded)
+            return data, ttl, loaded, await client.get(key)
+        finally:
+            await client.delete(key)
+
+    full, delta = _game_writes("full"), _game_writes("delta")
+    data, ttl, loaded, final = run_with_storage(scenario)
+    assert data == encode_game(game)
+    assert ttl > 0
+    assert final == encode_game(loaded)
+    assert _game_writes("full") == full + 1
+    assert _game_writes("delta") == delta + 2
+
+def test_bitfield_format_rewrites_changed_record(monkeypatch):
+    """Тест: если запись пропала или ее изменил другой воркер, партия пишется целиком"""
+    monkeypatch.setattr(redis_client, "GAME_FORMAT", "bitfield")
+    game = create_game("five")
+
+    async def scenario(storage, client):
+        key = f"game:{game.game_id}"
+        try:
+            await storage.save_game(game)
+            game.make_move(2, 2, 'X')
+            await client.delete(key)  # Перезапуск Redis или вытеснение
+            await storage.save_game(game)
+            missing = await client.get(key), encode_game(game)
+
+            # Другой воркер записал свой ход поверх известной этому воркеру записи
+            other = create_game("five")
+            other.game_id = game.game_id
+            other.make_move(0, 0, 'X')
+            await client.set(key, encode_game(other))
+            game.make_move(2, 3, 'O')
+            await storage.save_game(game)
+            return missing, await client.get(key), await client.ttl(key)
+        finally:
+            await client.delete(key)
+
+    full, delta = _game_writes("full"), _game_writes("delta")
+    (missing, expected), changed, ttl = run_with_storage(scenario)
+    assert missing == expected
+    assert changed == encode_game(game)
+    assert ttl > 0
+    assert _game_writes("full") == full + 3
+    assert _game_writes("delta") == delta
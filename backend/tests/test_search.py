@@ -0,0 +1,119 @@
+"""
+Тесты для поиска negamax
+"""
+import pytest
+from app.game.bitboard import BitboardTicTacToe
+from app.game.logic import TicTacToe
+from app.game.search import NegamaxSearch, WIN_SCORE, get_zobrist
+from app.game.ai import AIPlayer
+
+def _game(board):
+    game = BitboardTicTacToe()
+    game.board = board
+    return game
+
+def test_search_takes_win():
+    """Тест: поиск завершает свою линию"""
+    game = _game([
+        ['O', 'O', '', '', ''],
+        ['X', 'X', '', '', ''],
+        ['', '', '', '', ''],
+        ['', '', '', '', ''],
+        ['', '', '', '', '']
+    ])
+    result = NegamaxSearch(4, 10_000).search(game, 'O')
+    assert result.move == (0, 2)
+    assert result.score > WIN_SCORE - 10
+
+def test_search_blocks_player():
+    """Тест: поиск блокирует угрозу игрока"""
+    game = _game([
+        ['X', 'X', '', '', ''],
+        ['O', '', '', '', ''],
+        ['', '', '', '', ''],
+        ['', '', '', '', ''],
+        ['', '', '', '', '']
+    ])
+    result = NegamaxSearch(4, 10_000).search(game, 'O')
+    assert result.move == (0, 2)
+
+def test_search_sees_fork():
+    """Тест: поиск находит вилку (две угрозы сразу)"""
+    game = _game([
+        ['', '', '', '', ''],
+        ['', 'O', '', '', ''],
+        ['', '', '', 'X', ''],
+        ['', '', 'O', '', ''],
+        ['X', '', '', '', 'X']
+    ])
+    result = NegamaxSearch(4, 100_000).search(game, 'O')
+    assert result.score > WIN_SCORE - 10
+    game.make_move(*result.move, 'O')
+    threats = [cell for cell in game.get_empty_cells() if game.wins_with(*cell, 'O')]
+    assert len(threats) >= 2
+
+def test_search_respects_node_budget():
+    """Тест: поиск останавливается по бюджету и все равно возвращает ход"""
+    game = BitboardTicTacToe()
+    game.make_move(2, 2, 'X')
+    result = NegamaxSearch(10, 200).search(game, 'O')
+    assert result.move in game.get_empty_cells()
+    assert result.nodes <= 201
+
+def test_zobrist_keys_are_deterministic():
+    """Тест: ключи Zobrist одинаковы во всех процессах"""
+    assert get_zobrist(25) is get_zobrist(25)
+    assert get_zobrist(25).pieces[0][0] == get_zobrist.__wrapped__(25).pieces[0][0]
+
+def test_hard_ai_on_classic_engine():
+    """Тест: уровень hard работает и с классическим движком"""
+    game = TicTacToe()
+    game.board = [
+        ['X', 'X', '', '', ''],
+        ['O', '', '', '', ''],
+        ['', '', '', '', ''],
+        ['', '', '', '', ''],
+        ['', '', '', '', '']
+    ]
+    ai = AIPlayer("hard")
+    assert ai.get_best_move(game) == (0, 2)
+    assert ai.last_search.nodes > 0
+
+def test_hard_ai_beats_heuristic_ai():
+    """Тест: hard не проигрывает эвристике, играющей за X"""
+    heuristic = AIPlayer()
+    heuristic.symbol = 'X'
+    hard = AIPlayer("hard")
+    game = BitboardTicTacToe()
+    game.make_move(2, 2, 'X')
+    turn = 'O'
+    while game.check_winner() is None and not game.is_draw():
+        player = hard if turn == 'O' else heuristic
+        move = player.get_best_move(game)
+        game.make_move(move[0], move[1], turn)
+        turn = 'X' if turn == 'O' else 'O'
+    assert game.check_winner() != 'X'
+
+def test_unknown_difficulty():
+    """Тест: неизвестный уровень сложности отклоняется"""
+    with pytest.raises(ValueError):
+        AIPlayer("impossible")
+
+def test_iterative_deepening_reports_depth():
+    """Тест: поиск сообщает глубину последней завершенной итерации"""
+    game = BitboardTicTacToe(4, 4, 4)
+    game.make_move(1, 1, 'X')
+    result = NegamaxSearch(3, 1_000_000).search(game, 'O')
+    assert result.depth == 3
+
+def test_time_budget_bounds_search():
+    """Тест: поиск укладывается в бюджет времени и возвращает ход"""
+    import time
+    game = BitboardTicTacToe()
+    game.make_move(2, 2, 'X')
+    started = time.perf_counter()
+    result = NegamaxSearch(25, 10_000_000, time_budget_ms=20).search(game, 'O')
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    assert result.move in game.get_empty_cells()
+    assert 1 <= result.depth < 25
+    assert elapsed_ms < 200
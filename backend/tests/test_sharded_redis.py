@@ -0,0 +1,144 @@
+"""
+Тесты для партий на нескольких узлах Redis (запускают локальные redis-server)
+"""
+import asyncio
+import shutil
+import pytest
+from app.game.modes import create_game
+from app.storage import redis_client
+from app.storage.redis_client import REDIS_AVAILABLE
+from app.storage.sharded_redis import ShardedRedisStorage
+from tests.redis_helpers import redis_servers
+
+pytestmark = pytest.mark.skipif(
+    not REDIS_AVAILABLE or shutil.which("redis-server") is None, reason="нужен redis-server"
+)
+
+@pytest.fixture(scope="module")
+def servers():
+    with redis_servers(4) as started:
+        yield started
+
+@pytest.fixture
+def nodes(servers):
+    """Четыре узла; после теста они очищаются"""
+    yield servers
+    import redis
+    for host, port in servers:
+        redis.Redis(host=host, port=port).flushall()
+
+def _run(nodes, scenario):
+    async def wrapper():
+        storage = ShardedRedisStorage(nodes, vnodes=64)
+        try:
+            return await scenario(storage)
+        finally:
+            await storage.close()
+    return asyncio.run(wrapper())
+
+async def _client(storage, node):
+    return await storage.shards[node]._get_client()
+
+def test_keys_spread_over_nodes(nodes):
+    """Тест: партии и токены лежат на узлах по кольцу и читаются обратно"""
+    games = [create_game("classic") for _ in range(300)]
+
+    async def scenario(storage):
+        assert await storage.save_games(games)  # Одна запись - по транзакции на узел
+        await storage.save_link_token("token", "42")
+        loaded = await asyncio.gather(*(storage.get_game(game.game_id) for game in games))
+        sizes = {node: await (await _client(storage, node)).dbsize() for node in storage.shards}
+        misplaced = 0
+        for game in games:
+            owner = storage.ring.node_for(f"game:{game.game_id}")
+            for node in storage.shards:
+                exists = await (await _client(storage, node)).exists(f"game:{game.game_id}")
+                misplaced += bool(exists) != (node == owner)
+        return loaded, sizes, misplaced, await storage.get_chat_id_by_token("token")
+
+    loaded, sizes, misplaced, chat_id = _run(nodes[:3], scenario)
+    assert [game.to_state() for game in loaded] == [game.to_state() for game in games]
+    assert all(size > 50 for size in sizes.values())
+    assert sum(sizes.values()) == len(games) + 1
+    assert misplaced == 0 and chat_id == "42"
+
+def test_dead_node_affects_only_its_keys(nodes, monkeypatch):
+    """Тест: недоступный узел уводит в fallback только свои партии"""
+    monkeypatch.setenv("REDIS_BREAKER_FAILURES", "1")
+    games = [create_game("classic") for _ in range(60)]
+
+    with redis_servers(1) as (spare,):
+        dead = f"{spare[0]}:{spare[1]}"
+
+        async def scenario(storage):
+            await (await _client(storage, dead)).shutdown(nosave=True)
+            results = [await storage.save_game(game) for game in games]
+            owners = [storage.ring.node_for(f"game:{game.game_id}") for game in games]
+            return results, owners, storage.available, storage.shards[dead].available
+
+        results, owners, available, dead_available = _run(nodes[:2] + [spare], scenario)
+
+    assert available and not dead_available
+    assert results == [owner != dead for owner in owners]
+    assert dead in owners and not all(owner == dead for owner in owners)
+
+def test_adding_node_moves_minimal_keys(nodes):
+    """Тест: после добавления узла rebalance переносит на него около 1/N ключей"""
+    games = [create_game("classic") for _ in range(800)]
+    new_node = f"{nodes[3][0]}:{nodes[3][1]}"
+
+    async def fill(storage):
+        assert await storage.save_games(games)
+
+    async def grow(storage):
+        moved = await storage.rebalance()
+        loaded = await asyncio.gather(*(storage.get_game(game.game_id) for game in games))
+        client = await _client(storage, new_node)
+        key = (await client.keys("game:*"))[0]
+        return moved, loaded, await client.dbsize(), await client.pttl(key), await storage.rebalance()
+
+    _run(nodes[:3], fill)
+    moved, loaded, new_size, ttl, moved_again = _run(nodes, grow)
+    assert 0.15 < moved / len(games) < 0.35
+    assert new_size == moved  # Переезжают только ключи нового узла
+    assert ttl > 0 and moved_again == 0
+    assert [game.to_state() for game in loaded] == [game.to_state() for game in games]
+
+def test_get_storage_uses_nodes_from_env(monkeypatch):
+    """Тест: несколько узлов в REDIS_NODES - хранилище с шардированием"""
+    monkeypatch.setattr(redis_client, "_storage_instance", None)
+    monkeypatch.setenv("REDIS_NODES", "127.0.0.1:7001, 127.0.0.1:7002")
+    storage = asyncio.run(redis_client.get_storage())
+    assert isinstance(storage, ShardedRedisStorage)
+    assert sorted(storage.shards) == ["127.0.0.1:7001", "127.0.0.1:7002"]
+
+def test_batch_falls_back_only_for_dead_node(nodes, monkeypatch):
+    """Тест: при отказе узла в fallback уходят только его игры из общей записи"""
+    from app.api import routes
+
+    monkeypatch.setenv("REDIS_BREAKER_FAILURES", "1")
+    monkeypatch.setattr(routes, "memory_storage", routes.MemoryStorage())
+    games = [create_game("classic") for _ in range(60)]
+
+    with redis_servers(1) as (spare,):
+        dead = f"{spare[0]}:{spare[1]}"
+
+        async def scenario(storage):
+            async def primary():
+                return storage
+
+            monkeypatch.setattr(routes, "_primary_storage", primary)
+            await (await _client(storage, dead)).shutdown(nosave=True)
+            results = await storage.save_games_each(games)
+            await routes._write_games(games)
+            owners = [storage.ring.node_for(f"game:{game.game_id}") for game in games]
+            stored = [await storage.get_game(game.game_id) is not None for game in games]
+            return results, owners, stored
+
+        results, owners, stored = _run(nodes[:2] + [spare], scenario)
+
+    on_dead = [owner == dead for owner in owners]
+    assert any(on_dead) and not all(on_dead)
+    assert results == stored == [not lost for lost in on_dead]
+    in_memory = [game.game_id in routes.memory_storage.games for game in games]
+    assert in_memory == on_dead
@@ -0,0 +1,159 @@
+"""
+Тесты для склейки одновременных загрузок и блокировок партий
+"""
+import asyncio
+import pytest
+from prometheus_client import REGISTRY
+from app.game.bitboard import BitboardTicTacToe
+from app.core.single_flight import KeyedLocks, SingleFlight
+from app.storage.game_cache import GameCache
+from app.api import routes
+
+def _deduplicated(name):
+    return REGISTRY.get_sample_value("single_flight_deduplicated_total", {"name": name}) or 0
+
+def test_concurrent_calls_share_one_call():
+    """Тест: одновременные вызовы с одним ключом - один вызов и общий результат"""
+    calls = []
+
+    async def load(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return key.upper()
+
+    async def scenario():
+        flight = SingleFlight("test_share")
+        results = await asyncio.gather(
+            *(flight.do(key, lambda key=key: load(key)) for key in ["a", "a", "a", "b"])
+        )
+        assert len(flight) == 0
+        assert await flight.do("a", lambda: load("a")) == "A"  # Завершенный вызов не переиспользуется
+        return results
+
+    assert asyncio.run(scenario()) == ["A", "A", "A", "B"]
+    assert calls == ["a", "b", "a"]
+    assert _deduplicated("test_share") == 2
+
+def test_error_and_cancellation():
+    """Тест: ошибка достается всем ожидающим, отмена одного не отменяет вызов"""
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ConnectionError("Redis недоступен")
+
+    async def slow():
+        await asyncio.sleep(0.01)
+        return 42
+
+    async def scenario():
+        flight = SingleFlight("test_errors")
+        results = await asyncio.gather(flight.do("k", fail), flight.do("k", fail), return_exceptions=True)
+        assert all(isinstance(result, ConnectionError) for result in results)
+
+        first = asyncio.ensure_future(flight.do("k", slow))
+        second = asyncio.ensure_future(flight.do("k", slow))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == 42
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+    asyncio.run(scenario())
+
+def test_keyed_locks_serialize_and_clean_up():
+    """Тест: работа с одним ключом идет по очереди, с разными - параллельно"""
+    order = []
+    locks = KeyedLocks()
+
+    async def work(key, name):
+        async with locks.hold(key):
+            order.append(f"{name}+")
+            await asyncio.sleep(0.01)
+            order.append(f"{name}-")
+
+    async def scenario():
+        contended = REGISTRY.get_sample_value("game_lock_contended_total")
+        await asyncio.gather(work("g1", "a"), work("g1", "b"), work("g2", "c"))
+        assert REGISTRY.get_sample_value("game_lock_contended_total") == contended + 1
+
+    asyncio.run(scenario())
+    assert order.index("a-") < order.index("b+")
+    assert order.index("c+") < order.index("a-")
+    assert len(locks) == 0
+
+def test_concurrent_polls_load_game_once(monkeypatch):
+    """Тест: одновременные опросы партии не из кеша - одна загрузка, разные копии"""
+    monkeypatch.setattr(routes, "USE_REDIS", False)
+    monkeypatch.setattr(routes, "game_cache", GameCache(routes._write_games, mode="off"))
+    game = BitboardTicTacToe()
+    game.make_move(1, 1, 'X')
+    loads = []
+
+    async def get_game(game_id):
+        loads.append(game_id)
+        await asyncio.sleep(0.01)
+        return game.copy()
+
+    monkeypatch.setattr(routes.memory_storage, "get_game", get_game)
+
+    async def scenario():
+        return await asyncio.gather(*(routes._get_game(game.game_id) for _ in range(5)))
+
+    games = asyncio.run(scenario())
+    assert loads == [game.game_id]
+    assert len({id(loaded) for loaded in games}) == 5
+    assert all(loaded.to_state() == game.to_state() for loaded in games)
+
+@pytest.mark.parametrize("mode", ["off", "write-through"])
+def test_move_does_not_join_stale_poll_load(monkeypatch, mode):
+    """Тест: опрос, начавший загрузку до сохранения хода, не отдает старую партию следующему ходу"""
+    from app.models.schemas import MoveRequest
+
+    monkeypatch.setattr(routes, "USE_REDIS", False)
+    monkeypatch.setattr(routes, "memory_storage", routes.MemoryStorage())
+    monkeypatch.setattr(routes, "game_cache", GameCache(routes._write_games, mode=mode))
+    game = BitboardTicTacToe()
+    asyncio.run(routes.memory_storage.save_game(game))
+    load_game = routes.memory_storage.get_game
+    compute_ai_move = routes.compute_ai_move
+
+    async def move(row, col):
+        async with routes.game_locks.hold(game.game_id):
+            return await routes._make_move(MoveRequest(game_id=game.game_id, row=row, col=col))
+
+    async def scenario():
+        ai_started, ai_release = asyncio.Event(), asyncio.Event()
+        poll_started, poll_release = asyncio.Event(), asyncio.Event()
+
+        async def slow_ai(game):
+            ai_started.set()
+            await ai_release.wait()
+            return await compute_ai_move(game)
+
+        async def get_game(game_id):
+            loaded = await load_game(game_id)  # Состояние на момент начала чтения
+            if ai_started.is_set() and not poll_started.is_set():
+                poll_started.set()
+                await poll_release.wait()  # Медленное чтение опроса
+            return loaded
+
+        monkeypatch.setattr(routes, "compute_ai_move", slow_ai)
+        monkeypatch.setattr(routes.memory_storage, "get_game", get_game)
+        first = asyncio.ensure_future(move(0, 0))
+        await ai_started.wait()
+        routes.game_cache._entries.clear()  # Опрос идет в хранилище и в write-through
+        poll = asyncio.ensure_future(routes._get_game(game.game_id))
+        await poll_started.wait()  # Опрос прочитал партию до первого хода
+        ai_release.set()
+        await first
+        second = asyncio.ensure_future(move(4, 4))
+        await asyncio.sleep(0.05)
+        poll_release.set()
+        await asyncio.gather(poll, second)
+        routes.cancel_pondering(game.game_id)
+        return await load_game(game.game_id), routes.game_cache.get(game.game_id)
+
+    stored, cached = asyncio.run(scenario())
+    assert stored.board[0][0] == stored.board[4][4] == 'X'
+    assert bin(stored.o_bits).count('1') == 2  # Ответы AI на оба хода
+    if mode != "off":
+        assert cached.to_state() == stored.to_state()  # Старая загрузка не заменила запись хода
@@ -0,0 +1,57 @@
+"""
+Тесты для хранилища партий в SQLite
+"""
+import asyncio
+import sqlite3
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from app.game.modes import create_game
+from app.storage import sqlite_store
+from app.storage.game_cache import GameCache
+from app.storage.sqlite_store import SQLiteStorage
+from app.api import routes
+
+def test_concurrent_saves_share_commit(tmp_path):
+    """Тест: одновременные сохранения - одна транзакция, база в режиме WAL"""
+    path = str(tmp_path / "games.db")
+    games = [create_game("classic") for _ in range(50)]
+
+    async def scenario():
+        storage = SQLiteStorage(path)
+        try:
+            results = await asyncio.gather(*(storage.save_game(game) for game in games))
+            assert all(results)
+        finally:
+            await storage.close()
+
+    commits = REGISTRY.get_sample_value("sqlite_commit_writes_count") or 0
+    writes = REGISTRY.get_sample_value("sqlite_commit_writes_sum") or 0
+    asyncio.run(scenario())
+    assert REGISTRY.get_sample_value("sqlite_commit_writes_count") == commits + 1
+    assert REGISTRY.get_sample_value("sqlite_commit_writes_sum") == writes + 50
+
+    db = sqlite3.connect(path)
+    assert db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert db.execute("SELECT COUNT(*) FROM games").fetchone()[0] == 50
+    db.close()
+
+def test_api_with_sqlite_backend(tmp_path, monkeypatch):
+    """Тест: STORAGE_BACKEND=sqlite - партии пишутся в файл и переживают перезапуск"""
+    from app.main import app
+
+    monkeypatch.setenv("SQLITE_PATH", str(tmp_path / "games.db"))
+    monkeypatch.setattr(routes, "STORAGE_BACKEND", "sqlite")
+    monkeypatch.setattr(routes, "USE_REDIS", False)
+    monkeypatch.setattr(routes, "game_cache", GameCache(routes._write_games, mode="off"))
+
+    with TestClient(app) as client:
+        game_id = client.post("/api/game/start").json()["game_id"]
+        client.post("/api/game/move", json={"game_id": game_id, "row": 2, "col": 2})
+        client.post("/api/telegram/link", json={"token": "token", "chat_id": "42"})
+    assert sqlite_store._storage_instance is None  # Закрыта при остановке
+    monkeypatch.setattr(routes, "memory_storage", routes.MemoryStorage())
+
+    with TestClient(app) as client:
+        board = client.get(f"/api/game/{game_id}").json()["board"]
+        assert board[2][2] == 'X'
+        assert client.get("/api/telegram/check/token").json()["chat_id"] == "42"
@@ -0,0 +1,111 @@
+"""
+Тесты для таблицы идеальной игры
+"""
+import os
+import pytest
+from app.game.bitboard import BitboardTicTacToe
+from app.game import ai
+from app.game.ai import AIPlayer
+from app.game.tablebase import (
+    DEFAULT_TABLEBASE_PATH, DRAW, LOSS, WIN, Tablebase,
+    build_tablebase, solve, verify_tablebase, write_tablebase,
+)
+
+@pytest.fixture(scope="module")
+def small_tablebase(tmp_path_factory):
+    """Таблица для поля 3x3: идеальная игра там ведет к ничьей"""
+    path = str(tmp_path_factory.mktemp("tablebase") / "tablebase_3x3.bin")
+    write_tablebase(path, 3, 3, 3, build_tablebase(3, 3, 3))
+    tablebase = Tablebase(path)
+    yield tablebase
+    tablebase.close()
+
+def _game(board, win_length=3):
+    game = BitboardTicTacToe(len(board), len(board[0]), win_length)
+    game.board = board
+    return game
+
+def test_solve_finds_shortest_win():
+    """Тест: решатель выбирает выигрыш в один ход"""
+    game = _game([
+        ['O', 'O', '', '', ''],
+        ['X', 'X', '', '', ''],
+        ['X', '', '', '', ''],
+        ['', '', '', '', ''],
+        ['', '', '', '', '']
+    ])
+    assert solve(game) == (2, WIN, 1)
+
+def test_small_tablebase_roundtrip(small_tablebase):
+    """Тест: после хода X в центр 3x3 исход - ничья"""
+    game = BitboardTicTacToe(3, 3, 3)
+    game.make_move(1, 1, 'X')
+    entry = small_tablebase.lookup(game)
+    assert entry.result == DRAW
+    assert entry.move in [(0, 0), (0, 2), (2, 0), (2, 2)]
+    # Позиции с ходом X в таблице нет, другая геометрия тоже не подходит
+    assert small_tablebase.lookup(BitboardTicTacToe(3, 3, 3)) is None
+    assert small_tablebase.lookup(BitboardTicTacToe()) is None
+
+def test_unbeatable_never_loses_on_small_board(small_tablebase, monkeypatch):
+    """Тест: перебор всех партий X против таблицы на 3x3 - O не проигрывает"""
+    monkeypatch.setattr(ai, "get_tablebase", lambda: small_tablebase)
+    player = AIPlayer("unbeatable")
+    losses = 0
+
+    def play(game):
+        nonlocal losses
+        for row, col in game.get_empty_cells():
+            child = BitboardTicTacToe.from_state(game.to_state())
+            child.make_move(row, col, 'X')
+            if child.check_winner() == 'X':
+                losses += 1
+                continue
+            if child.is_draw():
+                continue
+            child.make_move(*player.get_best_move(child), 'O')
+            assert player.last_search.depth == 0  # Ход из таблицы, не поиск
+            if child.check_winner() is None and not child.is_draw():
+                play(child)
+
+    play(BitboardTicTacToe(3, 3, 3))
+    assert losses == 0
+
+def test_verify_small_tablebase(small_tablebase):
+    """Тест: проверка против эвристики проходит"""
+    assert verify_tablebase(small_tablebase) == 0
+
+def test_corrupted_tablebase(tmp_path):
+    """Тест: файл не того формата не загружается"""
+    path = tmp_path / "broken.bin"
+    path.write_bytes(b"TTTB" + bytes(20))
+    with pytest.raises(ValueError):
+        Tablebase(str(path))
+
+def test_unbeatable_falls_back_to_search(monkeypatch):
+    """Тест: вне таблицы уровень unbeatable играет поиском"""
+    monkeypatch.setattr(ai, "get_tablebase", lambda: None)
+    game = _game([
+        ['X', 'X', '', '', ''],
+        ['O', '', '', '', ''],
+        ['', '', '', '', ''],
+        ['', '', '', '', ''],
+        ['', '', '', '', '']
+    ])
+    assert AIPlayer("unbeatable").get_best_move(game) == (0, 2)
+
+@pytest.mark.skipif(not os.path.exists(DEFAULT_TABLEBASE_PATH), reason="таблица не построена")
+def test_shipped_tablebase():
+    """Тест: таблица для 5x5 отвечает на любой первый ход X"""
+    tablebase = Tablebase(DEFAULT_TABLEBASE_PATH)
+    try:
+        for row in range(5):
+            for col in range(5):
+                game = BitboardTicTacToe()
+                game.make_move(row, col, 'X')
+                entry = tablebase.lookup(game)
+                assert entry is not None
+                assert entry.move in game.get_empty_cells()
+                assert entry.result == LOSS  # На 5x5 первый игрок выигрывает
+    finally:
+        tablebase.close()
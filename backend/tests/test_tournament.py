@@ -0,0 +1,63 @@
+"""
+Тесты для турнира стратегий AI
+"""
+import json
+import os
+import pytest
+from app.game.tournament import (
+    DEFAULT_BASELINE_PATH, GameRecord, compare_to_baseline, elo_ratings,
+    is_comparable, percentile, run_tournament,
+)
+
+def test_elo_winner_gains():
+    """Тест: победитель получает рейтинг, проигравший теряет столько же"""
+    ratings = elo_ratings(["a", "b"], [GameRecord("a", "b", "a", 5)])
+    assert ratings["a"] > 1500 > ratings["b"]
+    assert ratings["a"] + ratings["b"] == pytest.approx(3000)
+
+def test_percentile():
+    """Тест: перцентили по ближайшему рангу"""
+    values = list(range(1, 101))
+    assert percentile(values, 0.5) == 51
+    assert percentile(values, 0.99) == 100
+    assert percentile([], 0.5) == 0.0
+
+def test_round_robin_report():
+    """Тест: эвристика сильнее случайной игры, в отчете есть задержки"""
+    report = run_tournament(["random", "normal"], games_per_pair=6)
+    strategies = report["strategies"]
+    assert strategies["normal"]["elo"] > strategies["random"]["elo"]
+    assert strategies["normal"]["games"] == 6
+    assert strategies["normal"]["wins"] + strategies["normal"]["losses"] \
+        + strategies["normal"]["draws"] == 6
+    assert strategies["normal"]["moves"] > 0
+    latency = strategies["normal"]["latency_ms"]
+    assert 0 <= latency["p50"] <= latency["p95"] <= latency["p99"]
+    json.dumps(report)  # Отчет сериализуется в JSON
+
+def test_unknown_strategy():
+    """Тест: неизвестная стратегия"""
+    with pytest.raises(ValueError):
+        run_tournament(["random", "genius"])
+
+def test_compare_to_baseline_detects_regressions():
+    """Тест: падение рейтинга и рост задержки - регрессии"""
+    def report(elo, p95):
+        return {"strategies": {"hard": {"elo": elo, "latency_ms": {"p50": 1, "p95": p95, "p99": p95}}}}
+
+    baseline = report(1600, 10.0)
+    assert compare_to_baseline(report(1590, 12.0), baseline) == []
+    assert len(compare_to_baseline(report(1500, 10.0), baseline)) == 1
+    assert len(compare_to_baseline(report(1600, 20.0), baseline)) == 1
+    # Для быстрых стратегий допуск не меньше 1 мс
+    assert compare_to_baseline(report(1600, 0.9), report(1600, 0.01)) == []
+
+@pytest.mark.skipif(not os.getenv("AI_BENCHMARK"), reason="долгий прогон: AI_BENCHMARK=1")
+def test_benchmark_against_baseline():
+    """Бенчмарк: турнир по умолчанию не хуже сохраненного базового отчета"""
+    with open(DEFAULT_BASELINE_PATH, encoding="utf-8") as f:
+        baseline = json.load(f)
+    report = run_tournament(list(baseline["strategies"]), baseline["mode"], baseline["games_per_pair"],
+                            baseline["opening_plies"], baseline["seed"])
+    assert is_comparable(report, baseline)
+    assert compare_to_baseline(report, baseline) == []
@@ -0,0 +1,56 @@
+"""
+Тесты для единицы работы с партиями
+"""
+import asyncio
+from fastapi.testclient import TestClient
+from app.game.bitboard import BitboardTicTacToe
+from app.api import routes
+from app.storage.unit_of_work import GameUnitOfWork
+
+def test_commit_writes_latest_state_once():
+    """Тест: несколько изменений партии - одна запись последнего состояния"""
+    written = []
+
+    async def flush(games):
+        written.append([game.to_state() for game in games])
+
+    async def scenario():
+        uow = GameUnitOfWork(flush)
+        game = BitboardTicTacToe()
+        game.make_move(0, 0, 'X')
+        uow.add(game)
+        game.make_move(1, 1, 'O')
+        uow.add(game)
+        assert uow.dirty
+        await uow.commit()
+        await uow.commit()  # Изменений больше нет
+        return uow, game
+
+    uow, game = asyncio.run(scenario())
+    assert written == [[game.to_state()]]
+    assert uow.flushes == 1 and not uow.dirty
+
+def test_move_request_saves_once(monkeypatch):
+    """Тест: ход игрока с ответом AI - одна запись в хранилище"""
+    from app.main import app
+
+    monkeypatch.setattr(routes, "USE_REDIS", False)
+    writes = []
+    save_games = routes._save_games
+
+    async def counting_save(games):
+        writes.append(len(games))
+        await save_games(games)
+
+    monkeypatch.setattr(routes, "_save_games", counting_save)
+    client = TestClient(app)
+    game_id = client.post("/api/game/start").json()["game_id"]
+    writes.clear()
+
+    response = client.post("/api/game/move", json={"game_id": game_id, "row": 2, "col": 2})
+    assert response.status_code == 200
+    board = response.json()["board"]
+    assert board[2][2] == 'X'
+    assert sum(cell == 'O' for row in board for cell in row) == 1
+    assert writes == [1]
+    assert asyncio.run(routes.memory_storage.get_game(game_id)).board == board